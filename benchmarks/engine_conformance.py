@@ -0,0 +1,186 @@
+"""
+推理引擎一致性检查
+用同一批本地音频分别走各推理引擎的完整转录流程（process_audio），检查输出是否满足同一接口契约，
+并与参考引擎（第一个）对比文本与时间戳差异；任一项超出阈值即以非零退出码结束，
+切换生产引擎之前先跑一遍。
+
+示例：
+    python benchmarks/engine_conformance.py --engines whisper,faster-whisper --model base
+    python benchmarks/engine_conformance.py --model small --language 英语 fixtures/*.wav
+"""
+import sys
+import os
+import argparse
+import json
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from synth_audio import ensure_audio
+from src.text_diff import edit_distance, split_tokens
+
+# 未指定音频时使用的合成音频：(类型, 时长秒)，覆盖单窗口、多窗口、静音与长音频分段路径
+# （90 秒超过检查时的长音频阈值 --long-audio-threshold，按静音点切段并行转录）
+DEFAULT_CASES = (("speech", 20), ("speech", 50), ("speech", 90), ("silence", 60))
+# 检查时的长音频阈值（秒）：默认的 600 秒下合成音频都走不到分段路径
+DEFAULT_LONG_AUDIO_THRESHOLD = 60
+# 相对参考引擎允许的词/字差异率与首段开始/末段结束时间的偏差（秒）
+DEFAULT_MAX_DIFF_RATE = 0.15
+DEFAULT_MAX_BOUNDARY_SECONDS = 1.0
+
+
+def _transcribe(model_name: str, path: str, language: str) -> dict:
+    from src.core import process_audio
+
+    segments = []
+    started = time.perf_counter()
+    plain_text, timestamped_text, detected_language = process_audio(
+        path,
+        model_name=model_name,
+        language_choice=language,
+        verbose=None,
+        segment_callback=segments.append,
+    )
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "text": plain_text,
+        "timestamped_text": timestamped_text,
+        "language": detected_language,
+        "segments": segments,
+    }
+
+
+def _contract_errors(result: dict, audio_seconds: float) -> list:
+    """输出需满足的接口契约：返回值类型、分段字段、时间戳单调且落在音频范围内。"""
+    errors = []
+    if not isinstance(result["text"], str) or not isinstance(result["timestamped_text"], str):
+        errors.append("返回的文本不是字符串")
+    previous_start = 0.0
+    for i, seg in enumerate(result["segments"]):
+        if set(seg) != {"start", "end", "text"}:
+            errors.append(f"分段 {i} 的字段为 {sorted(seg)}，应为 end/start/text")
+            continue
+        if not 0 <= seg["start"] <= seg["end"] <= audio_seconds + 1.0:
+            errors.append(f"分段 {i} 时间戳越界: {seg['start']:.2f}-{seg['end']:.2f}")
+        if seg["start"] < previous_start - 0.01:
+            errors.append(f"分段 {i} 的开始时间早于上一段")
+        previous_start = seg["start"]
+    # 中文等不以空格分词，比较时忽略空白
+    joined = "".join("".join(seg["text"] for seg in result["segments"]).split())
+    if joined != "".join(result["text"].split()):
+        errors.append("分段文本拼接结果与全文不一致")
+    return errors
+
+
+def _compare(reference: dict, result: dict) -> dict:
+    ref_tokens = split_tokens(reference["text"])
+    errors = edit_distance(ref_tokens, split_tokens(result["text"]))
+    diff_rate = errors / len(ref_tokens) if ref_tokens else float(bool(result["text"].strip()))
+
+    def _span(r):
+        segs = r["segments"]
+        return (segs[0]["start"], segs[-1]["end"]) if segs else (0.0, 0.0)
+
+    ref_span, span = _span(reference), _span(result)
+    return {
+        "diff_rate": round(diff_rate, 4),
+        "boundary_seconds": round(max(abs(a - b) for a, b in zip(ref_span, span)), 3),
+        "language_match": reference["language"] == result["language"],
+    }
+
+
+def main():
+    """主函数：逐个音频、逐个引擎转录并检查"""
+    parser = argparse.ArgumentParser(description='推理引擎一致性检查')
+    parser.add_argument('audio', nargs='*', help='用于检查的本地音频文件（默认使用合成音频）')
+    parser.add_argument(
+        '--engines',
+        type=str,
+        default='whisper,faster-whisper',
+        help='参与对比的引擎，逗号分隔，第一个为参考（默认: whisper,faster-whisper）'
+    )
+    parser.add_argument('--model', type=str, default='base', help='模型名称（默认: base）')
+    parser.add_argument('--language', type=str, default='自动检测', help='语言选项：自动检测/英语/西班牙语')
+    parser.add_argument(
+        '--max-diff-rate',
+        type=float,
+        default=DEFAULT_MAX_DIFF_RATE,
+        help=f'相对参考引擎允许的词/字差异率（默认: {DEFAULT_MAX_DIFF_RATE}）'
+    )
+    parser.add_argument(
+        '--max-boundary-seconds',
+        type=float,
+        default=DEFAULT_MAX_BOUNDARY_SECONDS,
+        help=f'首段开始/末段结束时间允许的偏差秒数（默认: {DEFAULT_MAX_BOUNDARY_SECONDS}）'
+    )
+    parser.add_argument(
+        '--audio-cache',
+        type=str,
+        default=os.path.join(os.path.dirname(__file__), '.audio'),
+        help='合成音频缓存目录'
+    )
+    parser.add_argument(
+        '--long-audio-threshold',
+        type=int,
+        default=DEFAULT_LONG_AUDIO_THRESHOLD,
+        help=f'超过该时长（秒）走长音频分段路径，分段长度取其一半且不少于 45 秒（默认: {DEFAULT_LONG_AUDIO_THRESHOLD}）'
+    )
+    parser.add_argument('--json', type=str, default=None, help='把完整结果写入该 JSON 文件')
+
+    args = parser.parse_args()
+    # 须在导入 src.core 之前设置；分段长度要明显大于切点前后 30 秒的搜索窗口，否则会切出很短的分段
+    os.environ['WHISPER_LONG_AUDIO_THRESHOLD'] = str(args.long_audio_threshold)
+    os.environ['WHISPER_LONG_AUDIO_CHUNK_SECONDS'] = str(max(45, args.long_audio_threshold // 2))
+
+    from src.core import _decode_audio_to_pcm
+
+    if args.audio:
+        paths = args.audio
+    else:
+        paths = [ensure_audio(args.audio_cache, signal, seconds) for signal, seconds in DEFAULT_CASES]
+    engine_names = [e.strip() for e in args.engines.split(',') if e.strip()]
+
+    failures = 0
+    reports = []
+    for path in paths:
+        with _decode_audio_to_pcm(path) as pcm:
+            audio_seconds = pcm.duration
+        results = {
+            name: _transcribe(f"{name}:{args.model}", path, args.language) for name in engine_names
+        }
+        reference = results[engine_names[0]]
+        print("=" * 60)
+        print(f"{os.path.basename(path)} ({audio_seconds:.1f}s)")
+        for name, result in results.items():
+            problems = _contract_errors(result, audio_seconds)
+            comparison = _compare(reference, result) if result is not reference else None
+            if comparison is not None:
+                if comparison["diff_rate"] > args.max_diff_rate:
+                    problems.append(f"差异率 {comparison['diff_rate']:.2%} 超过阈值")
+                if comparison["boundary_seconds"] > args.max_boundary_seconds:
+                    problems.append(f"首末时间偏差 {comparison['boundary_seconds']}s 超过阈值")
+                if not comparison["language_match"]:
+                    problems.append(f"检测语言不一致: {reference['language']} vs {result['language']}")
+            failures += bool(problems)
+            print(
+                f"  {name:<16} {result['seconds']:>7.2f}s  分段 {len(result['segments']):>4}"
+                f"  语言 {result['language']}"
+                + (f"  差异率 {comparison['diff_rate']:.2%}" if comparison else "  (参考)")
+            )
+            for problem in problems:
+                print(f"    ✗ {problem}")
+            reports.append(
+                {"audio": path, "engine": name, "comparison": comparison, "problems": problems, **result}
+            )
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+    print("=" * 60)
+    print("一致性检查通过" if not failures else f"{failures} 项不一致")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
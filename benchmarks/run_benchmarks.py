@@ -0,0 +1,267 @@
+"""
+转录流水线基准测试
+用本地合成的音频测量解码、PCM 转换、模型加载、转录 RTF 与峰值内存，结果输出为 JSON，
+并可与保存的基线对比：任一指标超出容差即以非零退出码结束，便于在升级/改配置后发现回退。
+
+示例：
+    python benchmarks/run_benchmarks.py --models tiny,base --durations 10,60,600
+    python benchmarks/run_benchmarks.py --output bench.json --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+"""
+import sys
+import os
+import argparse
+import json
+import multiprocessing
+import platform
+import statistics
+import threading
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from synth_audio import SIGNALS, ensure_audio
+
+DEFAULT_DURATIONS = "10,60,600,1800,7200"
+# 对比基线时，差值小于这些绝对量的波动不算回退（避免毫秒级指标被噪声放大）
+_ABSOLUTE_FLOOR = {"seconds": 0.05, "rtf": 0.01, "mb": 20.0}
+
+
+class _PeakRssSampler:
+    """后台线程定时采样 RSS，记录区间内峰值（跨平台，不依赖 resource 模块）。"""
+
+    def __init__(self, interval: float = 0.05):
+        from src import metrics
+
+        self._read = metrics.current_rss_bytes
+        self.interval = interval
+        self.peak = self._read() or 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._read() or 0)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._read() or 0)
+
+
+def _mb(n_bytes: int) -> float:
+    return round(n_bytes / 1024 / 1024, 1)
+
+
+def _bench_decode(cases: list, repeat: int) -> dict:
+    """ffmpeg 解码（_load_audio_with_timeout 的解码部分）与 PCM -> float32 转换耗时。"""
+    from src.core import _decode_audio_to_pcm, _pcm_file_to_float32
+
+    results = {}
+    for name, path, seconds in cases:
+        decode_times, convert_times = [], []
+        with _PeakRssSampler() as rss:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                pcm = _decode_audio_to_pcm(path)
+                decode_times.append(time.perf_counter() - started)
+                try:
+                    started = time.perf_counter()
+                    audio = _pcm_file_to_float32(pcm.path)
+                    convert_times.append(time.perf_counter() - started)
+                    del audio
+                finally:
+                    pcm.close()
+        results[name] = {
+            "audio_seconds": seconds,
+            "decode_seconds": round(statistics.median(decode_times), 4),
+            "pcm_convert_seconds": round(statistics.median(convert_times), 4),
+            "peak_rss_mb": _mb(rss.peak),
+        }
+    return results
+
+
+def _bench_model(model_name: str, cases: list, max_transcribe_seconds: float) -> dict:
+    """在独立子进程中执行：冷加载模型，再逐个转录，记录 RTF 与峰值内存。"""
+    import torch
+
+    from src import metrics
+    from src.core import _load_model_cached, process_audio
+
+    torch.manual_seed(0)
+    rss_before = metrics.current_rss_bytes() or 0
+    started = time.perf_counter()
+    _load_model_cached(model_name)
+    load_seconds = time.perf_counter() - started
+    model_rss = (metrics.current_rss_bytes() or 0) - rss_before
+
+    results = {
+        "load_seconds": round(load_seconds, 3),
+        "model_rss_mb": _mb(model_rss),
+        "cases": {},
+    }
+    for name, path, seconds in cases:
+        if seconds > max_transcribe_seconds:
+            continue
+        with _PeakRssSampler() as rss:
+            started = time.perf_counter()
+            process_audio(path, model_name=model_name, verbose=None)
+            elapsed = time.perf_counter() - started
+        results["cases"][name] = {
+            "audio_seconds": seconds,
+            "transcribe_seconds": round(elapsed, 3),
+            "rtf": round(elapsed / seconds, 4),
+            "peak_rss_mb": _mb(rss.peak),
+        }
+    return results
+
+
+def _run_isolated(func, *args):
+    """每组测量放在 spawn 出来的新进程里，互不共享模型缓存与内存峰值。"""
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(func, args)
+
+
+def _environment() -> dict:
+    import numpy
+    import torch
+    import whisper
+
+    from src import core
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "whisper": getattr(whisper, "__version__", "unknown"),
+        "numpy": numpy.__version__,
+        "device": core._get_device(),
+        "inference_workers": core.INFERENCE_WORKERS,
+        "torch_threads_per_worker": core.TORCH_THREADS_PER_WORKER,
+        "long_audio_threshold": core.LONG_AUDIO_THRESHOLD,
+        "long_audio_chunk_seconds": core.LONG_AUDIO_CHUNK_SECONDS,
+    }
+
+
+def _flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not key == "audio_seconds":
+            flat[path] = value
+    return flat
+
+
+def _floor_for(metric: str) -> float:
+    if metric.endswith("_mb"):
+        return _ABSOLUTE_FLOOR["mb"]
+    if metric.endswith("rtf"):
+        return _ABSOLUTE_FLOOR["rtf"]
+    return _ABSOLUTE_FLOOR["seconds"]
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """返回回退项列表 [(指标, 基线值, 当前值)]；所有指标都是越小越好。"""
+    current = _flatten(results)
+    regressions = []
+    for metric, base_value in _flatten(baseline).items():
+        value = current.get(metric)
+        if value is None:
+            continue
+        if value > base_value * (1 + tolerance) and value - base_value > _floor_for(metric):
+            regressions.append((metric, base_value, value))
+    return regressions
+
+
+def main():
+    """主函数：生成音频、执行测量、输出并对比结果"""
+    parser = argparse.ArgumentParser(description='Whisper 转录流水线基准测试')
+    parser.add_argument('--models', type=str, default='tiny,base', help='要测试的模型，逗号分隔（默认: tiny,base）')
+    parser.add_argument(
+        '--signals',
+        type=str,
+        default=','.join(SIGNALS),
+        help=f'测试音频类型，逗号分隔（默认: {",".join(SIGNALS)}）'
+    )
+    parser.add_argument(
+        '--durations',
+        type=str,
+        default=DEFAULT_DURATIONS,
+        help=f'测试音频时长（秒），逗号分隔（默认: {DEFAULT_DURATIONS}）'
+    )
+    parser.add_argument(
+        '--max-transcribe-seconds',
+        type=float,
+        default=600,
+        help='超过该时长的音频只测解码不测转录（默认: 600）'
+    )
+    parser.add_argument('--repeat', type=int, default=3, help='解码/转换测量重复次数，取中位数（默认: 3）')
+    parser.add_argument(
+        '--audio-cache',
+        type=str,
+        default=os.path.join(os.path.dirname(__file__), '.audio'),
+        help='合成音频缓存目录'
+    )
+    parser.add_argument('--output', type=str, default=None, help='结果 JSON 输出路径（默认打印到标准输出）')
+    parser.add_argument('--baseline', type=str, default=None, help='与该基线 JSON 对比，出现回退时退出码为 1')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的相对退化比例（默认: 0.2 即 20%%）')
+    parser.add_argument('--save-baseline', type=str, default=None, help='把本次结果另存为基线')
+
+    args = parser.parse_args()
+
+    cases = []
+    for signal in [s.strip() for s in args.signals.split(',') if s.strip()]:
+        for seconds in [float(d) for d in args.durations.split(',') if d.strip()]:
+            print(f"准备测试音频: {signal} {int(seconds)}s", file=sys.stderr)
+            path = ensure_audio(args.audio_cache, signal, seconds)
+            cases.append((f"{signal}_{int(seconds)}s", path, seconds))
+
+    print("测量解码与 PCM 转换...", file=sys.stderr)
+    results = {"decode": _run_isolated(_bench_decode, cases, max(1, args.repeat)), "models": {}}
+    for model_name in [m.strip() for m in args.models.split(',') if m.strip()]:
+        print(f"测量模型 {model_name}...", file=sys.stderr)
+        results["models"][model_name] = _run_isolated(
+            _bench_model, model_name, cases, args.max_transcribe_seconds
+        )
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": _environment(),
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline["results"], args.tolerance)
+        if regressions:
+            print("=" * 60, file=sys.stderr)
+            print(f"性能回退（容差 {args.tolerance:.0%}）:", file=sys.stderr)
+            for metric, base_value, value in regressions:
+                print(f"  {metric}: {base_value} -> {value} (+{(value / base_value - 1) if base_value else float('inf'):.0%})", file=sys.stderr)
+            print("=" * 60, file=sys.stderr)
+            sys.exit(1)
+        print(f"与基线对比无回退（容差 {args.tolerance:.0%}）", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+基准测试音频合成
+在本地生成可复现的测试音频（固定随机种子），不依赖外部素材或 TTS：
+- tone: 多个正弦扫频叠加
+- noise: 粉红噪声
+- speech: 类语音信号（基频+谐波、共振峰包络、约 4Hz 音节节奏、词间停顿）
+- silence: 长静音中夹少量类语音片段
+"""
+import os
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+SIGNALS = ("tone", "noise", "speech", "silence")
+# 分块生成写盘，2 小时的音频也只占一个块的内存
+_BLOCK_SECONDS = 10
+
+
+def _tone_block(rng, t: np.ndarray) -> np.ndarray:
+    out = np.zeros_like(t)
+    for base in (220.0, 440.0, 880.0):
+        # 以 20 秒为周期在 [base, 2*base] 内缓慢扫频
+        freq = base * (1.5 + 0.5 * np.sin(2 * np.pi * t / 20.0))
+        out += np.sin(2 * np.pi * freq * t) / 3
+    return 0.3 * out
+
+
+def _pink_noise(rng, n: int) -> np.ndarray:
+    white = rng.standard_normal(n)
+    spectrum = np.fft.rfft(white)
+    spectrum /= np.sqrt(np.arange(1, len(spectrum) + 1))
+    pink = np.fft.irfft(spectrum, n)
+    return 0.2 * pink / (np.abs(pink).max() + 1e-9)
+
+
+def _speech_block(rng, t: np.ndarray) -> np.ndarray:
+    # 基频随语调缓慢起伏（100~220Hz），叠加前 12 次谐波并按两个"共振峰"加权
+    f0 = 160 + 60 * np.sin(2 * np.pi * t * 0.3 + rng.uniform(0, np.pi))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    formant1, formant2 = rng.uniform(500, 900), rng.uniform(1200, 2400)
+    voiced = np.zeros_like(t)
+    for k in range(1, 13):
+        hk = k * f0
+        weight = np.exp(-(((hk - formant1) / 300) ** 2)) + 0.5 * np.exp(-(((hk - formant2) / 400) ** 2))
+        voiced += weight * np.sin(k * phase)
+    # 约 4Hz 的音节包络 + 随机词间停顿
+    syllables = np.clip(np.sin(2 * np.pi * 4.0 * t + rng.uniform(0, np.pi)), 0, None) ** 2
+    word_gate = np.repeat(
+        rng.random(int(np.ceil(len(t) / (SAMPLE_RATE * 0.6)))) > 0.2,
+        int(SAMPLE_RATE * 0.6),
+    )[: len(t)]
+    breath = 0.02 * rng.standard_normal(len(t))
+    out = voiced * syllables * word_gate + breath
+    return 0.3 * out / (np.abs(out).max() + 1e-9)
+
+
+def _silence_block(rng, t: np.ndarray) -> np.ndarray:
+    out = 0.001 * rng.standard_normal(len(t))
+    # 每个块里最多一段 1~3 秒的"说话"
+    if rng.random() < 0.3:
+        length = int(rng.uniform(1, 3) * SAMPLE_RATE)
+        start = int(rng.integers(0, max(1, len(t) - length)))
+        out[start : start + length] += _speech_block(rng, t[start : start + length])
+    return out
+
+
+def synthesize(path: str, signal: str, seconds: float, seed: int = 0) -> str:
+    """生成 16kHz 单声道 16 位 WAV；同样的 (signal, seconds, seed) 得到逐字节相同的文件。"""
+    if signal not in SIGNALS:
+        raise ValueError(f"未知信号类型: {signal}，可选: {', '.join(SIGNALS)}")
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    block = _BLOCK_SECONDS * SAMPLE_RATE
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        for start in range(0, total, block):
+            n = min(block, total - start)
+            t = (start + np.arange(n)) / SAMPLE_RATE
+            if signal == "tone":
+                samples = _tone_block(rng, t)
+            elif signal == "noise":
+                samples = _pink_noise(rng, n)
+            elif signal == "speech":
+                samples = _speech_block(rng, t)
+            else:
+                samples = _silence_block(rng, t)
+            wav.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return path
+
+
+def ensure_audio(cache_dir: str, signal: str, seconds: float, seed: int = 0) -> str:
+    """按需生成并缓存测试音频，已存在则直接复用。"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{signal}_{int(seconds)}s_seed{seed}.wav")
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        synthesize(tmp_path, signal, seconds, seed)
+        os.replace(tmp_path, path)
+    return path
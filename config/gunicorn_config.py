@@ -7,6 +7,9 @@ import os
 
 # 服务器配置
 bind = "0.0.0.0:18000"
+# 拆分部署：设置 WHISPER_MODEL_SERVER 后 HTTP worker 只负责上传与调度，
+# 模型由独立的推理服务进程（scripts/run_model_server.py）持有，worker 多开不再成倍占用模型内存。
+# 未设置时每个 worker 各自加载模型，建议减少 worker 数量。
 workers = multiprocessing.cpu_count() * 2 + 1  # 推荐公式
 worker_class = "uvicorn.workers.UvicornWorker"  # 使用 Uvicorn worker
 worker_connections = 1000
@@ -0,0 +1,126 @@
+"""
+量化模型对比脚本
+对同一批音频分别用原始模型与 int8 量化变体转录，输出速度、内存与文本差异
+
+仓库不附带参考结果：int8 变体的加速比、内存节省与准确率变化只在真实 checkpoint 上有意义，
+需用本脚本在目标机器与业务音频上实测（随机初始化的模型上测得的数字不代表真实模型）。
+差异率是相对原始模型输出的词/字编辑距离，不是相对人工标注的错误率；需要评估准确率时，
+另用带标注的音频计算两者各自的 WER。
+"""
+import sys
+import os
+import argparse
+import gc
+import io
+import json
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import torch
+
+from src import metrics
+from src.core import (
+    QUANTIZED_SUFFIX,
+    _load_audio_with_timeout,
+    _load_whisper_model,
+    _WHISPER_SAMPLE_RATE,
+    build_transcribe_options,
+)
+from src.text_diff import edit_distance, split_tokens
+
+
+def _state_dict_bytes(model) -> int:
+    """模型权重序列化后的字节数（量化层的打包权重也计入）。"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def _run(model_name: str, audios: list, transcribe_kwargs: dict) -> dict:
+    gc.collect()
+    rss_before = metrics.current_rss_bytes()
+    started = time.perf_counter()
+    model = _load_whisper_model(model_name)
+    load_seconds = time.perf_counter() - started
+    rss_after = metrics.current_rss_bytes()
+
+    texts = []
+    started = time.perf_counter()
+    for audio in audios:
+        result = model.transcribe(audio, verbose=None, **transcribe_kwargs)
+        texts.append(result["text"].strip())
+    transcribe_seconds = time.perf_counter() - started
+    audio_seconds = sum(len(a) for a in audios) / _WHISPER_SAMPLE_RATE
+
+    report = {
+        "model": model_name,
+        "load_seconds": round(load_seconds, 3),
+        "weights_mb": round(_state_dict_bytes(model) / 1024 / 1024, 1),
+        "rss_delta_mb": (
+            round((rss_after - rss_before) / 1024 / 1024, 1)
+            if rss_before is not None and rss_after is not None
+            else None
+        ),
+        "transcribe_seconds": round(transcribe_seconds, 3),
+        "realtime_factor": round(transcribe_seconds / audio_seconds, 4) if audio_seconds else None,
+        "texts": texts,
+    }
+    del model
+    gc.collect()
+    return report
+
+
+def main():
+    """主函数：逐个模型对比原始与量化版本"""
+    parser = argparse.ArgumentParser(description='对比 Whisper 原始模型与 int8 量化模型')
+    parser.add_argument('audio', nargs='+', help='用于对比的音频文件')
+    parser.add_argument(
+        '--models',
+        type=str,
+        default='base,small',
+        help='要对比的原始模型名称，逗号分隔（默认: base,small）'
+    )
+    parser.add_argument('--language', type=str, default='自动检测', help='语言选项：自动检测/英语/西班牙语')
+    parser.add_argument('--json', type=str, default=None, help='把完整结果写入该 JSON 文件')
+
+    args = parser.parse_args()
+
+    audios = [_load_audio_with_timeout(path) for path in args.audio]
+    reports = []
+    for base_name in [m.strip() for m in args.models.split(',') if m.strip()]:
+        quantized_name = base_name + QUANTIZED_SUFFIX
+        _, transcribe_kwargs = build_transcribe_options(args.language, None, quantized_name)
+        # 两边使用同样的 CPU/fp32 设置，差异只来自量化
+        baseline = _run(base_name, audios, {**transcribe_kwargs, 'fp16': False})
+        quantized = _run(quantized_name, audios, transcribe_kwargs)
+
+        errors = total = 0
+        for ref, hyp in zip(baseline['texts'], quantized['texts']):
+            ref_tokens = split_tokens(ref)
+            errors += edit_distance(ref_tokens, split_tokens(hyp))
+            total += len(ref_tokens)
+        diff_rate = errors / total if total else 0.0
+
+        print("=" * 60)
+        print(f"{base_name}  vs  {quantized_name}")
+        for report in (baseline, quantized):
+            print(
+                f"  {report['model']:<14} 加载 {report['load_seconds']:>7.2f}s"
+                f"  权重 {report['weights_mb']:>8.1f}MB"
+                f"  RSS 增量 {report['rss_delta_mb']}MB"
+                f"  RTF {report['realtime_factor']}"
+            )
+        if baseline['transcribe_seconds'] and quantized['transcribe_seconds']:
+            print(f"  加速比 {baseline['transcribe_seconds'] / quantized['transcribe_seconds']:.2f}x")
+        print(f"  相对原始模型的词/字差异率 {diff_rate:.2%}（非相对人工标注的错误率）")
+        reports.append({'baseline': baseline, 'quantized': quantized, 'diff_rate': diff_rate})
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
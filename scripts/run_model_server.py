@@ -0,0 +1,41 @@
+"""
+推理服务启动脚本
+拆分部署时运行：模型只在本进程加载一次，HTTP worker 通过 WHISPER_MODEL_SERVER 连接
+"""
+import sys
+import os
+import argparse
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.model_server import serve
+
+
+def main():
+    """主函数：启动推理服务"""
+    default_address = (
+        r'\\.\pipe\whisper-model-server'
+        if sys.platform == 'win32'
+        else '/tmp/whisper-model-server.sock'
+    )
+    parser = argparse.ArgumentParser(description='启动 Whisper 推理服务')
+    parser.add_argument(
+        '--address',
+        type=str,
+        default=default_address,
+        help=f'监听地址，Unix socket 路径或 Windows 命名管道（默认: {default_address}）'
+    )
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"推理服务启动中... (地址: {args.address})")
+    print("HTTP 服务需设置环境变量 WHISPER_MODEL_SERVER 为该地址")
+    print("=" * 60)
+
+    serve(args.address)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,20 @@ FastAPI HTTP API 模块
 """
 
 from pathlib import Path
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import hashlib
 import json
+import math
+import shutil
 import sys
 import tempfile
-from typing import Optional, Dict
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional, Dict, List
 import torch
 import asyncio
 import gc
@@ -20,19 +26,63 @@ import gc
 _UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 
-async def _save_upload_to_path(file: UploadFile, dest_path: str):
-    """分块将上传文件写入磁盘，降低大文件的内存峰值。"""
+async def _save_upload_to_path(file: UploadFile, dest_path: str, decoder=None) -> str:
+    """分块将上传文件写入磁盘，降低大文件的内存峰值；返回内容的 sha256 十六进制摘要。
+
+    传入 decoder（StreamingDecoder）时每个分块同时送入 ffmpeg，解码与上传并行。
+    """
+    digest = result_cache.new_digest()
+    total_bytes = 0
+    started = time.perf_counter()
     with open(dest_path, "wb") as out:
         while True:
             chunk = await file.read(_UPLOAD_CHUNK_SIZE)
             if not chunk:
                 break
             out.write(chunk)
+            digest.update(chunk)
+            total_bytes += len(chunk)
+            if decoder is not None and not decoder.try_feed(chunk):
+                # ffmpeg 暂时跟不上，在线程中等待队列空位，不阻塞事件循环
+                await asyncio.to_thread(decoder.feed, chunk)
+    metrics.UPLOAD_SECONDS.observe(time.perf_counter() - started)
+    metrics.UPLOAD_BYTES.observe(total_bytes)
+    return digest.hexdigest()
+
+
+async def _save_upload_and_decode(
+    file: UploadFile, dest_path: str, pcm_path: Optional[str] = None
+) -> tuple[str, Optional[str]]:
+    """保存上传的同时解码为 PCM，返回 (内容摘要, PCM 路径)。
+
+    管道解码失败（部分容器格式需要随机读取）、未开启或流式解码名额已满时 PCM 路径为 None，
+    之后按原流程从落盘文件解码。
+    """
+    decoder = StreamingDecoder.start(pcm_path) if STREAM_DECODE_UPLOADS else None
+    if decoder is None:
+        return await _save_upload_to_path(file, dest_path), None
+    try:
+        digest = await _save_upload_to_path(file, dest_path, decoder)
+    except BaseException:
+        await asyncio.to_thread(decoder.abort)
+        raise
+    return digest, await asyncio.to_thread(decoder.finish)
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.core import process_audio, get_language_display, release_model
+from src.core import (
+    DECODE_WORKERS,
+    INFERENCE_WORKERS,
+    CancelToken,
+    StreamingDecoder,
+    get_language_display,
+    probe_duration,
+    release_model,
+)
+from src import metrics, model_server, output_writers, result_cache
+from src.engines import ENGINES, split_model_name
+from src.task_store import open_task_store
 
 TASK_STATUS = {}
 RUNNING_TASKS: Dict[str, asyncio.Task] = {}
@@ -41,6 +91,48 @@ _STATUS_CLEANUP_SCHEDULED: set = set()
 TASK_DIR = Path("./storage/tasks")
 STATUS_RETENTION_SECONDS = 3600
 TASK_FILE_RETENTION_SECONDS = 86400
+# 任务元数据库（SQLite/WAL），替代每个任务目录里反复整体重写的 status.json
+TASK_DB_PATH = Path(os.environ.get("WHISPER_TASK_DB", str(TASK_DIR.parent / "tasks.db")))
+# 任务状态与队列后端：sqlite（默认，同一台机器上的多个实例/worker 共用 TASK_DB_PATH）
+# 或 redis（多台机器，任务目录需放在共享存储上）。任一实例都能受理、执行、查询与取消任意任务
+TASK_BACKEND = os.environ.get("WHISPER_TASK_BACKEND", "sqlite").strip().lower()
+TASK_REDIS_URL = os.environ.get("WHISPER_REDIS_URL", "redis://127.0.0.1:6379/0")
+# 1 表示 WHISPER_REDIS_URL 指向 Redis Cluster（任务库的键带 hash tag，整体落在一个 slot 上）
+TASK_REDIS_CLUSTER = os.environ.get("WHISPER_REDIS_CLUSTER", "0").strip() == "1"
+TASK_STORE = open_task_store(
+    TASK_BACKEND,
+    TASK_DB_PATH,
+    TASK_REDIS_URL,
+    TASK_FILE_RETENTION_SECONDS,
+    redis_cluster=TASK_REDIS_CLUSTER,
+)
+# 单线程写入：保证同一任务的状态按提交顺序落盘，且不阻塞事件循环
+_task_store_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-store")
+_TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+# 异步任务已产出的分段（供 /stream 回放），同时逐行追加到任务目录的 segments.jsonl，
+# 内存状态清理后迟到的订阅者仍可从文件回放
+TASK_SEGMENTS: Dict[str, list] = {}
+SEGMENTS_FILE_NAME = output_writers.JsonLinesWriter.filename
+# 等待新分段/状态变化的订阅者：触发时整体替换，相当于一次广播
+_TASK_STREAM_EVENTS: Dict[str, asyncio.Event] = {}
+# 每个任务当前的等待者数；最后一个等待者离开时删除其事件，轮询已结束的任务不会让事件表只增不减
+_TASK_STREAM_WAITERS: Dict[str, int] = {}
+# SSE 心跳间隔，防止代理因长时间无数据断开连接
+_STREAM_KEEPALIVE_SECONDS = 15
+# 状态接口长轮询（?wait=）的最长等待秒数
+STATUS_MAX_WAIT_SECONDS = 60
+# 任务目录文件列表缓存：task_step_id -> (缓存时的任务状态, 文件列表)
+_TASK_FILES: Dict[str, tuple] = {}
+_AUDIO_FILE_SUFFIXES = (".mp3", ".wav", ".m4a", ".flac", ".ogg", ".mp4")
+# 断点续转：入队时把任务参数写入 job.json，长音频每转完一段把进度写入 checkpoint.json；
+# 任务结束（完成/失败/取消）后删除。进程被回收或重启后，仍留有 job.json 的任务会被重新发现并续转
+JOB_FILE_NAME = "job.json"
+CHECKPOINT_FILE_NAME = "checkpoint.json"
+# 服务正在关闭：此时被中断的任务保持未完成状态，留待重启后恢复，而不是标记为已取消
+_SHUTTING_DOWN = False
+# 任务被取消后最多等待推理线程多少秒退出（通常在一个 30 秒解码窗口内）
+_CANCEL_GRACE_SECONDS = 30
 
 
 def _read_int_env(name: str, default: int) -> int:
@@ -50,11 +142,83 @@ def _read_int_env(name: str, default: int) -> int:
         return default
 
 
+def _read_float_env(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.environ.get(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
 # 空闲多少秒后卸载已缓存的模型并归还内存。0 表示任务一空闲就立即卸载。
 # 卸载后下次请求会重新加载模型（有冷启动开销），用内存换常驻占用。
 MODEL_IDLE_TIMEOUT = _read_int_env("WHISPER_MODEL_IDLE_TIMEOUT", 60)
 _model_release_handle: Optional[asyncio.TimerHandle] = None
 
+# 任务心跳间隔（秒）：持有任务的进程定期刷新心跳，超过 3 个间隔没有心跳的未完成任务
+# 视为持有者已退出（worker 被回收/超时杀死、服务重启），由其它或重启后的进程接管续转
+TASK_HEARTBEAT_SECONDS = max(1, _read_int_env("WHISPER_TASK_HEARTBEAT_SECONDS", 30))
+
+# 上传时是否同时把数据送入 ffmpeg 解码（1 开启），上传完成时 PCM 基本就绪
+STREAM_DECODE_UPLOADS = _read_int_env("WHISPER_STREAM_DECODE", 1) > 0
+
+# 异步任务队列：最多允许多少个任务排队等待，超出时 /transcribe_start 返回 429
+JOB_QUEUE_MAX = _read_int_env("WHISPER_JOB_QUEUE_MAX", 32)
+# /transcribe_batch 单次最多接受的文件数
+BATCH_MAX_FILES = max(1, _read_int_env("WHISPER_BATCH_MAX_FILES", 64))
+# 同时执行的异步任务数，默认为推理 worker 数 + 解码并发数：
+# 推理槽位占满时，后面的任务先进入解码阶段预取，推理一空出来就能接上
+JOB_CONCURRENCY = max(
+    1, _read_int_env("WHISPER_JOB_CONCURRENCY", INFERENCE_WORKERS + DECODE_WORKERS)
+)
+# 排队中的任务保存在 TASK_STORE 的共享队列里（值为 run_transcribe_task 的参数），
+# 各实例空闲的 worker 主动领取，哪个实例有空就由哪个实例执行。
+# 本实例入队时立即唤醒本地 worker；其它实例入队的任务最迟在一个轮询间隔后被领取
+_jobs_available = asyncio.Event()
+_job_workers: list = []
+# 共享队列与跨实例状态/取消请求的轮询间隔（秒）
+TASK_POLL_SECONDS = max(1, _read_int_env("WHISPER_TASK_POLL_SECONDS", 1))
+# 取消其它实例上的任务时，最多等待几个轮询间隔让对方完成取消
+_REMOTE_CANCEL_WAIT_POLLS = 5
+# 队列计数，供 /health 与容量规划使用
+QUEUE_STATS = {
+    "accepted": 0,
+    "rejected": 0,
+    "completed": 0,
+    "failed": 0,
+    "cancelled": 0,
+}
+# 排队快照：task_step_id -> (前面的任务数, 队列长度, 前面任务的预计处理秒数之和)。
+# 队列变化（入队、领取、取消）时与每个轮询间隔整体重算一次，状态查询与长轮询直接读快照，
+# 请求数再多也不会逐个扫描共享队列；其它实例造成的变化最迟一个轮询间隔后可见
+_queue_snapshot: Dict[str, tuple] = {}
+_queue_snapshot_lock = asyncio.Lock()
+# 单个任务执行耗时的指数滑动平均（秒），用于估算排队等待时间
+_avg_job_seconds = 60.0
+_JOB_SECONDS_SMOOTHING = 0.2
+
+# 排队调度策略（逗号分隔，可组合）：fifo 先到先得；sjf 预计处理时间短的优先；
+# priority 按提交时的 priority 字段。各策略统一折算成"等效到达时刻"，从小到大执行：
+#   sort_key = 入队时刻 + 预计处理秒数 × WHISPER_SJF_WEIGHT − priority × WHISPER_PRIORITY_SECONDS
+# 入队时刻本身就是老化项：长任务最多被推迟"预计处理秒数 × 权重"，之后新来的短任务不再插到它前面。
+# 同一个 sort_key 也决定长音频各分段等待推理槽位的顺序，短任务不会一直排在长任务的分段后面
+_SCHEDULER_POLICIES = ("fifo", "sjf", "priority")
+SCHEDULER_POLICY = frozenset(
+    p.strip() for p in os.environ.get("WHISPER_SCHEDULER", "sjf").split(",") if p.strip()
+)
+if not SCHEDULER_POLICY <= set(_SCHEDULER_POLICIES):
+    raise ValueError(
+        f"未知的调度策略: {os.environ.get('WHISPER_SCHEDULER')}，"
+        f"可选: {', '.join(_SCHEDULER_POLICIES)}（可用逗号组合）"
+    )
+SJF_WEIGHT = _read_float_env("WHISPER_SJF_WEIGHT", 1.0)
+PRIORITY_SECONDS = _read_float_env("WHISPER_PRIORITY_SECONDS", 600)
+# 各模型实测实时率（纯推理耗时 / 音频时长）的指数滑动平均，用于排序与 ETA；每个实例各自统计
+_model_rtf: Dict[str, float] = {}
+# 还没有实测数据时的保守估计
+_DEFAULT_RTF = 1.0
+# 推理耗时过短的样本（极短音频）计时误差占比大，不计入实时率
+_RTF_MIN_SAMPLE_SECONDS = 1.0
+
 
 def _cancel_idle_model_release():
     """有新任务进入时取消待执行的模型卸载。"""
@@ -67,16 +231,17 @@ def _cancel_idle_model_release():
 def _do_idle_model_release():
     global _model_release_handle
     _model_release_handle = None
-    if RUNNING_TASKS:
+    if RUNNING_TASKS or _queue_snapshot or model_server.is_remote():
+        # 拆分部署时模型由推理服务持有并自行空闲卸载
         return
     # 在线程中卸载，避免释放大模型时阻塞事件循环
     asyncio.create_task(asyncio.to_thread(release_model))
 
 
 def _schedule_idle_model_release():
-    """当没有运行中的任务时，调度一次（防抖的）模型卸载。"""
+    """当没有运行中或排队中的任务时，调度一次（防抖的）模型卸载。"""
     global _model_release_handle
-    if RUNNING_TASKS:
+    if RUNNING_TASKS or _queue_snapshot:
         return
     try:
         loop = asyncio.get_running_loop()
@@ -91,6 +256,9 @@ async def _cleanup_task_status_after(task_step_id: str, delay_seconds: int):
         await asyncio.sleep(delay_seconds)
     finally:
         TASK_STATUS.pop(task_step_id, None)
+        TASK_SEGMENTS.pop(task_step_id, None)
+        _TASK_FILES.pop(task_step_id, None)
+        _TASK_STREAM_EVENTS.pop(task_step_id, None)
         _STATUS_CLEANUP_SCHEDULED.discard(task_step_id)
 
 
@@ -106,58 +274,201 @@ def _schedule_status_cleanup(task_step_id: str, delay_seconds: int = STATUS_RETE
     loop.create_task(_cleanup_task_status_after(task_step_id, delay_seconds))
 
 
+def _remove_expired_tasks() -> int:
+    """按 expires_at 索引删除过期任务记录，并删除对应的任务目录。"""
+    expired = TASK_STORE.delete_expired()
+    for task_step_id in expired:
+        shutil.rmtree(TASK_DIR / task_step_id, ignore_errors=True)
+        _TASK_FILES.pop(task_step_id, None)
+    return len(expired)
+
+
 async def _cleanup_old_task_files_loop():
-    import time
-    import shutil
     while True:
         await asyncio.sleep(3600)
         try:
-            if not TASK_DIR.exists():
-                continue
-            now = time.time()
-            for task_path in TASK_DIR.iterdir():
-                if not task_path.is_dir():
-                    continue
-                try:
-                    mtime = task_path.stat().st_mtime
-                    if now - mtime > TASK_FILE_RETENTION_SECONDS:
-                        shutil.rmtree(task_path)
-                except Exception:
-                    pass
+            await asyncio.to_thread(_remove_expired_tasks)
         except Exception:
             pass
 
 
 def update_task_status(task_step_id: str, **fields):
+    """更新任务状态，返回持久化的 Future（需要确认已写入任务库时可等待它）。"""
     TASK_STATUS.setdefault(task_step_id, {})
     TASK_STATUS[task_step_id].update(fields)
-    task_path = TASK_DIR / task_step_id
-    task_path.mkdir(parents=True, exist_ok=True)
-    (task_path / "status.json").write_text(
-        json.dumps(TASK_STATUS[task_step_id], ensure_ascii=False), encoding="utf-8"
+    # 内存状态立即可读；持久化交给写线程，事件循环上不做磁盘 IO
+    future = _task_store_writer.submit(
+        TASK_STORE.upsert, task_step_id, dict(TASK_STATUS[task_step_id])
     )
+    _notify_task_stream(task_step_id)
+    return future
 
 
-def get_task_status(task_step_id: str) -> dict:
-    """获取任务状态，优先从内存读取，如果不存在则从文件读取"""
-    # 先尝试从内存读取
-    if task_step_id in TASK_STATUS:
-        return TASK_STATUS[task_step_id]
+def _notify_task_stream(task_step_id: str):
+    """唤醒该任务所有正在等待的 /stream 订阅者。"""
+    event = _TASK_STREAM_EVENTS.pop(task_step_id, None)
+    if event is not None:
+        event.set()
 
-    # 从文件读取
-    task_path = TASK_DIR / task_step_id
-    status_file = task_path / "status.json"
 
-    if status_file.exists():
+@contextmanager
+def _watching_task_stream(task_step_id: str):
+    """登记一个等待该任务变化的长轮询/订阅者，退出时若已无其它等待者则删除事件。"""
+    _TASK_STREAM_WAITERS[task_step_id] = _TASK_STREAM_WAITERS.get(task_step_id, 0) + 1
+    try:
+        yield
+    finally:
+        remaining = _TASK_STREAM_WAITERS.pop(task_step_id) - 1
+        if remaining:
+            _TASK_STREAM_WAITERS[task_step_id] = remaining
+        else:
+            _TASK_STREAM_EVENTS.pop(task_step_id, None)
+
+
+def _append_task_segment(task_step_id: str, segment: dict):
+    TASK_SEGMENTS.setdefault(task_step_id, []).append(segment)
+    _notify_task_stream(task_step_id)
+
+
+def _make_segment_callback(
+    task_step_id: str,
+    loop: asyncio.AbstractEventLoop,
+    outputs: output_writers.TaskOutputs,
+):
+    """生成在推理线程中调用的分段回调：追加写入各格式的结果文件（含 segments.jsonl），
+    并转交事件循环通知订阅者。"""
+    # 同一 task_step_id 重新提交时从头开始（结果文件由 TaskOutputs 打开时截断）
+    TASK_SEGMENTS[task_step_id] = []
+
+    def _on_segment(segment: dict):
+        outputs.write(segment)
+        loop.call_soon_threadsafe(_append_task_segment, task_step_id, segment)
+
+    return _on_segment
+
+
+def _write_json_atomic(path: Path, data: dict):
+    """先写临时文件再原子替换，进程在任何时刻退出都不会留下半个文件。"""
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _remove_resume_files(task_step_id: str, pcm_path: Optional[str] = None):
+    """删除续转所需的 job.json 与 checkpoint.json（以及上传时解码出的 PCM）。
+
+    在事件循环里通过 _task_store_writer 调用，与同一任务的其它文件写入保持先后顺序。
+    """
+    paths = [TASK_DIR / task_step_id / name for name in (JOB_FILE_NAME, CHECKPOINT_FILE_NAME)]
+    if pcm_path:
+        paths.append(pcm_path)
+    for path in paths:
         try:
-            status_data = json.loads(status_file.read_text(encoding="utf-8"))
-            # 更新内存中的状态，并调度清理，避免轮询历史任务导致内存只增不减
-            TASK_STATUS[task_step_id] = status_data
-            _schedule_status_cleanup(task_step_id)
-            return status_data
-        except Exception:
+            os.unlink(path)
+        except OSError:
             pass
 
+
+def _make_timing_callback(model_name: str, loop: asyncio.AbstractEventLoop):
+    """生成在推理线程中调用的耗时回调：按纯推理耗时（不含上传、解码与排队等待）更新该模型的
+    实时率估计。命中结果缓存或合并到他人计算的任务不会调用，不产生样本。"""
+
+    def _on_timing(inference_seconds: float, audio_seconds: float):
+        loop.call_soon_threadsafe(_record_rtf, model_name, audio_seconds, inference_seconds)
+
+    return _on_timing
+
+
+def _make_progress_callback(task_step_id: str, outputs: output_writers.TaskOutputs):
+    """生成在推理线程中调用的进度回调：每转完一段长音频就把续转位置与已写出的分段数
+    写入 checkpoint.json（该段的分段此时已写入结果文件）。"""
+    checkpoint_path = TASK_DIR / task_step_id / CHECKPOINT_FILE_NAME
+
+    def _on_progress(resume_sample: int):
+        _write_json_atomic(
+            checkpoint_path, {"resume_sample": resume_sample, "segments": outputs.count}
+        )
+
+    return _on_progress
+
+
+def _load_checkpoint(task_step_id: str) -> tuple[int, list]:
+    """读取检查点，返回 (续转起点, 检查点之前已写出的分段)；没有可用的检查点时为 (0, [])。
+
+    必须在 TaskOutputs 截断结果文件之前调用。
+    """
+    task_path = TASK_DIR / task_step_id
+    try:
+        checkpoint = json.loads((task_path / CHECKPOINT_FILE_NAME).read_text(encoding="utf-8"))
+        resume_sample = int(checkpoint["resume_sample"])
+        count = int(checkpoint["segments"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return 0, []
+    segments = []
+    try:
+        with open(task_path / SEGMENTS_FILE_NAME, encoding="utf-8") as f:
+            for line in f:
+                if len(segments) >= count:
+                    break
+                segments.append(json.loads(line))
+    except (OSError, ValueError):
+        return 0, []
+    if len(segments) < count:
+        return 0, []
+    return resume_sample, segments
+
+
+def _download_url(task_step_id: str, file_type: str) -> str:
+    return f"/task/{task_step_id}/download/{file_type}"
+
+
+async def _load_task_segments(task_step_id: str) -> list:
+    """获取任务已产出的分段，优先内存，否则在线程中从 segments.jsonl 读取。"""
+    segments = TASK_SEGMENTS.get(task_step_id)
+    if segments is not None:
+        return segments
+    return await asyncio.to_thread(_read_task_segments_file, task_step_id)
+
+
+def _read_task_segments_file(task_step_id: str) -> list:
+    segments_path = TASK_DIR / task_step_id / SEGMENTS_FILE_NAME
+    if not segments_path.exists():
+        return []
+    segments = []
+    with open(segments_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                segments.append(json.loads(line))
+            except ValueError:
+                # 进程中途退出可能留下半行，忽略
+                continue
+    return segments
+
+
+async def get_task_status(task_step_id: str) -> dict:
+    """获取任务状态：本实例正在执行或已结束的任务读内存，否则按主键查询任务库
+    （排队中的任务可能已被其它实例领取并推进）。查询在线程中执行，Redis 后端是一次网络往返，
+    不能阻塞事件循环"""
+    cached = TASK_STATUS.get(task_step_id)
+    if cached is not None and (
+        task_step_id in RUNNING_TASKS or cached.get("status") in _TERMINAL_STATUSES
+    ):
+        return cached
+
+    # 主键查询；WAL 模式下读不会被写线程阻塞
+    try:
+        status_data = await asyncio.to_thread(TASK_STORE.get, task_step_id)
+    except Exception:
+        status_data = None
+    if status_data is None and cached is not None:
+        # 刚创建的任务状态可能还在写线程里，尚未落库
+        return cached
+    if status_data is not None:
+        # 更新内存中的状态，并调度清理，避免轮询历史任务导致内存只增不减
+        TASK_STATUS[task_step_id] = status_data
+        _schedule_status_cleanup(task_step_id)
+        return status_data
+
     # 如果都不存在，返回 None
     return None
 
@@ -169,57 +480,118 @@ async def run_transcribe_task(
     language_choice: str,
     include_timestamps: bool,
     initial_prompt: Optional[str] = None,
+    audio_digest: Optional[str] = None,
+    pcm_path: Optional[str] = None,
+    resume: bool = False,
+    sort_key: Optional[float] = None,
 ):
-    """后台任务：执行转录并保存结果"""
+    """后台任务：执行转录，结果按分段增量写入任务目录下的各格式文件
+
+    resume 为 True 时（重启后恢复的任务）从 checkpoint.json 续转：检查点之前的分段
+    原样写回结果文件，只转录剩余的音频。sort_key 为入队时计算的调度顺序，
+    等待推理槽位时沿用。
+    """
+    outputs = None
     try:
+        # 先创建结果文件再切换状态，状态为 processing 时文件列表已包含这些文件
+        task_path = TASK_DIR / task_step_id
+        task_path.mkdir(parents=True, exist_ok=True)
+        start_sample, resumed_segments = (
+            await asyncio.to_thread(_load_checkpoint, task_step_id) if resume else (0, [])
+        )
+        outputs = output_writers.TaskOutputs(task_path)
+        _invalidate_task_files(task_step_id)
+        segment_callback = _make_segment_callback(
+            task_step_id, asyncio.get_running_loop(), outputs
+        )
+        for segment in resumed_segments:
+            segment_callback(segment)
+
         # 更新状态为处理中
         update_task_status(
             task_step_id,
             status="processing",
-            message="正在处理音频文件...",
-        )
-
-        # 在线程池中执行同步的转录任务，避免阻塞事件循环
-        plain_text, timestamped_text, detected_language = await asyncio.to_thread(
-            process_audio,
-            audio_path,
-            model_name=model_name,
-            language_choice=language_choice,
-            verbose=False,
-            initial_prompt=initial_prompt,
+            message=(
+                f"从检查点继续处理（已完成 {len(resumed_segments)} 个分段）..."
+                if start_sample
+                else "正在处理音频文件..."
+            ),
+            started_at=time.time(),
         )
 
-        # 保存结果到文件
-        task_path = TASK_DIR / task_step_id
-        task_path.mkdir(parents=True, exist_ok=True)
-
-        # 保存纯文本
-        (task_path / "result.txt").write_text(plain_text, encoding="utf-8")
-
-        # 如果包含时间戳，保存带时间戳的文本
-        if include_timestamps:
-            (task_path / "result_with_timestamps.txt").write_text(
-                timestamped_text, encoding="utf-8"
+        # 在线程池中执行同步的转录任务，避免阻塞事件循环；
+        # 相同内容与参数的重复提交直接命中结果缓存或合并到进行中的计算
+        cancel_token = CancelToken()
+        transcription = asyncio.ensure_future(
+            asyncio.to_thread(
+                model_server.transcribe,
+                audio_digest,
+                audio_path,
+                model_name=model_name,
+                language_choice=language_choice,
+                verbose=False,
+                initial_prompt=initial_prompt,
+                segment_callback=segment_callback,
+                progress_callback=_make_progress_callback(task_step_id, outputs),
+                pcm_path=pcm_path,
+                start_sample=start_sample,
+                cancel_token=cancel_token,
+                sort_key=sort_key,
+                timing_callback=_make_timing_callback(
+                    model_name, asyncio.get_running_loop()
+                ),
             )
-
-        # 更新状态为完成
+        )
+        try:
+            _, _, detected_language = await asyncio.shield(transcription)
+        except asyncio.CancelledError:
+            # 取消 asyncio 任务停不下线程：通知推理线程在下一个检查点退出（kill ffmpeg、
+            # 归还 worker 槽位与音频缓冲），等它结束后再继续清理
+            cancel_token.cancel()
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(transcription, return_exceptions=True),
+                    _CANCEL_GRACE_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                pass
+            raise
+
+        outputs.close()
+
+        # 更新状态为完成；状态里只放结果文件的下载地址，不携带全文，
+        # 多小时的任务轮询状态也只有几百字节
         update_task_status(
             task_step_id,
             status="completed",
             message="转录完成",
-            # plain_text=plain_text,
-            timestamped_text=timestamped_text if include_timestamps else None,
+            outputs={
+                file_type: _download_url(task_step_id, file_type)
+                for file_type in output_writers.WRITERS
+            },
+            timestamped_text_url=(
+                _download_url(task_step_id, "result_with_timestamps")
+                if include_timestamps
+                else None
+            ),
             language_detected=detected_language,
             language_detected_display=get_language_display(detected_language),
         )
 
     except asyncio.CancelledError:
-        # 任务被取消，清理状态
-        update_task_status(
-            task_step_id,
-            status="cancelled",
-            message="任务已被终止",
-        )
+        if _SHUTTING_DOWN:
+            # 服务关闭导致的中断：保留 job.json 与检查点，重启后继续
+            update_task_status(
+                task_step_id,
+                message="服务重启中，任务将在重启后从检查点继续",
+            )
+        else:
+            # 任务被取消，清理状态
+            update_task_status(
+                task_step_id,
+                status="cancelled",
+                message="任务已被终止",
+            )
         raise
     except Exception as e:
         # 更新状态为失败
@@ -230,6 +602,10 @@ async def run_transcribe_task(
             error=str(e),
         )
     finally:
+        if outputs is not None:
+            outputs.close()
+        if not _SHUTTING_DOWN:
+            _task_store_writer.submit(_remove_resume_files, task_step_id, pcm_path)
         cleanup_resources()
         RUNNING_TASKS.pop(task_step_id, None)
         _schedule_status_cleanup(task_step_id, STATUS_RETENTION_SECONDS)
@@ -237,6 +613,350 @@ async def run_transcribe_task(
         _schedule_idle_model_release()
 
 
+def _estimate_processing_seconds(
+    model_name: Optional[str], audio_seconds: Optional[float]
+) -> Optional[float]:
+    """按该模型的实测实时率估算处理一段音频要多少秒；时长未知时返回 None。"""
+    if not audio_seconds:
+        return None
+    return audio_seconds * _model_rtf.get(model_name, _DEFAULT_RTF)
+
+
+def _record_rtf(model_name: str, audio_seconds: Optional[float], elapsed: float):
+    if not audio_seconds or elapsed < _RTF_MIN_SAMPLE_SECONDS:
+        return
+    rtf = elapsed / audio_seconds
+    previous = _model_rtf.get(model_name)
+    _model_rtf[model_name] = (
+        rtf if previous is None else previous + _JOB_SECONDS_SMOOTHING * (rtf - previous)
+    )
+
+
+def _job_sort_key(enqueued_at: float, cost: float, priority: int) -> float:
+    """按 SCHEDULER_POLICY 计算任务的等效到达时刻，小的先执行。"""
+    sort_key = enqueued_at
+    if "sjf" in SCHEDULER_POLICY:
+        sort_key += cost * SJF_WEIGHT
+    if "priority" in SCHEDULER_POLICY:
+        sort_key -= priority * PRIORITY_SECONDS
+    return sort_key
+
+
+def _estimate_wait_seconds(position: int, cost_ahead: float = 0.0) -> int:
+    """估算排在第 position 位（从 0 开始）的任务还要等多久才开始执行。
+
+    前面任务的预计处理时间已知时按其总和均摊到并发数上，否则按平均任务耗时估算。
+    """
+    free_slots = max(0, JOB_CONCURRENCY - len(RUNNING_TASKS))
+    if position < free_slots:
+        return 0
+    if cost_ahead:
+        return math.ceil(cost_ahead / JOB_CONCURRENCY)
+    rounds = (position - free_slots) // JOB_CONCURRENCY + 1
+    return math.ceil(rounds * _avg_job_seconds)
+
+
+async def _refresh_queue_snapshot():
+    """在线程中按领取顺序扫描一次共享队列，累加出每个任务前面的预计处理秒数，整体替换快照；
+    排队位置有变化的任务唤醒其长轮询/订阅者。"""
+    global _queue_snapshot
+    async with _queue_snapshot_lock:
+        jobs = await asyncio.to_thread(TASK_STORE.queued_jobs)
+        snapshot = {}
+        cost_ahead = 0.0
+        for position, (task_step_id, cost) in enumerate(jobs):
+            snapshot[task_step_id] = (position, len(jobs), cost_ahead)
+            cost_ahead += cost
+        previous, _queue_snapshot = _queue_snapshot, snapshot
+    metrics.TASKS_QUEUED.set(len(snapshot))
+    for task_step_id in previous.keys() | snapshot.keys():
+        if previous.get(task_step_id) != snapshot.get(task_step_id):
+            _notify_task_stream(task_step_id)
+
+
+async def _queue_snapshot_loop():
+    """按轮询间隔刷新排队快照，反映其它实例的入队与领取。"""
+    while True:
+        await asyncio.sleep(TASK_POLL_SECONDS)
+        try:
+            await _refresh_queue_snapshot()
+        except Exception:
+            pass
+
+
+def get_queue_info(task_step_id: str) -> Optional[dict]:
+    """排队中的任务返回其位置与预计开始时间，否则返回 None（读排队快照，不访问任务库）。"""
+    queued = _queue_snapshot.get(task_step_id)
+    if queued is None:
+        return None
+    position, queue_length, cost_ahead = queued
+    wait_seconds = _estimate_wait_seconds(position, cost_ahead)
+    return {
+        "queue_position": position + 1,
+        "queue_length": queue_length,
+        "estimated_wait_seconds": wait_seconds,
+        "estimated_start_time": time.time() + wait_seconds,
+    }
+
+
+def get_queue_stats() -> dict:
+    return {
+        **QUEUE_STATS,
+        "queued": len(_queue_snapshot),
+        "running": len(RUNNING_TASKS),
+        "max_queued": JOB_QUEUE_MAX,
+        "concurrency": JOB_CONCURRENCY,
+        "avg_job_seconds": round(_avg_job_seconds, 2),
+        "scheduler": sorted(SCHEDULER_POLICY),
+        "model_rtf": {name: round(rtf, 3) for name, rtf in _model_rtf.items()},
+    }
+
+
+def get_eta_info(task_status: dict, queue_info: Optional[dict]) -> dict:
+    """按任务音频时长与该模型的实测实时率估算完成时间（排队中的从预计开始时间算起）。"""
+    estimated = _estimate_processing_seconds(
+        task_status.get("model_name"), task_status.get("audio_duration")
+    )
+    if estimated is None:
+        return {}
+    if queue_info:
+        started_at = queue_info["estimated_start_time"]
+    elif task_status.get("status") == "processing" and task_status.get("started_at"):
+        started_at = task_status["started_at"]
+    else:
+        return {}
+    finish_time = started_at + estimated
+    return {
+        "estimated_processing_seconds": math.ceil(estimated),
+        "estimated_finish_time": finish_time,
+        "estimated_remaining_seconds": max(0, math.ceil(finish_time - time.time())),
+    }
+
+
+def _count_job(outcome: str):
+    QUEUE_STATS[outcome] += 1
+    metrics.TASKS_TOTAL.inc(outcome=outcome)
+
+
+async def _enqueue_job(task_step_id: str, job_kwargs: dict, cost: float = 0.0) -> bool:
+    """新任务入队；队列已满（JOB_QUEUE_MAX，由任务库原子地检查）时不入队并返回 False。"""
+    accepted = await asyncio.to_thread(
+        TASK_STORE.push_job,
+        task_step_id,
+        job_kwargs,
+        sort_key=job_kwargs.get("sort_key"),
+        cost=cost,
+        max_jobs=JOB_QUEUE_MAX,
+    )
+    if not accepted:
+        return False
+    _count_job("accepted")
+    _jobs_available.set()
+    return True
+
+
+def _queue_full_error() -> HTTPException:
+    _count_job("rejected")
+    # 大约等到有一个任务执行完、队列空出一个位置
+    retry_after = math.ceil(_avg_job_seconds / JOB_CONCURRENCY)
+    return HTTPException(
+        status_code=429,
+        detail=f"任务队列已满（{JOB_QUEUE_MAX}），请稍后重试",
+        headers={"Retry-After": str(max(1, retry_after))},
+    )
+
+
+async def _run_queued_job(task_step_id: str, job: dict):
+    global _avg_job_seconds
+    # 任务可能由其它实例受理，先载入任务库里的完整状态，后续的局部更新才不会覆盖模型、语言等字段
+    stored = await asyncio.to_thread(TASK_STORE.get, task_step_id)
+    if stored is not None:
+        TASK_STATUS[task_step_id] = stored
+    task = asyncio.create_task(run_transcribe_task(task_step_id=task_step_id, **job))
+    RUNNING_TASKS[task_step_id] = task
+    # 随时更新（而不只在抓取时）：多 worker 时其它进程汇总的是本进程定期写出的快照
+    metrics.TASKS_RUNNING.set(len(RUNNING_TASKS))
+    started = time.monotonic()
+    # asyncio.wait 不会因被等待任务取消而抛出，worker 协程自身不受影响
+    await asyncio.wait([task])
+    metrics.TASKS_RUNNING.set(len(RUNNING_TASKS))
+    elapsed = time.monotonic() - started
+    _avg_job_seconds += _JOB_SECONDS_SMOOTHING * (elapsed - _avg_job_seconds)
+    # 实时率样本由推理线程按纯推理耗时上报（_make_timing_callback），这里的墙钟时间含上传、
+    # 解码与排队等待，只用于平均任务耗时
+    task_status = await get_task_status(task_step_id) or {}
+    final_status = task_status.get("status")
+    if final_status in QUEUE_STATS:
+        _count_job(final_status)
+
+
+async def _job_worker_loop():
+    """从共享队列中按调度顺序领取任务执行；队列为空时等待本实例入队或下一个轮询间隔。"""
+    while True:
+        try:
+            _jobs_available.clear()
+            claimed = await asyncio.to_thread(TASK_STORE.claim_job)
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(_jobs_available.wait(), TASK_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task_step_id, job = claimed
+            # 队列前移：重算排队位置，并唤醒位置变化的长轮询
+            await _refresh_queue_snapshot()
+            await _run_queued_job(task_step_id, job)
+        except Exception:
+            await asyncio.sleep(TASK_POLL_SECONDS)
+
+
+def _find_interrupted_jobs(skip: set) -> list:
+    """在线程中执行：扫描任务目录里仍留有 job.json 的任务，接管持有者已退出的那些。
+
+    返回 [(task_step_id, 任务参数)]；已结束或记录已过期的任务顺手删掉 job.json。
+    仍在共享队列里排队的任务不是中断，跳过。
+    """
+    stale_before = time.time() - 3 * TASK_HEARTBEAT_SECONDS
+    skip = skip | set(TASK_STORE.pending_job_ids())
+    recovered = []
+    for job_file in TASK_DIR.glob(f"*/{JOB_FILE_NAME}"):
+        task_step_id = job_file.parent.name
+        if task_step_id in skip:
+            continue
+        status = (TASK_STORE.get(task_step_id) or {}).get("status")
+        if status is None or status in _TERMINAL_STATUSES:
+            _remove_resume_files(task_step_id)
+            continue
+        if not TASK_STORE.claim_stale(task_step_id, stale_before):
+            # 仍有进程在持有（心跳未过期），或已被其它进程接管
+            continue
+        try:
+            job = json.loads(job_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        recovered.append((task_step_id, job))
+    return recovered
+
+
+async def _recover_interrupted_tasks():
+    """把中断的任务重新放回队列，从检查点续转。"""
+    recovered = await asyncio.to_thread(_find_interrupted_jobs, set(RUNNING_TASKS))
+    for task_step_id, job in recovered:
+        if task_step_id in RUNNING_TASKS:
+            continue
+        # 先把完整状态读入内存，后续的局部更新不会覆盖掉模型、语言等字段
+        await get_task_status(task_step_id)
+        if not os.path.exists(job.get("audio_path", "")):
+            update_task_status(
+                task_step_id,
+                status="failed",
+                message="任务中断后无法恢复：音频文件已不存在",
+                error="audio file missing",
+            )
+            _task_store_writer.submit(_remove_resume_files, task_step_id)
+            continue
+        if job.get("pcm_path") and not os.path.exists(job["pcm_path"]):
+            job["pcm_path"] = None
+        # 状态落库后再入队，其它实例领取时读到的已是恢复后的状态
+        await asyncio.wrap_future(
+            update_task_status(
+                task_step_id,
+                status="pending",
+                message="任务在服务重启后恢复，排队等待继续处理...",
+            )
+        )
+        # 沿用原来的调度顺序：已经开始执行过的任务通常排在新任务前面
+        await asyncio.to_thread(
+            TASK_STORE.push_job,
+            task_step_id,
+            {**job, "resume": True},
+            sort_key=job.get("sort_key"),
+        )
+        _jobs_available.set()
+    if recovered:
+        await _refresh_queue_snapshot()
+
+
+async def _task_heartbeat_loop():
+    """定期为本进程执行中的任务刷新心跳，并接管其它（已退出）进程遗留的未完成任务。
+
+    排队中的任务在共享队列里，不属于任何进程，领取时才开始有心跳。
+    """
+    while True:
+        try:
+            owned = list(RUNNING_TASKS)
+            await asyncio.wrap_future(_task_store_writer.submit(TASK_STORE.heartbeat, owned))
+            await _recover_interrupted_tasks()
+        except Exception:
+            pass
+        await asyncio.sleep(TASK_HEARTBEAT_SECONDS)
+
+
+async def _cancel_request_loop():
+    """轮询其它实例对本实例执行中任务发出的取消请求，在本地取消对应的任务。"""
+    while True:
+        await asyncio.sleep(TASK_POLL_SECONDS)
+        if not RUNNING_TASKS:
+            continue
+        try:
+            requested = await asyncio.to_thread(TASK_STORE.cancel_requested, list(RUNNING_TASKS))
+        except Exception:
+            continue
+        for task_step_id in requested:
+            task = RUNNING_TASKS.get(task_step_id)
+            if task is not None:
+                task.cancel()
+
+
+VALID_MODELS = [
+    "tiny",
+    "base",
+    "small",
+    "medium",
+    "large",
+    "turbo",
+    "tiny.en",
+    "base.en",
+    "small.en",
+    "medium.en",
+    # int8 动态量化变体（仅 CPU 推理）；内存与速度收益、准确率变化尚未在真实模型上测定，
+    # 上线前用 scripts/compare_quantized_models.py 在业务音频上实测
+    "tiny-int8",
+    "base-int8",
+    "small-int8",
+    "medium-int8",
+]
+
+
+def _validate_model_name(model_name: str):
+    """模型名可带推理引擎前缀（如 faster-whisper:base），不带时使用 WHISPER_ENGINE。"""
+    try:
+        _, base_name = split_model_name(model_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if base_name not in VALID_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"无效的模型名称。可选值: {', '.join(VALID_MODELS)}；"
+                f"可加引擎前缀: {', '.join(f'{name}:' for name in ENGINES)}"
+            ),
+        )
+
+
+def _language_choice_from_code(language: Optional[str]) -> str:
+    """将语言代码转换为中文选项（用于 process_audio 函数）"""
+    language_map_reverse = {
+        "en": "英语",
+        "es": "西班牙语",
+    }
+    return (
+        "自动检测"
+        if language is None
+        else language_map_reverse.get(language, "自动检测")
+    )
+
+
 def cleanup_resources():
     """清理内存和显存，避免资源泄漏"""
     gc.collect()
@@ -263,7 +983,23 @@ api_app.add_middleware(
 
 @api_app.on_event("startup")
 async def startup_event():
+    # 旧版本遗留的 status.json 一次性导入任务库
+    await asyncio.to_thread(TASK_STORE.import_legacy_status_files, TASK_DIR)
     asyncio.create_task(_cleanup_old_task_files_loop())
+    for _ in range(JOB_CONCURRENCY):
+        _job_workers.append(asyncio.create_task(_job_worker_loop()))
+    # 首轮心跳即扫描上次退出时未完成的任务；刚重启时旧心跳可能尚未过期，会在之后的轮次接管
+    asyncio.create_task(_task_heartbeat_loop())
+    asyncio.create_task(_cancel_request_loop())
+    asyncio.create_task(_queue_snapshot_loop())
+    metrics.start_file_export()
+
+
+@api_app.on_event("shutdown")
+async def shutdown_event():
+    global _SHUTTING_DOWN
+    # 之后被中断的运行中/排队任务保留 job.json 与检查点，由重启后的进程续转
+    _SHUTTING_DOWN = True
 
 
 @api_app.get("/")
@@ -274,11 +1010,15 @@ async def root():
         "version": "1.0",
         "endpoints": {
             "/transcribe": "POST - 上传音频文件进行转写",
+            "/transcribe_batch": "POST - 批量转写多个短音频",
             "/transcribe_start": "POST - 启动异步转录任务",
+            "/tasks": "GET - 分页列出任务",
             "/task/{task_step_id}/status": "GET - 查询任务状态",
+            "/task/{task_step_id}/stream": "GET - 实时推送转录分段 (SSE)",
             "/task/{task_step_id}/cancel": "POST - 取消任务",
             "/task/{task_step_id}/download/{file_type}": "GET - 下载任务文件",
             "/health": "GET - 健康检查",
+            "/metrics": "GET - Prometheus 指标",
         },
     }
 
@@ -289,15 +1029,36 @@ async def health_check():
     return {
         "status": "healthy",
         "device": "cuda" if torch.cuda.is_available() else "cpu",
+        "inference": "remote" if model_server.is_remote() else "local",
+        "queue": get_queue_stats(),
     }
 
 
+@api_app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus 文本格式的运行指标（上传、解码、模型缓存、推理排队、实时率、队列、内存）
+
+    合并同组其它 HTTP worker（WHISPER_METRICS_DIR 下的快照文件）与推理服务进程的指标，
+    抓取落到任一 worker 都得到整个部署的总数。
+    """
+    metrics.TASKS_RUNNING.set(len(RUNNING_TASKS))
+    metrics.TASKS_QUEUED.set(await asyncio.to_thread(TASK_STORE.job_count))
+    snapshots = await asyncio.to_thread(metrics.collect_process_files)
+    if model_server.is_remote():
+        snapshots += await asyncio.to_thread(model_server.metrics_snapshots)
+    return Response(content=metrics.render(snapshots), media_type=metrics.CONTENT_TYPE)
+
+
 # 短的转写 一次生成并返回结果
 @api_app.post("/transcribe")
 async def transcribe_audio(
     file: UploadFile = File(..., description="音频文件"),
     model_name: str = Form(
-        "base", description="模型名称: tiny, base, small, medium, large"
+        "base",
+        description=(
+            "模型名称: tiny, base, small, medium, large；CPU 可选 int8 量化版如 base-int8；"
+            "可加推理引擎前缀如 faster-whisper:base"
+        ),
     ),
     language: Optional[str] = Form(
         None, description="语言代码: en(英语), es(西班牙语), 或留空自动检测"
@@ -313,59 +1074,39 @@ async def transcribe_audio(
 
     参数:
     - file: 音频文件 (支持 mp3, wav, m4a 等格式)
-    - model_name: Whisper 模型名称 (tiny, base, small, medium, large)
+    - model_name: Whisper 模型名称 (tiny, base, small, medium, large，或 int8 量化版如 base-int8)
     - language: 语言代码 (en, es 等)，留空则自动检测
     - include_timestamps: 是否在结果中包含时间戳信息
     - initial_prompt: 转写引导提示词，用于引导标点与话术风格
     """
     try:
         # 验证模型名称
-        valid_models = [
-            "tiny",
-            "base",
-            "small",
-            "medium",
-            "large",
-            "turbo",
-            "tiny.en",
-            "base.en",
-            "small.en",
-            "medium.en",
-        ]
-        if model_name not in valid_models:
-            raise HTTPException(
-                status_code=400,
-                detail=f"无效的模型名称。可选值: {', '.join(valid_models)}",
-            )
+        _validate_model_name(model_name)
 
         # 有新任务进入，取消待执行的模型卸载
         _cancel_idle_model_release()
 
-        # 保存上传的文件到临时目录（流式写盘，避免大文件占满内存）
+        # 保存上传的文件到临时目录（流式写盘，避免大文件占满内存），同时送入 ffmpeg 解码
         fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(file.filename)[1])
         os.close(fd)
-        await _save_upload_to_path(file, tmp_path)
-
+        pcm_path = None
         try:
+            audio_digest, pcm_path = await _save_upload_and_decode(file, tmp_path)
+
             # 将语言代码转换为中文选项（用于 process_audio 函数）
-            language_map_reverse = {
-                "en": "英语",
-                "es": "西班牙语",
-            }
-            language_choice = (
-                "自动检测"
-                if language is None
-                else language_map_reverse.get(language, "自动检测")
-            )
+            language_choice = _language_choice_from_code(language)
 
-            # 在线程池中执行同步的转录任务，避免阻塞事件循环
+            # 在线程池中执行同步的转录任务，避免阻塞事件循环；
+            # 重复提交的相同音频直接命中结果缓存，不加载模型
             plain_text, timestamped_text, detected_language = await asyncio.to_thread(
-                process_audio,
+                model_server.transcribe,
+                audio_digest,
                 tmp_path,
                 model_name=model_name,
                 language_choice=language_choice,
                 verbose=False,
                 initial_prompt=initial_prompt,
+                pcm_path=pcm_path,
             )
 
             # 构建响应
@@ -382,8 +1123,9 @@ async def transcribe_audio(
             return JSONResponse(content=response)
 
         finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+            for path in (tmp_path, pcm_path):
+                if path and os.path.exists(path):
+                    os.unlink(path)
             cleanup_resources()
             # 同步请求结束后调度空闲卸载，释放常驻模型内存
             _schedule_idle_model_release()
@@ -392,12 +1134,110 @@ async def transcribe_audio(
         raise HTTPException(status_code=500, detail=f"处理音频时出错: {str(e)}")
 
 
+# 多个短音频一次提交 批量推理后逐个返回
+@api_app.post("/transcribe_batch")
+async def transcribe_batch(
+    files: List[UploadFile] = File(..., description="音频文件（可多个）"),
+    model_name: str = Form(
+        "base",
+        description=(
+            "模型名称: tiny, base, small, medium, large；CPU 可选 int8 量化版如 base-int8；"
+            "可加推理引擎前缀如 faster-whisper:base"
+        ),
+    ),
+    language: Optional[str] = Form(
+        None, description="语言代码: en(英语), es(西班牙语), 或留空自动检测"
+    ),
+    include_timestamps: bool = Form(False, description="是否包含时间戳"),
+    initial_prompt: Optional[str] = Form(
+        None,
+        description="转写引导提示词，留空则使用内置电商直播风格默认提示",
+    ),
+):
+    """
+    批量转写多个短音频
+
+    各文件并发解码，30 秒以内的片段堆叠成批做编码器/解码器前向（带时间戳，按时间戳切分段）；
+    需要温度回退的片段与更长的文件按常规流程逐个转写，输出格式与 /transcribe 相同。
+    单个文件失败不影响其它文件。
+
+    返回:
+    - results: 与上传顺序一致的结果列表，每项包含 filename、success，
+      成功时带 text / language_detected（及 text_with_timestamps），失败时带 error
+    """
+    _validate_model_name(model_name)
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次最多上传 {BATCH_MAX_FILES} 个文件",
+        )
+
+    # 有新任务进入，取消待执行的模型卸载
+    _cancel_idle_model_release()
+
+    tmp_paths = []
+    try:
+        digests = []
+        for upload in files:
+            fd, tmp_path = tempfile.mkstemp(
+                suffix=os.path.splitext(upload.filename or "")[1]
+            )
+            os.close(fd)
+            tmp_paths.append(tmp_path)
+            digests.append(await _save_upload_to_path(upload, tmp_path))
+
+        batch_results = await asyncio.to_thread(
+            model_server.transcribe_batch,
+            digests,
+            tmp_paths,
+            model_name=model_name,
+            language_choice=_language_choice_from_code(language),
+            initial_prompt=initial_prompt,
+        )
+
+        results = []
+        for upload, result in zip(files, batch_results):
+            if isinstance(result, Exception):
+                results.append(
+                    {"filename": upload.filename, "success": False, "error": str(result)}
+                )
+                continue
+            plain_text, timestamped_text, detected_language = result
+            item = {
+                "filename": upload.filename,
+                "success": True,
+                "text": plain_text,
+                "language_detected": detected_language,
+                "language_detected_display": get_language_display(detected_language),
+            }
+            if include_timestamps:
+                item["text_with_timestamps"] = timestamped_text
+            results.append(item)
+
+        return JSONResponse(content={"success": True, "results": results})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量处理音频时出错: {str(e)}")
+    finally:
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        cleanup_resources()
+        _schedule_idle_model_release()
+
+
 # 调用后开始转写 并保存结果到本地文件 长转写
 @api_app.post("/transcribe_start")
 async def transcribe_start(
     file: UploadFile = File(..., description="音频文件"),
     model_name: str = Form(
-        "base", description="模型名称: tiny, base, small, medium, large"
+        "base",
+        description=(
+            "模型名称: tiny, base, small, medium, large；CPU 可选 int8 量化版如 base-int8；"
+            "可加推理引擎前缀如 faster-whisper:base"
+        ),
     ),
     language: Optional[str] = Form(
         None, description="语言代码: en(英语), es(西班牙语), 或留空自动检测"
@@ -408,77 +1248,92 @@ async def transcribe_start(
         None,
         description="转写引导提示词，留空则使用内置电商直播风格默认提示",
     ),
+    priority: int = Form(
+        0, description="优先级，数值越大越先执行（调度策略包含 priority 时生效）"
+    ),
 ):
     """
     启动异步转录任务
 
-    调用后立即返回，转录任务在后台执行。
-    可以通过 task_step_id 查询任务状态和结果。
+    调用后立即返回，转录任务进入队列在后台执行，执行顺序由调度策略（WHISPER_SCHEDULER）决定。
+    可以通过 task_step_id 查询任务状态、排队位置、预计开始/完成时间和结果。
+    队列已满时返回 429，并通过 Retry-After 提示多久后重试。
     """
     try:
         # 验证模型名称
-        valid_models = [
-            "tiny",
-            "base",
-            "small",
-            "medium",
-            "large",
-            "turbo",
-            "tiny.en",
-            "base.en",
-            "small.en",
-            "medium.en",
-        ]
-        if model_name not in valid_models:
-            raise HTTPException(
-                status_code=400,
-                detail=f"无效的模型名称。可选值: {', '.join(valid_models)}",
-            )
+        _validate_model_name(model_name)
+
+        # 准入控制：队列已满时在写盘之前就拒绝，避免突发流量占满磁盘与线程。
+        # 这里只是提前过滤，并发受理时以入队时任务库的原子检查为准（见 _enqueue_job）
+        if await asyncio.to_thread(TASK_STORE.job_count) >= JOB_QUEUE_MAX:
+            raise _queue_full_error()
 
         # 创建任务目录
         task_path = TASK_DIR / task_step_id
         task_path.mkdir(parents=True, exist_ok=True)
 
-        # 保存上传的文件到任务目录（流式写盘，避免大文件占满内存）
+        # 保存上传的文件到任务目录（流式写盘，避免大文件占满内存），同时送入 ffmpeg 解码
         audio_path = task_path / file.filename
-        await _save_upload_to_path(file, str(audio_path))
+        audio_digest, pcm_path = await _save_upload_and_decode(
+            file, str(audio_path), str(task_path / "audio.pcm")
+        )
+        _invalidate_task_files(task_step_id)
+
+        # 音频时长用于调度与 ETA：边上传边解码时按 PCM 大小换算，否则只读容器头部
+        audio_seconds = await asyncio.to_thread(probe_duration, str(audio_path), pcm_path)
+        estimated_seconds = _estimate_processing_seconds(model_name, audio_seconds)
+        # 时长未知的任务按平均任务耗时参与排序
+        cost = _avg_job_seconds if estimated_seconds is None else estimated_seconds
 
         # 将语言代码转换为中文选项（用于 process_audio 函数）
-        language_map_reverse = {
-            "en": "英语",
-            "es": "西班牙语",
-        }
-        language_choice = (
-            "自动检测"
-            if language is None
-            else language_map_reverse.get(language, "自动检测")
-        )
+        language_choice = _language_choice_from_code(language)
 
-        # 初始化任务状态
-        update_task_status(
-            task_step_id,
-            status="pending",
-            message="任务已创建，等待处理...",
-            model_name=model_name,
-            language=language or "auto",
-            language_display=language_choice,
+        # 初始化任务状态；落库后再入队，其它实例领取任务时才读得到完整状态
+        await asyncio.wrap_future(
+            update_task_status(
+                task_step_id,
+                status="pending",
+                message="任务已创建，排队等待处理...",
+                model_name=model_name,
+                language=language or "auto",
+                language_display=language_choice,
+                audio_duration=None if audio_seconds is None else round(audio_seconds, 2),
+                priority=priority,
+            )
         )
 
         # 有新任务进入，取消待执行的模型卸载
         _cancel_idle_model_release()
 
-        # 将转录任务添加到事件循环
-        task = asyncio.create_task(
-            run_transcribe_task(
-                str(audio_path),
-                task_step_id,
-                model_name,
-                language_choice,
-                include_timestamps,
-                initial_prompt,
-            )
+        # 将转录任务加入队列，由后台 worker 按顺序执行；
+        # 参数同时写入任务目录，进程中途退出后重启时据此恢复
+        job_kwargs = dict(
+            audio_path=str(audio_path),
+            model_name=model_name,
+            language_choice=language_choice,
+            include_timestamps=include_timestamps,
+            initial_prompt=initial_prompt,
+            audio_digest=audio_digest,
+            pcm_path=pcm_path,
+            sort_key=_job_sort_key(time.time(), cost, priority),
+        )
+        await asyncio.wrap_future(
+            _task_store_writer.submit(_write_json_atomic, task_path / JOB_FILE_NAME, job_kwargs)
         )
-        RUNNING_TASKS[task_step_id] = task
+        if not await _enqueue_job(task_step_id, job_kwargs, cost):
+            # 其它请求先占满了队列：任务不创建，删除已落盘的音频与任务目录
+            await asyncio.wrap_future(
+                update_task_status(
+                    task_step_id, status="failed", message="任务队列已满，未能入队"
+                )
+            )
+            await asyncio.wrap_future(
+                _task_store_writer.submit(shutil.rmtree, task_path, ignore_errors=True)
+            )
+            _invalidate_task_files(task_step_id)
+            _schedule_status_cleanup(task_step_id)
+            raise _queue_full_error()
+        await _refresh_queue_snapshot()
 
         # 立即返回响应
         return JSONResponse(
@@ -489,6 +1344,7 @@ async def transcribe_start(
                 "status": "pending",
                 "language": language or "auto",
                 "language_display": language_choice,
+                **(get_queue_info(task_step_id) or {}),
             }
         )
 
@@ -498,66 +1354,222 @@ async def transcribe_start(
         raise HTTPException(status_code=500, detail=f"启动转录任务时出错: {str(e)}")
 
 
+@api_app.get("/tasks")
+async def list_tasks(
+    status: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+):
+    """
+    分页列出任务（按创建时间倒序）
+
+    参数:
+    - status: 只列出该状态的任务 (pending, processing, completed, failed, cancelled)
+    - limit: 每页数量（1-500，默认 50）
+    - offset: 偏移量
+    """
+    limit = min(max(1, limit), 500)
+    offset = max(0, offset)
+    items, total = await asyncio.to_thread(TASK_STORE.list_tasks, status, limit, offset)
+    return JSONResponse(
+        content={"total": total, "limit": limit, "offset": offset, "items": items}
+    )
+
+
+async def _task_files(task_step_id: str, task_status: dict) -> Optional[list]:
+    """任务目录的文件列表，缓存到任务状态变化或文件写入为止；目录不存在时返回 None。
+
+    文件只会在上传、开始转录（创建结果文件）时新增，写入处会主动失效缓存；
+    以状态值作为缓存条件，其它 worker 进程推进了任务时也能在状态切换后刷新。
+    缓存未命中时在线程中扫描目录。
+    """
+    status = task_status.get("status")
+    cached = _TASK_FILES.get(task_step_id)
+    if cached is not None and cached[0] == status:
+        return cached[1]
+    files = await asyncio.to_thread(_scan_task_files, TASK_DIR / task_step_id)
+    if files is not None:
+        _TASK_FILES[task_step_id] = (status, files)
+    return files
+
+
+def _scan_task_files(task_path: Path) -> Optional[list]:
+    if not task_path.exists():
+        return None
+    files = output_writers.output_files(task_path)
+    # 查找原始音频文件
+    for audio_file in task_path.iterdir():
+        if audio_file.is_file() and audio_file.suffix.lower() in _AUDIO_FILE_SUFFIXES:
+            files.append(
+                {"name": audio_file.name, "type": "audio", "description": "原始音频文件"}
+            )
+    return files
+
+
+def _invalidate_task_files(task_step_id: str):
+    _TASK_FILES.pop(task_step_id, None)
+
+
+async def _build_task_status_response(task_step_id: str) -> Optional[dict]:
+    task_status = await get_task_status(task_step_id)
+    if task_status is None:
+        return None
+    files = await _task_files(task_step_id, task_status)
+    if files is None:
+        return None
+    # 构建响应，包含文件信息；排队中的任务附带排队位置与预计开始时间，
+    # 排队与执行中的任务附带预计完成时间
+    queue_info = get_queue_info(task_step_id)
+    return {
+        "task_step_id": task_step_id,
+        **task_status,
+        **(queue_info or {}),
+        **get_eta_info(task_status, queue_info),
+        "files": files,
+    }
+
+
+# 随请求时间变化的字段，不参与 ETag 计算
+_VOLATILE_STATUS_FIELDS = {
+    "estimated_start_time",
+    "estimated_finish_time",
+    "estimated_remaining_seconds",
+}
+
+
+def _status_etag(response: dict) -> str:
+    """按响应内容生成 ETag；预计开始/完成时间随请求时间变化，不参与计算。"""
+    stable = {k: v for k, v in response.items() if k not in _VOLATILE_STATUS_FIELDS}
+    raw = json.dumps(stable, sort_keys=True, ensure_ascii=False, default=str)
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
 @api_app.get("/task/{task_step_id}/status")
-async def get_task_status_endpoint(task_step_id: str):
+async def get_task_status_endpoint(task_step_id: str, request: Request, wait: float = 0):
     """
     查询任务状态
 
     参数:
     - task_step_id: 任务步骤ID
+    - wait: 可选，长轮询秒数（最多 60）。请求带 If-None-Match 且状态未变时，
+      最多等待这么久，状态一变化立即返回；超时仍未变化返回 304
 
     返回:
     - status: 任务状态 (pending, processing, completed, failed)
     - message: 状态消息
     - 其他任务相关信息
+    - 响应头 ETag；带 If-None-Match 且内容未变时返回 304（无响应体）
     """
-    task_status = get_task_status(task_step_id)
-
-    if task_status is None:
-        raise HTTPException(status_code=404, detail=f"任务 {task_step_id} 不存在")
+    if_none_match = request.headers.get("if-none-match")
+    deadline = time.monotonic() + min(max(wait, 0.0), STATUS_MAX_WAIT_SECONDS)
+    with _watching_task_stream(task_step_id):
+        while True:
+            # 先拿到事件再读取状态，避免读取与等待之间的通知丢失
+            event = _TASK_STREAM_EVENTS.setdefault(task_step_id, asyncio.Event())
+            response = await _build_task_status_response(task_step_id)
+            if response is None:
+                raise HTTPException(status_code=404, detail=f"任务 {task_step_id} 不存在")
+            etag = _status_etag(response)
+            remaining = deadline - time.monotonic()
+            if not _etag_matches(if_none_match, etag) or remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(
+                    event.wait(), _change_wait_seconds(task_step_id, remaining)
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=response, headers=headers)
+
+
+def _change_wait_seconds(task_step_id: str, limit: float) -> float:
+    """等待任务状态/分段变化的单次超时：本实例执行中或已结束的任务有本地通知，
+    其它实例推进的任务收不到通知，按 TASK_POLL_SECONDS 轮询任务库。"""
+    if task_step_id in RUNNING_TASKS:
+        return limit
+    if (TASK_STATUS.get(task_step_id) or {}).get("status") in _TERMINAL_STATUSES:
+        return limit
+    return min(limit, TASK_POLL_SECONDS)
+
+
+def _sse_event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@api_app.get("/task/{task_step_id}/stream")
+async def stream_task_segments(task_step_id: str, request: Request):
+    """
+    以 Server-Sent Events 实时推送任务的转录分段
 
-    # 检查任务目录是否存在
-    task_path = TASK_DIR / task_step_id
-    if not task_path.exists():
+    - event: segment，data 为 {"start", "end", "text"}（秒），id 为分段序号；
+      连接后先回放已产出的分段，断线重连时可带 Last-Event-ID 从断点继续
+    - event: status，任务结束（completed / failed / cancelled）时推送最终状态后关闭
+    """
+    if await get_task_status(task_step_id) is None:
         raise HTTPException(status_code=404, detail=f"任务 {task_step_id} 不存在")
 
-    # 构建响应，包含文件信息
-    response = {"task_step_id": task_step_id, **task_status}
-
-    # 添加文件列表信息
-    files = []
-    if (task_path / "result.txt").exists():
-        files.append(
-            {
-                "name": "result.txt",
-                "type": "result",
-                "description": "转录结果（纯文本）",
-            }
-        )
-    if (task_path / "result_with_timestamps.txt").exists():
-        files.append(
-            {
-                "name": "result_with_timestamps.txt",
-                "type": "result_with_timestamps",
-                "description": "转录结果（带时间戳）",
-            }
-        )
-
-    # 查找原始音频文件
-    audio_files = [
-        f
-        for f in task_path.iterdir()
-        if f.is_file()
-        and f.suffix.lower() in [".mp3", ".wav", ".m4a", ".flac", ".ogg", ".mp4"]
-    ]
-    for audio_file in audio_files:
-        files.append(
-            {"name": audio_file.name, "type": "audio", "description": "原始音频文件"}
-        )
-
-    response["files"] = files
-
-    return JSONResponse(content=response)
+    try:
+        sent = int(request.headers.get("last-event-id", "-1")) + 1
+    except ValueError:
+        sent = 0
+
+    async def event_stream():
+        nonlocal sent
+        last_write = time.monotonic()
+        with _watching_task_stream(task_step_id):
+            while True:
+                # 先拿到事件再检查数据，避免检查与等待之间的通知丢失
+                event = _TASK_STREAM_EVENTS.setdefault(task_step_id, asyncio.Event())
+                segments = await _load_task_segments(task_step_id)
+                while sent < len(segments):
+                    yield _sse_event("segment", segments[sent], sent)
+                    sent += 1
+                    last_write = time.monotonic()
+
+                task_status = await get_task_status(task_step_id) or {}
+                if task_status.get("status") in _TERMINAL_STATUSES:
+                    yield _sse_event(
+                        "status",
+                        {
+                            "status": task_status.get("status"),
+                            "message": task_status.get("message"),
+                        },
+                    )
+                    return
+
+                if await request.is_disconnected():
+                    return
+                try:
+                    await asyncio.wait_for(
+                        event.wait(),
+                        _change_wait_seconds(task_step_id, _STREAM_KEEPALIVE_SECONDS),
+                    )
+                except asyncio.TimeoutError:
+                    if time.monotonic() - last_write >= _STREAM_KEEPALIVE_SECONDS:
+                        yield ": keep-alive\n\n"
+                        last_write = time.monotonic()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @api_app.post("/task/{task_step_id}/cancel")
@@ -565,7 +1577,7 @@ async def cancel_task(task_step_id: str):
     """
     取消正在进行的任务，并尝试释放资源
     """
-    task_status = get_task_status(task_step_id)
+    task_status = await get_task_status(task_step_id)
 
     if task_status is None:
         raise HTTPException(status_code=404, detail=f"任务 {task_step_id} 不存在")
@@ -581,14 +1593,62 @@ async def cancel_task(task_step_id: str):
             }
         )
 
+    job = await asyncio.to_thread(TASK_STORE.remove_job, task_step_id)
+    if job is not None:
+        # 仍在排队：移出共享队列即可，不会再被任何实例领取
+        _task_store_writer.submit(_remove_resume_files, task_step_id, job.get("pcm_path"))
+        _count_job("cancelled")
+        await _refresh_queue_snapshot()
+        update_task_status(
+            task_step_id,
+            status="cancelled",
+            message="任务已被终止",
+        )
+        _schedule_status_cleanup(task_step_id)
+        _schedule_idle_model_release()
+        return JSONResponse(
+            content={
+                "success": True,
+                "task_step_id": task_step_id,
+                "status": "cancelled",
+                "message": "任务已取消",
+            }
+        )
+
     task = RUNNING_TASKS.get(task_step_id)
+    stale_before = time.time() - 3 * TASK_HEARTBEAT_SECONDS
+    if task is None and not await asyncio.to_thread(
+        TASK_STORE.claim_stale, task_step_id, stale_before
+    ):
+        # 由其它实例执行中（心跳未过期）：发出取消请求，等待对方取消后返回最新状态
+        await asyncio.to_thread(TASK_STORE.request_cancel, task_step_id)
+        updated_status = task_status
+        for _ in range(_REMOTE_CANCEL_WAIT_POLLS):
+            await asyncio.sleep(TASK_POLL_SECONDS)
+            updated_status = await get_task_status(task_step_id) or {}
+            if updated_status.get("status") in _TERMINAL_STATUSES:
+                break
+        return JSONResponse(
+            content={
+                "success": True,
+                "task_step_id": task_step_id,
+                "status": updated_status.get("status"),
+                "message": (
+                    updated_status.get("message")
+                    if updated_status.get("status") in _TERMINAL_STATUSES
+                    else "已通知执行该任务的实例取消"
+                ),
+            }
+        )
+
     if task is None:
-        # 没有记录运行中的任务，直接标记为已取消
+        # 没有任何实例在执行（持有者已退出），直接标记为已取消（也不再在重启后恢复）
         update_task_status(
             task_step_id,
             status="cancelled",
             message="任务状态已更新为已取消",
         )
+        _task_store_writer.submit(_remove_resume_files, task_step_id)
         cleanup_resources()
         return JSONResponse(
             content={
@@ -608,7 +1668,7 @@ async def cancel_task(task_step_id: str):
     RUNNING_TASKS.pop(task_step_id, None)
     cleanup_resources()
 
-    updated_status = get_task_status(task_step_id) or {}
+    updated_status = await get_task_status(task_step_id) or {}
     return JSONResponse(
         content={
             "success": True,
@@ -627,8 +1687,10 @@ async def download_task_file(task_step_id: str, file_type: str):
     参数:
     - task_step_id: 任务步骤ID
     - file_type: 文件类型
-        - "result": 下载 result.txt（纯文本结果）
+        - "result": 下载 result.txt（纯文本结果，每段一行）
         - "result_with_timestamps": 下载 result_with_timestamps.txt（带时间戳的结果）
+        - "srt" / "vtt": 下载字幕文件 result.srt / result.vtt
+        - "jsonl": 下载 segments.jsonl（每行一个分段）
         - "audio": 下载原始音频文件（如果有多个，返回第一个）
         - 或者直接指定文件名
 
@@ -642,21 +1704,20 @@ async def download_task_file(task_step_id: str, file_type: str):
 
     file_path = None
     filename = None
+    media_type = "application/octet-stream"
 
     # 根据文件类型确定文件路径
-    if file_type == "result":
-        file_path = task_path / "result.txt"
-        filename = "result.txt"
-    elif file_type == "result_with_timestamps":
-        file_path = task_path / "result_with_timestamps.txt"
-        filename = "result_with_timestamps.txt"
+    if file_type in output_writers.WRITERS:
+        writer = output_writers.WRITERS[file_type]
+        file_path = task_path / writer.filename
+        filename = writer.filename
+        media_type = writer.media_type
     elif file_type == "audio":
         # 查找音频文件
         audio_files = [
             f
             for f in task_path.iterdir()
-            if f.is_file()
-            and f.suffix.lower() in [".mp3", ".wav", ".m4a", ".flac", ".ogg", ".mp4"]
+            if f.is_file() and f.suffix.lower() in _AUDIO_FILE_SUFFIXES
         ]
         if not audio_files:
             raise HTTPException(
@@ -680,6 +1741,4 @@ async def download_task_file(task_step_id: str, file_type: str):
         raise HTTPException(status_code=404, detail=f"文件 {filename} 不存在")
 
     # 返回文件
-    return FileResponse(
-        path=str(file_path), filename=filename, media_type="application/octet-stream"
-    )
+    return FileResponse(path=str(file_path), filename=filename, media_type=media_type)
@@ -2,18 +2,30 @@
 核心音频处理模块
 包含音频转文字的核心逻辑
 """
+import bisect
+import dataclasses
 import gc
+import inspect
+import heapq
+import itertools
 import os
+import queue
 import subprocess
 import sys
 import tempfile
 import threading
-from collections import OrderedDict
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
 
 import numpy as np
 import whisper
 import torch
 
+from src import engines, feature_cache, metrics
+
 try:
     from whisper.audio import SAMPLE_RATE as _WHISPER_SAMPLE_RATE
 except Exception:  # pragma: no cover - 兜底，正常 whisper 安装都有该常量
@@ -28,18 +40,313 @@ def _env_int(name: str, default: int, minimum: int = 1) -> int:
         return default
 
 
-# 同时常驻内存/显存的最大模型数量；超过后按 LRU 淘汰最久未使用的模型。
-# 默认 1，避免请求多种模型时把所有模型一起常驻导致内存只增不减。
-MAX_CACHED_MODELS = _env_int("WHISPER_MAX_CACHED_MODELS", 1)
+# 模型缓存的内存预算（MB，按模型参数与缓冲区的实际字节数累计，含所有 worker 副本）。
+# 0 表示自动：取 cgroup 内存上限 / 物理内存（GPU 上为显存）的 WHISPER_MODEL_CACHE_MEMORY_PERCENT。
+MODEL_CACHE_MAX_MB = _env_int("WHISPER_MODEL_CACHE_MAX_MB", 0, minimum=0)
+MODEL_CACHE_MEMORY_PERCENT = _env_int("WHISPER_MODEL_CACHE_MEMORY_PERCENT", 50)
+# 常驻模型，逗号分隔（如 base）：不参与淘汰，空闲卸载时也保留
+PINNED_MODELS = frozenset(
+    m.strip() for m in os.environ.get("WHISPER_PINNED_MODELS", "").split(",") if m.strip()
+)
+# 可内存映射的权重目录：模型首次加载后把权重另存一份到这里，之后以 mmap 方式加载，
+# 直接映射页缓存里的文件页，不再反序列化与拷贝；这些页是干净的文件页，内存紧张时可被系统回收。
+# 留空则关闭（每次都用 whisper.load_model 完整加载）。需要 torch>=2.1
+MODEL_MMAP_DIR = os.environ.get("WHISPER_MODEL_MMAP_DIR", "./storage/models")
+# 编码器特征磁盘缓存：每个 30 秒窗口的编码器输出按 (模型, 窗口 log-mel) 缓存，同一录音换提示词/语言重转时
+# 直接复用，只重新解码。上限（MB）为 0 则不落盘（同一请求内温度回退、语言检测仍复用最近一个窗口）。
+# 每个窗口约 3MB（base）到 8MB（large），按重转需求设置
+FEATURE_CACHE_DIR = os.environ.get("WHISPER_FEATURE_CACHE_DIR", "./storage/cache/features")
+FEATURE_CACHE_MAX_MB = _env_int("WHISPER_FEATURE_CACHE_MAX_MB", 0, minimum=0)
 
 # 音频解码超时（秒）。超时则判定文件过大/损坏并报错，避免 ffmpeg 管道挂起导致任务永久卡住。
 AUDIO_LOAD_TIMEOUT = _env_int("WHISPER_AUDIO_LOAD_TIMEOUT", 1800)
 
-_model_cache: "OrderedDict[str, object]" = OrderedDict()
+# 推理 worker 数量：每个 worker 独占一份模型副本，同一时刻最多并发这么多个转录。
+# 内存上限因此是显式的：约 INFERENCE_WORKERS × (模型大小 + 一段解码后的音频)。
+INFERENCE_WORKERS = _env_int("WHISPER_INFERENCE_WORKERS", 1)
+
+# 每个 worker 的 torch 计算线程数。默认把 CPU 核数平均分给各 worker，
+# 避免多个 worker 的 OpenMP 线程池互相抢核反而更慢。
+TORCH_THREADS_PER_WORKER = _env_int(
+    "WHISPER_TORCH_THREADS_PER_WORKER",
+    max(1, (os.cpu_count() or 1) // INFERENCE_WORKERS),
+)
+
+# 解码阶段的并发数：ffmpeg 解码与推理分开限流，下一个任务的解码可以与当前任务的推理重叠
+DECODE_WORKERS = _env_int("WHISPER_DECODE_WORKERS", 2)
+# 已解码、等待或正在推理的 PCM 总量上限（MB）；超出时新解码完的音频等待前面的任务用完
+PREFETCH_MAX_MB = _env_int("WHISPER_PREFETCH_MAX_MB", 1024)
+
+# 长音频分段并行：时长超过该值（秒）的音频在静音点切成若干段，分发到多个 worker 并行转录，
+# 再按全局偏移拼接时间戳。0 表示关闭分段，整段交给一次 model.transcribe。
+LONG_AUDIO_THRESHOLD = _env_int("WHISPER_LONG_AUDIO_THRESHOLD", 600, minimum=0)
+# 每段的目标时长（秒），实际切点落在目标附近能量最低的位置
+LONG_AUDIO_CHUNK_SECONDS = _env_int("WHISPER_LONG_AUDIO_CHUNK_SECONDS", 300, minimum=30)
+# 在目标切点前后多少秒内寻找静音切点
+_SPLIT_SEARCH_SECONDS = 30
+# 静音检测的能量帧长（秒）
+_ENERGY_FRAME_SECONDS = 0.1
+
+# 边上传边解码时，等待写入 ffmpeg stdin 的分块上限（约 N × 上传分块大小的内存）
+_STREAM_DECODE_QUEUE_CHUNKS = 16
+# 同时边上传边解码的数量上限：每个进行中的上传占一个 ffmpeg 进程直到上传结束。名额与解码阶段
+# （DECODE_WORKERS）分开，慢速上传不会占住流水线的解码名额；名额用尽时新上传先落盘，之后在解码阶段解码
+STREAM_DECODE_WORKERS = _env_int("WHISPER_STREAM_DECODE_WORKERS", DECODE_WORKERS, minimum=0)
+
+# 批量转录：一次编码器/解码器前向最多堆叠多少个 30 秒窗口
+BATCH_SIZE = _env_int("WHISPER_BATCH_SIZE", 16)
+# 批量转录时并发解码的文件数
+BATCH_DECODE_WORKERS = _env_int("WHISPER_BATCH_DECODE_WORKERS", 4)
+# 与 model.transcribe 默认值一致：判为静音的阈值，以及需要升温重解码的压缩比阈值
+_NO_SPEECH_THRESHOLD = 0.6
+_LOGPROB_THRESHOLD = -1.0
+_COMPRESSION_RATIO_THRESHOLD = 2.4
+# 时间戳 token 的精度（秒）：编码器步长 2 × HOP_LENGTH / 采样率
+_TIMESTAMP_PRECISION = 2 * whisper.audio.HOP_LENGTH / whisper.audio.SAMPLE_RATE
+
+# 语音活动检测（VAD）前置：1 开启。转录前按帧能量/过零率找出语音区间，
+# 只把语音拼接后送入模型，时间戳再映射回原始时间轴
+VAD_ENABLED = _env_int("WHISPER_VAD", 0, minimum=0) > 0
+# 语音帧能量需高于底噪（能量第 10 百分位）多少 dB
+VAD_THRESHOLD_DB = _env_int("WHISPER_VAD_THRESHOLD_DB", 12, minimum=1)
+# 短于该时长（毫秒）的非语音间隙不切除，避免把句中停顿切碎
+VAD_MIN_SILENCE_MS = _env_int("WHISPER_VAD_MIN_SILENCE_MS", 1500, minimum=0)
+# 每个语音区间前后保留的余量（毫秒）
+VAD_PADDING_MS = _env_int("WHISPER_VAD_PADDING_MS", 300, minimum=0)
+_VAD_FRAME_SECONDS = 0.03
+_VAD_MIN_SPEECH_SECONDS = 0.25
+# 过零率高于该值的帧视为宽带噪声（白噪声约 0.5，浊音远低于此）
+_VAD_MAX_ZCR = 0.45
+# 绝对静音线（dBFS），底噪极低时阈值不低于此
+_VAD_FLOOR_DB = -60.0
+# 语音占比超过该比例时不做裁剪，直接用原音频
+_VAD_MIN_SAVING = 0.1
+
+_model_cache: "OrderedDict[str, _CachedModel]" = OrderedDict()
 _model_lock = threading.Lock()
-# 序列化推理：Whisper 模型对象非线程安全，避免同进程并发推理导致结果错乱/崩溃，
-# 同时也限制了同时进行的转录数量，降低峰值内存。
-_inference_lock = threading.Lock()
+# GreedyDual-Size 的"通胀"时钟：每淘汰一个条目推进到它的优先级，让久未使用的条目逐渐贬值
+_cache_clock = 0.0
+# 各模型加载后实测的字节数，用作下次加载前腾挪空间的估计
+_known_model_bytes: dict = {}
+# 正在执行推理的槽位；其它槽位正在使用的模型即使被移出缓存也不会立即释放内存，淘汰时跳过
+_busy_slots: set = set()
+
+
+def _configure_torch_threads():
+    """intra-op 线程池按调用线程各自生效，这里统一设置每个 worker 的线程预算。"""
+    if torch.cuda.is_available():
+        return
+    try:
+        torch.set_num_threads(TORCH_THREADS_PER_WORKER)
+    except Exception:
+        pass
+
+
+_configure_torch_threads()
+
+
+class TranscriptionCancelled(Exception):
+    """转录已通过 CancelToken 取消。"""
+
+
+class CancelToken:
+    """协作式取消令牌：任意线程调用 cancel()，转录流程在下一个检查点抛出 TranscriptionCancelled。
+
+    检查点包括：等待解码/推理槽位与预取配额时、每个 30 秒解码窗口之前、长音频各分段之间；
+    正在运行的 ffmpeg 子进程登记在令牌上，取消时立即被 kill。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TranscriptionCancelled("转录已取消")
+
+    @contextmanager
+    def on_cancel(self, callback):
+        """with 块内取消时调用 callback（如 kill 子进程）；进入时已取消则立即调用。"""
+        with self._lock:
+            registered = not self._event.is_set()
+            if registered:
+                self._callbacks.append(callback)
+        if not registered:
+            callback()
+        try:
+            yield
+        finally:
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+
+# 当前线程正在执行的转录的取消令牌与排队顺序；whisper 内部的逐窗口解码也据此检查取消
+_request_local = threading.local()
+# 可取消的阻塞等待每隔多久检查一次令牌（秒）
+_CANCEL_POLL_SECONDS = 0.5
+
+
+@contextmanager
+def _request_scope(cancel_token: CancelToken | None, sort_key: float | None = None):
+    """在当前线程内启用取消令牌与推理槽位的排队顺序，退出时恢复原值。"""
+    previous = (
+        getattr(_request_local, "cancel_token", None),
+        getattr(_request_local, "sort_key", None),
+    )
+    _request_local.cancel_token = cancel_token
+    _request_local.sort_key = sort_key
+    try:
+        yield
+    finally:
+        _request_local.cancel_token, _request_local.sort_key = previous
+
+
+def _current_cancel_token() -> CancelToken | None:
+    return getattr(_request_local, "cancel_token", None)
+
+
+def _current_sort_key() -> float | None:
+    return getattr(_request_local, "sort_key", None)
+
+
+def _check_cancelled():
+    token = _current_cancel_token()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+class _ByteBudget:
+    """按字节计的阻塞配额；单个请求超过总额时，在配额空闲时仍放行，避免永久等待。"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.held = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, n: int):
+        token = _current_cancel_token()
+        with self._cond:
+            while self.held and self.held + n > self.limit:
+                if token is not None:
+                    token.raise_if_cancelled()
+                    self._cond.wait(_CANCEL_POLL_SECONDS)
+                else:
+                    self._cond.wait()
+            self.held += n
+            metrics.PREFETCH_BYTES.set(self.held)
+
+    def try_acquire(self, n: int) -> bool:
+        """非阻塞版本的 acquire：配额不足时立即返回 False。"""
+        with self._cond:
+            if self.held and self.held + n > self.limit:
+                return False
+            self.held += n
+            metrics.PREFETCH_BYTES.set(self.held)
+            return True
+
+    def release(self, n: int):
+        with self._cond:
+            self.held -= n
+            metrics.PREFETCH_BYTES.set(self.held)
+            self._cond.notify_all()
+
+
+_decode_slots = threading.BoundedSemaphore(DECODE_WORKERS)
+_stream_decode_slots = threading.BoundedSemaphore(max(1, STREAM_DECODE_WORKERS))
+_prefetch_budget = _ByteBudget(PREFETCH_MAX_MB * 1024 * 1024)
+
+
+@contextmanager
+def _decode_slot():
+    """占用一个解码并发名额；等待期间响应当前线程的取消令牌。"""
+    token = _current_cancel_token()
+    if token is None:
+        _decode_slots.acquire()
+    else:
+        while not _decode_slots.acquire(timeout=_CANCEL_POLL_SECONDS):
+            token.raise_if_cancelled()
+    try:
+        yield
+    finally:
+        _decode_slots.release()
+
+
+class _SlotPool:
+    """推理 worker 槽位池：Whisper 模型对象非线程安全，每个槽位绑定自己的模型副本，
+    线程拿到槽位后才能解码+推理，既避免并发使用同一模型对象，也限制了峰值内存。
+
+    等待者按 (sort_key, 到达顺序) 排队，归还的槽位直接交给排在最前的等待者，
+    长音频的分段线程归还后立即再取也插不了队，短任务不会被一直压在后面。
+    """
+
+    def __init__(self, size: int):
+        self._free = list(range(size))
+        self._waiters = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def acquire(self, sort_key: float | None, token: CancelToken | None) -> int:
+        with self._lock:
+            if self._free and not self._waiters:
+                return self._free.pop()
+            # 未指定顺序的请求（同步接口、批量转录）按到达时刻排队
+            key = time.time() if sort_key is None else sort_key
+            waiter = [None, threading.Event()]
+            heapq.heappush(self._waiters, (key, next(self._seq), waiter))
+        while not waiter[1].wait(None if token is None else _CANCEL_POLL_SECONDS):
+            if token.cancelled:
+                with self._lock:
+                    if waiter[0] is None:
+                        self._waiters = [w for w in self._waiters if w[2] is not waiter]
+                        heapq.heapify(self._waiters)
+                        token.raise_if_cancelled()
+                # 取消与分配槽位同时发生：槽位已交到手上，照常返回，由调用方在检查点退出
+                break
+        return waiter[0]
+
+    def release(self, slot: int):
+        with self._lock:
+            if self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                waiter[0] = slot
+                waiter[1].set()
+            else:
+                self._free.append(slot)
+
+
+_inference_slots = _SlotPool(INFERENCE_WORKERS)
+
+
+@contextmanager
+def _inference_worker():
+    """占用一个推理 worker 槽位，退出时归还；槽位用尽时按当前线程的 sort_key 排队等待
+    （可被取消令牌打断）。"""
+    with metrics.INFERENCE_WAIT_SECONDS.time():
+        slot = _inference_slots.acquire(_current_sort_key(), _current_cancel_token())
+    _busy_slots.add(slot)
+    try:
+        yield slot
+    finally:
+        _busy_slots.discard(slot)
+        _inference_slots.release(slot)
 
 
 def format_timestamp(seconds: float) -> str:
@@ -96,30 +403,480 @@ def _get_device():
     return "cuda" if torch.cuda.is_available() else "cpu"
 
 
-def _evict_until_within_limit():
-    """在持有 _model_lock 的前提下调用：淘汰超出上限的最久未使用模型并释放资源。"""
-    while len(_model_cache) > MAX_CACHED_MODELS:
-        _, old_model = _model_cache.popitem(last=False)
-        del old_model
+# 量化模型变体的名称后缀，如 base-int8：Linear 层权重动态量化为 int8，仅在 CPU 上推理
+QUANTIZED_SUFFIX = "-int8"
+
+
+def is_quantized_model(model_name: str) -> bool:
+    return model_name.endswith(QUANTIZED_SUFFIX)
+
+
+def _model_device(model_name: str) -> str:
+    """模型实际运行的设备，由模型名对应的推理引擎决定。"""
+    engine, base_name = engines.split_model_name(model_name)
+    return engine.device(base_name)
+
+
+def _model_cache_key(model_name: str, slot: int) -> str:
+    return f"{model_name}_{_model_device(model_name)}_{slot}"
+
+
+def _quantize_linear_int8(model):
+    """把模型中所有 Linear 层替换为 int8 动态量化版本（权重 int8 常驻，激活按批量化）。
+
+    whisper 自带的 Linear 子类只是在 forward 里把权重转成输入的 dtype，CPU/fp32 下与
+    torch.nn.Linear 等价；quantize_dynamic 按精确类型匹配，先把它们还原成 nn.Linear。
+    卷积前端与词嵌入（同时用作输出投影）保持 fp32。
+    """
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+
+
+# mmap 权重文件格式版本，格式变化时递增，旧文件按新文件名重新生成
+_MMAP_WEIGHTS_VERSION = 1
+_MMAP_SUPPORTED = "mmap" in inspect.signature(torch.load).parameters
+
+
+def _mmap_weights_path(model_name: str) -> Path | None:
+    """官方模型的 mmap 权重文件路径（文件名含原始 checkpoint 的 sha256，模型更新后自然换新）。"""
+    if not MODEL_MMAP_DIR or not _MMAP_SUPPORTED or model_name not in whisper._MODELS:
+        return None
+    checksum = whisper._MODELS[model_name].split("/")[-2]
+    return Path(MODEL_MMAP_DIR) / f"{model_name}-{checksum[:16]}-v{_MMAP_WEIGHTS_VERSION}.pt"
+
+
+def _save_mmap_weights(model, path: Path):
+    """把已加载的模型按推理时的 dtype 另存为可 mmap 的 checkpoint（先写临时文件再原子替换）。
+
+    非持久化缓冲区（解码器的注意力掩码、对齐头）不在 state_dict 里，单独保存；
+    稀疏张量以稠密形式保存，加载时再转换。
+    """
+    persistent = set(model.state_dict())
+    extra = {name: buf for name, buf in model.named_buffers() if name not in persistent}
+    checkpoint = {
+        "dims": dataclasses.asdict(model.dims),
+        "model_state_dict": {k: v.cpu() for k, v in model.state_dict().items()},
+        "buffers": {
+            name: (buf.to_dense() if buf.is_sparse else buf).cpu() for name, buf in extra.items()
+        },
+        "sparse_buffers": [name for name, buf in extra.items() if buf.is_sparse],
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        torch.save(checkpoint, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _load_mmap_weights(path: Path):
+    """以 mmap 方式加载 _save_mmap_weights 保存的模型，返回 CPU 上的 Whisper。
+
+    骨架建在 meta 设备上不分配内存，load_state_dict(assign=True) 直接换成映射到文件的张量。
+    Whisper.__init__ 中的稀疏对齐头不支持 meta 设备，这里分别构建编码器与解码器。
+    """
+    from whisper.model import AudioEncoder, ModelDimensions, TextDecoder, Whisper
+
+    checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    dims = ModelDimensions(**checkpoint["dims"])
+    model = Whisper.__new__(Whisper)
+    torch.nn.Module.__init__(model)
+    model.dims = dims
+    with torch.device("meta"):
+        model.encoder = AudioEncoder(
+            dims.n_mels, dims.n_audio_ctx, dims.n_audio_state, dims.n_audio_head, dims.n_audio_layer
+        )
+        model.decoder = TextDecoder(
+            dims.n_vocab, dims.n_text_ctx, dims.n_text_state, dims.n_text_head, dims.n_text_layer
+        )
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+    sparse = set(checkpoint["sparse_buffers"])
+    for name, buf in checkpoint["buffers"].items():
+        module_name, _, attr = name.rpartition(".")
+        model.get_submodule(module_name).register_buffer(
+            attr, buf.to_sparse() if name in sparse else buf, persistent=False
+        )
+    return model.eval()
+
+
+def _load_base_model(model_name: str):
+    """加载未量化的模型到 CPU：优先 mmap 权重文件，没有时完整加载一次并转换。"""
+    path = _mmap_weights_path(model_name)
+    if path is None:
+        return whisper.load_model(model_name, device="cpu")
+    if path.exists():
+        try:
+            return _load_mmap_weights(path)
+        except Exception:
+            # 文件损坏或版本不兼容：删掉重新转换
+            path.unlink(missing_ok=True)
+    model = whisper.load_model(model_name, device="cpu")
+    try:
+        _save_mmap_weights(model, path)
+    except OSError:
+        # 转换是尽力而为，磁盘不可写时继续使用已加载的模型
+        return model
+    # 换成映射到文件的副本（文件页刚写入，仍在页缓存中），反序列化出的匿名内存随之释放
+    del model
+    return _load_mmap_weights(path)
+
+
+def _load_whisper_model(model_name: str):
+    if not is_quantized_model(model_name):
+        return _load_base_model(model_name).to(_get_device())
+    base_name = model_name[: -len(QUANTIZED_SUFFIX)]
+    model = _load_base_model(base_name)
+    return _quantize_linear_int8(model).eval()
+
+
+class _CachedModel:
+    """模型缓存条目：模型对象及淘汰决策需要的大小、加载代价与命中次数。"""
+
+    __slots__ = ("model", "model_name", "slot", "nbytes", "load_seconds", "hits", "priority")
+
+    def __init__(self, model, model_name: str, slot: int, nbytes: int, load_seconds: float):
+        self.model = model
+        self.model_name = model_name
+        self.slot = slot
+        self.nbytes = nbytes
+        self.load_seconds = load_seconds
+        self.hits = 1
+        self.priority = 0.0
+
+    def touch(self):
+        """GDSF 优先级 = 时钟 + 命中次数 × 重新加载耗时 / 大小：
+        加载越慢、越常用、越小的模型越值得留下。"""
+        self.priority = _cache_clock + self.hits * self.load_seconds / max(
+            self.nbytes / 1024 / 1024, 1.0
+        )
+
+
+def _model_nbytes(model) -> int:
+    """模型实际占用的字节数：参数与缓冲区；量化层的打包权重不在 parameters() 中，按 state_dict 统计。"""
+    total = 0
+    for value in model.state_dict().values():
+        tensors = value if isinstance(value, (tuple, list)) else (value,)
+        for t in tensors:
+            if isinstance(t, torch.Tensor):
+                total += t.nelement() * t.element_size()
+    return total
+
+
+def _model_size_hint(model_name: str) -> int:
+    """加载前估计模型大小：优先用本进程实测值，否则按下载缓存中的 checkpoint 估算。"""
+    if model_name in _known_model_bytes:
+        return _known_model_bytes[model_name]
+    engine, base_name = engines.split_model_name(model_name)
+    if engine.name != WhisperEngine.name:
+        return 0
+    base_name = base_name.removesuffix(QUANTIZED_SUFFIX)
+    url = getattr(whisper, "_MODELS", {}).get(base_name)
+    if not url:
+        return 0
+    download_root = os.path.join(
+        os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "whisper"
+    )
+    try:
+        checkpoint_bytes = os.path.getsize(os.path.join(download_root, os.path.basename(url)))
+    except OSError:
+        return 0
+    # checkpoint 为 fp16，CPU 上以 fp32 加载约为两倍；int8 变体（Linear 权重 int8，卷积与词嵌入仍为 fp32）
+    # 粗估为与 checkpoint 相当，未在真实模型上校准，加载后以实测值为准
+    if is_quantized_model(model_name) or _get_device() == "cuda":
+        return checkpoint_bytes
+    return checkpoint_bytes * 2
+
+
+def _cgroup_memory_limit() -> int | None:
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                raw = f.read().strip()
+        except OSError:
+            continue
+        if raw.isdigit() and int(raw) < 1 << 60:
+            return int(raw)
+    return None
+
+
+def _physical_memory_bytes() -> int | None:
+    try:
+        if sys.platform == "win32":
+            import ctypes
+
+            class _MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("sullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+            status = _MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(status)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+            return int(status.ullTotalPhys)
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except Exception:
+        return None
+
+
+def _model_cache_budget() -> int:
+    """模型缓存的字节预算，见 WHISPER_MODEL_CACHE_MAX_MB。"""
+    if MODEL_CACHE_MAX_MB:
+        return MODEL_CACHE_MAX_MB * 1024 * 1024
+    if _get_device() == "cuda":
+        limit = torch.cuda.get_device_properties(0).total_memory
+    else:
+        limits = [m for m in (_cgroup_memory_limit(), _physical_memory_bytes()) if m]
+        limit = min(limits) if limits else None
+    if not limit:
+        # 无法探测内存时退化为只缓存一份模型
+        return 0
+    return limit * MODEL_CACHE_MEMORY_PERCENT // 100
+
+
+def _cached_bytes() -> int:
+    return sum(entry.nbytes for entry in _model_cache.values())
+
+
+def _evict_to_fit(incoming_bytes: int, slot: int, keep: str | None = None):
+    """在持有 _model_lock 的前提下调用：按 GDSF 优先级淘汰，直到缓存加上 incoming_bytes 不超预算。
+
+    常驻模型、keep 指定的条目以及其它 worker 正在使用的槽位上的副本不会被淘汰；
+    可淘汰的都淘汰完仍超预算时放弃（仍然加载，不让请求失败）。
+    """
+    global _cache_clock
+    budget = _model_cache_budget()
+    evicted = False
+    while _model_cache and _cached_bytes() + incoming_bytes > budget:
+        candidates = [
+            (key, entry)
+            for key, entry in _model_cache.items()
+            if key != keep
+            and entry.model_name not in PINNED_MODELS
+            and (entry.slot == slot or entry.slot not in _busy_slots)
+        ]
+        if not candidates:
+            break
+        key, entry = min(candidates, key=lambda item: item[1].priority)
+        _cache_clock = entry.priority
+        del _model_cache[key]
+        metrics.MODEL_CACHE_EVICTIONS.inc(model=entry.model_name)
+        evicted = True
+    metrics.MODEL_CACHE_BYTES.set(_cached_bytes())
+    if evicted:
         gc.collect()
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
 
 
-def _load_model_cached(model_name: str):
-    device = _get_device()
-    cache_key = f"{model_name}_{device}"
-    with _model_lock:
-        if cache_key in _model_cache:
-            # 命中缓存，标记为最近使用
-            _model_cache.move_to_end(cache_key)
-            return _model_cache[cache_key]
-        model = whisper.load_model(model_name, device=device)
-        _model_cache[cache_key] = model
-        _model_cache.move_to_end(cache_key)
-        _evict_until_within_limit()
+_feature_cache = feature_cache.FeatureCache(FEATURE_CACHE_DIR, FEATURE_CACHE_MAX_MB * 1024 * 1024)
+
+
+def _install_feature_cache(model, model_name: str):
+    """让 model.decode / model.detect_language 先查编码器特征缓存，用特征代替 log-mel 传入。
+
+    whisper 在输入形状为 (n_audio_ctx, n_audio_state) 时跳过编码器。同一窗口在语言检测、首次解码与
+    温度回退重试之间会被反复编码，最近一个窗口的特征留在内存里直接复用；磁盘缓存开启时跨请求复用。
+    """
+    decode, detect_language = model.decode, model.detect_language
+    feature_shape = (model.dims.n_audio_ctx, model.dims.n_audio_state)
+    # 最近一次单窗口调用的 [log-mel, 特征]；在设备上直接比较输入，不拷回 CPU、不算哈希
+    recent = []
+
+    def _is_recent(mel) -> bool:
+        if not recent:
+            return False
+        last = recent[0]
+        return last is mel or (
+            last.shape == mel.shape
+            and last.dtype == mel.dtype
+            and last.device == mel.device
+            and torch.equal(last, mel)
+        )
+
+    def _encode(mel):
+        if mel.shape[-2:] == feature_shape:
+            return mel
+        if _is_recent(mel):
+            metrics.FEATURE_CACHE_REQUESTS.inc(result="memory")
+            return recent[1]
+        batch = mel if mel.ndim == 3 else mel.unsqueeze(0)
+        features = [None] * len(batch)
+        keys = None
+        # 磁盘缓存关闭（默认）时不拷贝、不计算键
+        if _feature_cache.enabled:
+            model_id = f"{model_name}|{batch.device.type}"
+            keys = [_feature_cache.make_key(model_id, item) for item in batch.cpu().numpy()]
+            for i, key in enumerate(keys):
+                cached = _feature_cache.get(key)
+                if cached is not None:
+                    features[i] = torch.from_numpy(cached).to(batch.device)
+                    metrics.FEATURE_CACHE_REQUESTS.inc(result="disk")
+        missing = [i for i, f in enumerate(features) if f is None]
+        if missing:
+            metrics.FEATURE_CACHE_REQUESTS.inc(len(missing), result="miss")
+            with torch.no_grad():
+                encoded = model.encoder(batch[missing])
+            for i, feature in zip(missing, encoded):
+                features[i] = feature
+                if keys is not None:
+                    _feature_cache.put(keys[i], feature.cpu().numpy())
+        result = torch.stack(features) if mel.ndim == 3 else features[0]
+        recent.clear()
+        if len(batch) == 1:
+            recent.extend((mel, result))
+        return result
+
+    def _decode(mel, options=None, **kwargs):
+        options = options or whisper.DecodingOptions()
+        if kwargs:
+            options = dataclasses.replace(options, **kwargs)
+        # 与 DecodingTask 一致：fp16 时先把 log-mel 转成半精度再编码
+        if options.fp16:
+            mel = mel.half()
+        return decode(_encode(mel), options)
+
+    def _detect_language(mel, tokenizer=None):
+        return detect_language(_encode(mel), tokenizer)
+
+    model.decode = _decode
+    model.detect_language = _detect_language
+
+
+# whisper.transcribe 的代码对象：逐窗口推送分段时据此在调用栈中找到它的帧
+_WHISPER_TRANSCRIBE_CODE = whisper.transcribe.__code__
+
+
+class _WindowSegments:
+    """WhisperEngine.transcribe 期间登记在当前线程上，把已解码窗口的分段逐条交给回调（每段一次）。"""
+
+    def __init__(self, segment_callback):
+        self.segment_callback = segment_callback
+        self.emitted = 0
+
+    def flush(self, segments: list):
+        for seg in segments[self.emitted :]:
+            self.segment_callback(seg)
+        self.emitted = len(segments)
+
+
+def _flush_window_segments():
+    """whisper.transcribe 解码完一个窗口后先把分段追加到局部变量 all_segments，再解码下一个窗口。
+    在 model.decode 被调用时从调用栈取到该列表，推送上一窗口新增的分段；未登记回调时不做任何事。"""
+    window_segments = getattr(_request_local, "window_segments", None)
+    if window_segments is None:
+        return
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code is not _WHISPER_TRANSCRIBE_CODE:
+        frame = frame.f_back
+    if frame is not None:
+        window_segments.flush(frame.f_locals.get("all_segments", []))
+
+
+def _install_window_hook(model):
+    """whisper.transcribe 逐个 30 秒窗口调用 model.decode：在每个窗口之前推送上一窗口的分段，
+    并检查当前线程的取消令牌。"""
+    decode = model.decode
+
+    def _decode(*args, **kwargs):
+        _flush_window_segments()
+        _check_cancelled()
+        return decode(*args, **kwargs)
+
+    model.decode = _decode
+
+
+@engines.register_engine
+class WhisperEngine(engines.InferenceEngine):
+    """openai-whisper：权重走 mmap 存储，-int8 变体为 CPU 上的动态量化，支持堆叠批量解码。"""
+
+    name = "whisper"
+    supports_batch_decode = True
+
+    def device(self, model_name: str) -> str:
+        # 动态量化算子只有 CPU 实现，量化变体固定在 CPU
+        return "cpu" if is_quantized_model(model_name) else _get_device()
+
+    def load(self, model_name: str, cpu_threads: int):
+        # torch 的 intra-op 线程数已按 worker 线程各自设置（_configure_torch_threads）
+        model = _load_whisper_model(model_name)
+        _install_feature_cache(model, model_name)
+        _install_window_hook(model)
         return model
 
+    def transcribe(
+        self, model, audio, transcribe_kwargs: dict, check_cancelled, segment_callback=None
+    ) -> dict:
+        # 取消检查与分段推送都装在 model.decode 上，逐个 30 秒窗口生效
+        if segment_callback is None:
+            return model.transcribe(audio, **transcribe_kwargs)
+        window_segments = _WindowSegments(segment_callback)
+        previous = getattr(_request_local, "window_segments", None)
+        _request_local.window_segments = window_segments
+        try:
+            result = model.transcribe(audio, **transcribe_kwargs)
+        finally:
+            _request_local.window_segments = previous
+        # 最后一个窗口之后不再调用 decode，其分段在这里推送
+        window_segments.flush(result["segments"])
+        return result
+
+    def model_nbytes(self, model) -> int:
+        return _model_nbytes(model)
+
+
+def _engine_transcribe(
+    model_name: str, model, audio, transcribe_kwargs: dict, segment_callback=None
+) -> dict:
+    """用模型名对应的引擎转录，返回与 model.transcribe 相同结构的结果。
+
+    segment_callback 见 InferenceEngine.transcribe（分段时间相对 audio）。
+    """
+    engine, _ = engines.split_model_name(model_name)
+    return engine.transcribe(model, audio, transcribe_kwargs, _check_cancelled, segment_callback)
+
+
+def _load_model_cached(model_name: str, slot: int = 0):
+    """加载（或命中缓存）指定 worker 槽位的模型副本。"""
+    cache_key = _model_cache_key(model_name, slot)
+    with _model_lock:
+        entry = _model_cache.get(cache_key)
+        if entry is not None:
+            entry.hits += 1
+            entry.touch()
+            metrics.MODEL_CACHE_REQUESTS.inc(model=model_name, result="hit")
+            return entry.model
+        # 先按估计大小腾出空间，避免新模型与待淘汰的模型同时驻留造成内存峰值
+        _evict_to_fit(_model_size_hint(model_name), slot)
+    metrics.MODEL_CACHE_REQUESTS.inc(model=model_name, result="miss")
+    # 加载在锁外进行：不同槽位可以并行加载各自的副本，不互相阻塞
+    engine, base_name = engines.split_model_name(model_name)
+    started = time.perf_counter()
+    with metrics.MODEL_LOAD_SECONDS.time(model=model_name):
+        model = engine.load(base_name, TORCH_THREADS_PER_WORKER)
+    entry = _CachedModel(
+        model, model_name, slot, engine.model_nbytes(model), time.perf_counter() - started
+    )
+    with _model_lock:
+        entry.touch()
+        _known_model_bytes[model_name] = entry.nbytes
+        _model_cache[cache_key] = entry
+        _evict_to_fit(0, slot, keep=cache_key)
+    return model
+
 
 def _trim_process_memory():
     """把已释放的内存尽量归还操作系统。
@@ -152,16 +909,20 @@ def _trim_process_memory():
     except Exception:
         # 内存裁剪是尽力而为，失败不影响主流程
         pass
+    rss = metrics.current_rss_bytes()
+    if rss is not None:
+        metrics.PROCESS_RSS_BYTES.set(rss)
 
 
 def release_model(model_name: str = None):
+    """卸载指定模型（None 为全部）的所有副本；常驻模型（WHISPER_PINNED_MODELS）保留。"""
     with _model_lock:
-        if model_name is None:
-            _model_cache.clear()
-        else:
-            device = _get_device()
-            cache_key = f"{model_name}_{device}"
-            _model_cache.pop(cache_key, None)
+        for cache_key, entry in list(_model_cache.items()):
+            if entry.model_name in PINNED_MODELS:
+                continue
+            if model_name is None or entry.model_name == model_name:
+                del _model_cache[cache_key]
+        metrics.MODEL_CACHE_BYTES.set(_cached_bytes())
     _trim_process_memory()
 
 
@@ -184,19 +945,29 @@ def _read_text_tail(path: str, max_bytes: int = 4096) -> str:
 
 
 def _run_ffmpeg(cmd: list[str], timeout: int) -> int:
-    """运行 ffmpeg，stdin/stdout/stderr 全部丢弃，绝不创建 PIPE 读线程。"""
-    proc = subprocess.Popen(
-        cmd,
-        stdin=subprocess.DEVNULL,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-    )
-    try:
-        proc.wait(timeout=timeout)
-    except subprocess.TimeoutExpired as e:
-        proc.kill()
-        proc.wait()
-        raise e
+    """运行 ffmpeg，stdin/stdout/stderr 全部丢弃，绝不创建 PIPE 读线程。
+
+    当前线程的转录被取消时立即 kill 子进程并抛出 TranscriptionCancelled。
+    """
+    token = _current_cancel_token()
+    with metrics.FFMPEG_SECONDS.time():
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            if token is None:
+                proc.wait(timeout=timeout)
+            else:
+                with token.on_cancel(proc.kill):
+                    proc.wait(timeout=timeout)
+                token.raise_if_cancelled()
+        except subprocess.TimeoutExpired as e:
+            proc.kill()
+            proc.wait()
+            raise e
     return proc.returncode
 
 
@@ -223,19 +994,110 @@ def _pcm_file_to_float32(pcm_path: str) -> np.ndarray:
     return audio
 
 
-def _load_audio_with_timeout(file: str, sr: int = _WHISPER_SAMPLE_RATE):
-    """带超时的音频解码（等价于 whisper.load_audio）。
+class _PcmAudio:
+    """ffmpeg 解码出的 s16le 单声道 PCM 文件，以 np.memmap 映射、按转录单位转换为 float32。
+
+    整段音频只以 int16 形式留在磁盘/页缓存中（可被系统回收），推理时才取出一个转录单位的
+    float32 拷贝。内存上限按转录单位而不是 30 秒窗口计：whisper.transcribe 要对传入的整段计算
+    log-mel 并据上一窗口的时间戳决定下一窗口的起点，不能再按窗口流式送入，每个推理 worker 同时
+    常驻一个单位的 float32 音频与 log-mel（约 96KB/秒）。短于 LONG_AUDIO_THRESHOLD 的音频整段为
+    一个单位（默认 600 秒约 58MB）；更长的按 LONG_AUDIO_CHUNK_SECONDS 分段，每段一个单位
+    （默认 300 秒约 29MB）；阈值为 0（关闭分段）时整段录音为一个单位，上限随录音时长增长。
+    close() 时删除临时文件（delete=False 时保留）。
+    """
+
+    def __init__(self, pcm_path: str, sr: int = _WHISPER_SAMPLE_RATE, delete: bool = True):
+        file_size = os.path.getsize(pcm_path)
+        if file_size < 2 or file_size % 2 != 0:
+            raise RuntimeError("音频解码结果无效（PCM 文件为空或损坏）")
+        self.path = pcm_path
+        self.sr = sr
+        self._delete = delete
+        self._pcm = np.memmap(pcm_path, dtype=np.int16, mode="r")
+
+    def __len__(self) -> int:
+        return len(self._pcm)
+
+    @property
+    def duration(self) -> float:
+        return len(self._pcm) / self.sr
+
+    def window(self, start: int, end: int) -> np.ndarray:
+        """返回 [start, end) 样本区间的 float32 拷贝（范围 -1~1）。"""
+        out = self._pcm[start:end].astype(np.float32)
+        out *= 1.0 / 32768.0
+        return out
+
+    def to_float32(self) -> np.ndarray:
+        """整段转换为 float32，用于整段作为一个转录单位的音频（见类说明）。"""
+        return _pcm_file_to_float32(self.path)
+
+    def close(self):
+        # Windows 上文件被映射时无法删除，先释放映射
+        self._pcm = None
+        if self._delete and os.path.exists(self.path):
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_PROBE_TIMEOUT_SECONDS = 30
+
+
+def probe_duration(audio_path: str, pcm_path: str | None = None) -> float | None:
+    """估计音频时长（秒），用于排队调度；拿不到时返回 None。
+
+    已有解码好的 PCM 时直接按文件大小换算；否则用 ffprobe 只读容器头部的时长，
+    不做完整解码（输出只有一行，这里用 PIPE 无妨）。
+    """
+    if pcm_path:
+        try:
+            return os.path.getsize(pcm_path) / 2 / _WHISPER_SAMPLE_RATE
+        except OSError:
+            pass
+    try:
+        proc = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-show_entries",
+                "format=duration",
+                "-of",
+                "default=noprint_wrappers=1:nokey=1",
+                audio_path,
+            ],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=_PROBE_TIMEOUT_SECONDS,
+        )
+        duration = float(proc.stdout.decode(errors="ignore").strip())
+    except (OSError, subprocess.TimeoutExpired, ValueError):
+        return None
+    return duration if duration > 0 else None
+
+
+def _decode_audio_to_pcm(file: str, sr: int = _WHISPER_SAMPLE_RATE) -> _PcmAudio:
+    """带超时的音频解码，返回映射在临时 PCM 文件上的 _PcmAudio（调用方负责 close）。
 
     关键点：ffmpeg 的 stdout/stderr 都不走内存管道（subprocess.PIPE）。
     whisper 默认 load_audio 用 capture_output=True，长音频会在 _readerthread 里
     fh.read() 整段 stdout，极易 MemoryError；这里改为：
-    - PCM 由 ffmpeg 直接写临时文件；
+    - PCM 由 ffmpeg 直接写临时文件，之后以 memmap 按需读取；
     - 子进程三流全部 DEVNULL，由 Popen.wait 等待，可超时 kill；
     - 失败时再用 -logfile 写盘读尾部错误信息（仍不走 PIPE）。
   """
     fd, pcm_path = tempfile.mkstemp(suffix=".pcm")
     os.close(fd)
     err_path = None
+    keep_pcm = False
     cmd = [
         "ffmpeg",
         "-nostdin",
@@ -283,13 +1145,15 @@ def _load_audio_with_timeout(file: str, sr: int = _WHISPER_SAMPLE_RATE):
             detail = _read_text_tail(err_path) or f"ffmpeg exit code {returncode}"
             raise RuntimeError(f"音频解码失败: {detail}")
 
-        return _pcm_file_to_float32(pcm_path)
+        pcm = _PcmAudio(pcm_path, sr)
+        keep_pcm = True
+        return pcm
     except subprocess.TimeoutExpired as e:
         raise RuntimeError(
             f"音频解码超时（>{AUDIO_LOAD_TIMEOUT}s），文件可能过大或已损坏"
         ) from e
     finally:
-        for _p in (pcm_path, err_path):
+        for _p in (None if keep_pcm else pcm_path, err_path):
             if _p and os.path.exists(_p):
                 try:
                     os.unlink(_p)
@@ -297,6 +1161,531 @@ def _load_audio_with_timeout(file: str, sr: int = _WHISPER_SAMPLE_RATE):
                     pass
 
 
+class StreamingDecoder:
+    """边接收上传边解码：上传分块经后台线程写入 ffmpeg 的 stdin，PCM 直接写到 pcm_path。
+
+    解码与网络传输重叠进行，上传结束时解码基本也已完成，省去事后再整读一遍原文件。
+    - start() 在有空闲的流式解码名额（STREAM_DECODE_WORKERS）时创建解码器，否则返回 None，
+      调用方改为先落盘、之后在解码阶段解码；名额在 finish()/abort() 时归还；
+    - 解码出的 PCM 随增长计入预取预算（PREFETCH_MAX_MB），预算用尽时终止 ffmpeg，finish() 返回 None，
+      同样退回落盘后解码（届时在解码阶段排队等预算）；预算在 finish()/abort() 时归还，
+      PCM 进入解码阶段时再按整段重新计入；
+    - try_feed() 非阻塞投递分块，队列满时返回 False，调用方改在线程中调用 feed()；
+    - finish() 关闭 stdin 并等待 ffmpeg 结束，成功返回 PCM 路径，失败返回 None。
+      部分格式无法从管道解码（如 moov 位于文件末尾的 mp4/m4a），调用方此时应退回从落盘文件解码；
+    - abort() 终止 ffmpeg 并删除 PCM。
+    """
+
+    def __init__(self, pcm_path: str | None = None, sr: int = _WHISPER_SAMPLE_RATE):
+        if pcm_path is None:
+            fd, pcm_path = tempfile.mkstemp(suffix=".pcm")
+            os.close(fd)
+        self.pcm_path = pcm_path
+        self.sr = sr
+        self._queue: "queue.Queue[bytes | None]" = queue.Queue(maxsize=_STREAM_DECODE_QUEUE_CHUNKS)
+        self._broken = False
+        self._holds_slot = False
+        # 已计入预取预算的 PCM 字节数
+        self._charged = 0
+        self._started = time.perf_counter()
+        self._proc = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-hide_banner",
+                "-y",
+                "-loglevel",
+                "error",
+                "-nostats",
+                "-threads",
+                "0",
+                "-i",
+                "pipe:0",
+                "-f",
+                "s16le",
+                "-ac",
+                "1",
+                "-acodec",
+                "pcm_s16le",
+                "-ar",
+                str(sr),
+                pcm_path,
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self._writer = threading.Thread(
+            target=self._pump, name="ffmpeg-stdin", daemon=True
+        )
+        self._writer.start()
+
+    @classmethod
+    def start(
+        cls, pcm_path: str | None = None, sr: int = _WHISPER_SAMPLE_RATE
+    ) -> "StreamingDecoder | None":
+        """非阻塞地占用一个流式解码名额并启动 ffmpeg；名额用尽（或 STREAM_DECODE_WORKERS=0）时返回 None。"""
+        if STREAM_DECODE_WORKERS <= 0 or not _stream_decode_slots.acquire(blocking=False):
+            return None
+        try:
+            decoder = cls(pcm_path, sr)
+        except BaseException:
+            _stream_decode_slots.release()
+            raise
+        decoder._holds_slot = True
+        return decoder
+
+    def _release_slot(self):
+        if self._holds_slot:
+            self._holds_slot = False
+            _stream_decode_slots.release()
+
+    def _pcm_size(self) -> int:
+        try:
+            return os.path.getsize(self.pcm_path)
+        except OSError:
+            return 0
+
+    def _charge(self, size: int) -> bool:
+        """把 PCM 新增的部分计入预取预算；预算不足时返回 False。"""
+        delta = size - self._charged
+        if delta <= 0:
+            return True
+        if not _prefetch_budget.try_acquire(delta):
+            return False
+        self._charged = size
+        return True
+
+    def _release_budget(self):
+        if self._charged:
+            _prefetch_budget.release(self._charged)
+            self._charged = 0
+
+    def _pump(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            if self._broken:
+                # ffmpeg 已提前退出，继续取空队列，不让投递方阻塞
+                continue
+            try:
+                self._proc.stdin.write(chunk)
+            except OSError:
+                self._broken = True
+                continue
+            if not self._charge(self._pcm_size()):
+                # 预取预算已满：放弃流式解码，由调用方落盘后在解码阶段解码
+                self._broken = True
+                self._proc.kill()
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+
+    def try_feed(self, chunk: bytes) -> bool:
+        try:
+            self._queue.put_nowait(chunk)
+            return True
+        except queue.Full:
+            return False
+
+    def feed(self, chunk: bytes):
+        self._queue.put(chunk)
+
+    def _discard(self):
+        if os.path.exists(self.pcm_path):
+            try:
+                os.unlink(self.pcm_path)
+            except OSError:
+                pass
+
+    def finish(self) -> str | None:
+        self._queue.put(None)
+        self._writer.join()
+        try:
+            returncode = self._proc.wait(timeout=AUDIO_LOAD_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            self._proc.wait()
+            returncode = -1
+        self._release_slot()
+        metrics.FFMPEG_SECONDS.observe(time.perf_counter() - self._started)
+        size = self._pcm_size()
+        ok = (
+            returncode == 0
+            and not self._broken
+            and size >= 2
+            and size % 2 == 0
+            and self._charge(size)
+        )
+        self._release_budget()
+        if ok:
+            return self.pcm_path
+        self._discard()
+        return None
+
+    def abort(self):
+        self._proc.kill()
+        self._queue.put(None)
+        self._writer.join()
+        self._proc.wait()
+        self._release_slot()
+        self._release_budget()
+        self._discard()
+
+
+def _load_audio_with_timeout(file: str, sr: int = _WHISPER_SAMPLE_RATE):
+    """带超时的音频解码（等价于 whisper.load_audio），返回完整的 float32 数组。"""
+    with _decode_audio_to_pcm(file, sr) as pcm:
+        return pcm.to_float32()
+
+
+def _frame_rms(audio: np.ndarray, frame_samples: int) -> np.ndarray:
+    """按帧计算 RMS 能量（向量化），尾部不足一帧的样本忽略。"""
+    n_frames = len(audio) // frame_samples
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[: n_frames * frame_samples].reshape(n_frames, frame_samples)
+    return np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+
+
+def _split_on_silence(
+    audio: _PcmAudio, sr: int = _WHISPER_SAMPLE_RATE
+) -> list[tuple[int, int]]:
+    """把长音频切成若干 [start, end) 样本区间，切点选在目标时长附近能量最低处。
+
+    只在每个候选切点前后 _SPLIT_SEARCH_SECONDS 的窗口内转换并计算能量，
+    不会为整段音频生成额外的临时数组。短于阈值的音频返回单一区间。
+    """
+    n_samples = len(audio)
+    if not LONG_AUDIO_THRESHOLD or n_samples <= LONG_AUDIO_THRESHOLD * sr:
+        return [(0, n_samples)]
+
+    chunk_samples = LONG_AUDIO_CHUNK_SECONDS * sr
+    search_samples = _SPLIT_SEARCH_SECONDS * sr
+    frame_samples = max(1, int(_ENERGY_FRAME_SECONDS * sr))
+    chunks = []
+    cursor = 0
+    # 剩余部分不足一段加搜索窗口时并入最后一段，避免切出过短的尾巴
+    while n_samples - cursor > chunk_samples + search_samples:
+        window_start = cursor + chunk_samples - search_samples
+        window_end = cursor + chunk_samples + search_samples
+        rms = _frame_rms(audio.window(window_start, window_end), frame_samples)
+        cut = window_start + int(np.argmin(rms)) * frame_samples + frame_samples // 2
+        chunks.append((cursor, cut))
+        cursor = cut
+    chunks.append((cursor, n_samples))
+    return chunks
+
+
+def _vad_frame_features(audio: _PcmAudio, sr: int = _WHISPER_SAMPLE_RATE):
+    """逐块计算每帧的能量（dB）与过零率，块大小固定，不为整段音频生成 float32。"""
+    frame = int(_VAD_FRAME_SECONDS * sr)
+    n_frames = len(audio) // frame
+    energy_db = np.empty(n_frames, dtype=np.float32)
+    zcr = np.empty(n_frames, dtype=np.float32)
+    block_frames = max(1, (60 * sr) // frame)
+    for first in range(0, n_frames, block_frames):
+        count = min(block_frames, n_frames - first)
+        frames = audio.window(first * frame, (first + count) * frame).reshape(count, frame)
+        energy_db[first : first + count] = 10 * np.log10(
+            np.mean(np.square(frames), axis=1) + 1e-10
+        )
+        signs = np.signbit(frames)
+        zcr[first : first + count] = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return energy_db, zcr
+
+
+def _detect_speech_spans(
+    audio: _PcmAudio, sr: int = _WHISPER_SAMPLE_RATE
+) -> list[tuple[int, int]]:
+    """能量 + 过零率的语音活动检测，返回语音所在的 [start, end) 样本区间（已合并、加余量）。
+
+    阈值相对底噪自适应：能量高于第 10 百分位 VAD_THRESHOLD_DB 且过零率不像宽带噪声的帧为语音；
+    能量起伏不足 VAD_THRESHOLD_DB 时退化为只剔除绝对静音。
+    间隔短于 VAD_MIN_SILENCE_MS 的语音段合并，短于 0.25 秒的孤立段丢弃。
+    """
+    energy_db, zcr = _vad_frame_features(audio, sr)
+    if len(energy_db) == 0:
+        return []
+    floor_db, loud_db = np.percentile(energy_db, [10, 90])
+    if loud_db - floor_db < VAD_THRESHOLD_DB:
+        # 整段能量几乎没有起伏（持续说话/背景音不断），无法区分语音与底噪，
+        # 保守起见只去掉绝对静音
+        threshold = _VAD_FLOOR_DB
+    else:
+        threshold = max(float(floor_db) + VAD_THRESHOLD_DB, _VAD_FLOOR_DB)
+    is_speech = (energy_db > threshold) & (zcr < _VAD_MAX_ZCR)
+
+    # 语音帧的连续区间：边沿位置成对出现
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], is_speech.astype(np.int8), [0]))))
+    runs = edges.reshape(-1, 2)
+
+    frame = int(_VAD_FRAME_SECONDS * sr)
+    min_gap = VAD_MIN_SILENCE_MS / 1000 / _VAD_FRAME_SECONDS
+    merged: list[list[int]] = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    padding = int(VAD_PADDING_MS / 1000 * sr)
+    min_speech = _VAD_MIN_SPEECH_SECONDS / _VAD_FRAME_SECONDS
+    spans: list[tuple[int, int]] = []
+    for start, end in merged:
+        if end - start < min_speech:
+            continue
+        s = max(0, int(start) * frame - padding)
+        e = min(len(audio), int(end) * frame + padding)
+        if spans and s <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], e)
+        else:
+            spans.append((s, e))
+    return spans
+
+
+class _SpeechTimeline:
+    """VAD 裁剪后时间轴到原始时间轴的映射（分段线性，按秒）。"""
+
+    def __init__(self, spans: list[tuple[int, int]], sr: int = _WHISPER_SAMPLE_RATE):
+        self.spans = spans
+        self._original_starts = [start / sr for start, _ in spans]
+        self._compact_starts = []
+        offset = 0.0
+        for start, end in spans:
+            self._compact_starts.append(offset)
+            offset += (end - start) / sr
+
+    def to_original(self, t: float, is_end: bool = False) -> float:
+        if not self.spans:
+            return t
+        idx = max(0, bisect.bisect_right(self._compact_starts, t) - 1)
+        # 恰好落在两个区间交界处的结束时间归前一个区间，避免跨过被裁掉的静音
+        if is_end and idx > 0 and t <= self._compact_starts[idx]:
+            idx -= 1
+        return self._original_starts[idx] + (t - self._compact_starts[idx])
+
+    def remap_segment(self, seg: dict) -> dict:
+        seg["start"] = self.to_original(seg["start"])
+        seg["end"] = self.to_original(seg["end"], is_end=True)
+        return seg
+
+
+def _apply_vad(
+    audio: _PcmAudio, sr: int = _WHISPER_SAMPLE_RATE
+) -> tuple[_PcmAudio, "_SpeechTimeline | None"]:
+    """按 VAD 结果把语音区间拼接成新的 PCM 临时文件。
+
+    返回 (送入模型的音频, 时间轴映射)；映射为 None 表示未裁剪（语音占比过高），
+    映射的 spans 为空表示整段没有语音。发生裁剪时原 audio 会被关闭。
+    """
+    spans = _detect_speech_spans(audio, sr)
+    speech_samples = sum(end - start for start, end in spans)
+    if spans and speech_samples > len(audio) * (1 - _VAD_MIN_SAVING):
+        return audio, None
+    metrics.VAD_SKIPPED_SECONDS.inc((len(audio) - speech_samples) / sr)
+    if not spans:
+        return audio, _SpeechTimeline([], sr)
+
+    fd, pcm_path = tempfile.mkstemp(suffix=".pcm")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            block = 60 * sr
+            for start, end in spans:
+                for pos in range(start, end, block):
+                    out.write(np.asarray(audio._pcm[pos : min(end, pos + block)]).tobytes())
+        compact = _PcmAudio(pcm_path, sr)
+    except BaseException:
+        os.unlink(pcm_path)
+        raise
+    audio.close()
+    return compact, _SpeechTimeline(spans, sr)
+
+
+def _transcribe_on_worker(
+    model_name: str,
+    audio: _PcmAudio,
+    start: int,
+    end: int,
+    transcribe_kwargs: dict,
+    cancel_token: CancelToken | None = None,
+    sort_key: float | None = None,
+    started: list | None = None,
+    segment_callback=None,
+):
+    """占用一个 worker 槽位，用该槽位的模型副本转录 [start, end) 区间。
+
+    float32 窗口在拿到槽位后才转换，排队中的分段不占用内存。
+    started: 可选，拿到槽位时把当前 perf_counter 追加进去（统计不含排队等待的推理耗时）。
+    segment_callback: 可选，见 _engine_transcribe（分段时间相对该区间）。
+    """
+    with _request_scope(cancel_token, sort_key), _inference_worker() as slot:
+        if started is not None:
+            started.append(time.perf_counter())
+        model = _load_model_cached(model_name, slot)
+        window = audio.window(start, end)
+        try:
+            return _engine_transcribe(
+                model_name, model, window, transcribe_kwargs, segment_callback
+            )
+        finally:
+            del window
+
+
+def _merge_chunk_results(
+    results: list[dict], offsets: list[float], forced_language: str | None
+) -> dict:
+    """把各分段的转录结果按全局偏移拼接成与 model.transcribe 相同结构的结果。"""
+    segments = []
+    texts = []
+    for result, offset in zip(results, offsets):
+        # 保持 whisper 原样拼接（英文段自带前导空格，中文段不加空格）
+        texts.append(result.get("text", ""))
+        for seg in result.get("segments", []):
+            seg = dict(seg)
+            seg["id"] = len(segments)
+            seg["start"] = seg["start"] + offset
+            seg["end"] = seg["end"] + offset
+            segments.append(seg)
+
+    language = forced_language
+    if not language:
+        # 各段独立检测语言，取出现次数最多的作为整体语言
+        detected = [r.get("language") for r in results if r.get("language")]
+        language = Counter(detected).most_common(1)[0][0] if detected else None
+
+    return {
+        "text": "".join(texts),
+        "segments": segments,
+        "language": language,
+    }
+
+
+def _emit_segments(segments: list[dict], offset: float, segment_callback):
+    """按全局时间轴把分段逐条交给回调（start/end 为秒，text 已去首尾空白）。"""
+    for seg in segments:
+        segment_callback(
+            {
+                "start": seg["start"] + offset,
+                "end": seg["end"] + offset,
+                "text": seg["text"].strip(),
+            }
+        )
+
+
+def _offset_callback(segment_callback, offset: float):
+    """把引擎产出的分段（时间相对所转录的音频）平移到全局时间轴后交给 segment_callback；
+    segment_callback 为 None 时返回 None。"""
+    if segment_callback is None:
+        return None
+    return lambda seg: _emit_segments([seg], offset, segment_callback)
+
+
+class _OrderedSegmentRelay:
+    """并行转录的各段按时间顺序推送分段：最早的未完成段边解码边推送，后面的段先缓存，
+    等前面的段全部完成后再补发。回调在持锁时调用，同一时刻只有一个线程推送。"""
+
+    def __init__(self, segment_callback, offsets: list[float]):
+        self._segment_callback = segment_callback
+        self._offsets = offsets
+        self._pending = [[] for _ in offsets]
+        self._current = 0
+        self._lock = threading.Lock()
+
+    def callback_for(self, index: int):
+        def _on_segment(seg: dict):
+            with self._lock:
+                if index == self._current:
+                    _emit_segments([seg], self._offsets[index], self._segment_callback)
+                else:
+                    self._pending[index].append(seg)
+
+        return _on_segment
+
+    def advance(self):
+        """当前段已完成：补发下一段已缓存的分段，此后它的分段直接推送。"""
+        with self._lock:
+            self._current += 1
+            if self._current < len(self._pending):
+                pending, self._pending[self._current] = self._pending[self._current], []
+                _emit_segments(pending, self._offsets[self._current], self._segment_callback)
+
+
+def _transcribe_long_audio(
+    audio: _PcmAudio,
+    chunks: list[tuple[int, int]],
+    model_name: str,
+    transcribe_kwargs: dict,
+    sr: int = _WHISPER_SAMPLE_RATE,
+    segment_callback=None,
+    progress_callback=None,
+    started: list | None = None,
+) -> dict:
+    """把各分段并发分发到 worker 池转录，再拼接为一个整体结果。
+
+    调用方不能持有 worker 槽位，否则 INFERENCE_WORKERS=1 时会等待自身而死锁。
+    分段按时间顺序逐窗口通过 segment_callback 推送（见 _OrderedSegmentRelay）；按时间顺序等待各段，
+    每段完成后以其结束样本位置调用 progress_callback（可作为断点续转的检查点，
+    此时该段及之前的分段已全部推送，之后的尚未推送）。
+    started 见 _transcribe_on_worker：每个分段拿到槽位的时刻。
+    """
+    cancel_token = _current_cancel_token()
+    sort_key = _current_sort_key()
+    offsets = [start / sr for start, _ in chunks]
+    relay = (
+        _OrderedSegmentRelay(segment_callback, offsets) if segment_callback is not None else None
+    )
+    max_workers = min(INFERENCE_WORKERS, len(chunks))
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="whisper-chunk"
+    ) as executor:
+        futures = [
+            executor.submit(
+                _transcribe_on_worker,
+                model_name,
+                audio,
+                start,
+                end,
+                transcribe_kwargs,
+                cancel_token,
+                sort_key,
+                started,
+                relay.callback_for(i) if relay is not None else None,
+            )
+            for i, (start, end) in enumerate(chunks)
+        ]
+        results = []
+        try:
+            for (start, end), future in zip(chunks, futures):
+                result = future.result()
+                results.append(result)
+                # 先写检查点再放行下一段的分段，检查点记录的分段数恰好到本段末尾
+                if progress_callback is not None:
+                    progress_callback(end)
+                if relay is not None:
+                    relay.advance()
+        except BaseException:
+            # 任一段失败（或被取消）即放弃尚未开始的分段，不再继续占用 worker；
+            # 已在转录的分段会在下一个解码窗口前检查到取消令牌而退出
+            for future in futures:
+                future.cancel()
+            raise
+    return _merge_chunk_results(
+        results, offsets, transcribe_kwargs.get("language")
+    )
+
+
+def _remapping_callback(segment_callback, timeline: _SpeechTimeline):
+    """把 VAD 裁剪后时间轴上的分段映射回原始时间轴再推送。"""
+
+    def _callback(seg: dict):
+        segment_callback(timeline.remap_segment(seg))
+
+    return _callback
+
+
 def _patch_whisper_load_audio():
     """防止库内部或其它代码路径仍调用默认的 pipe 版 load_audio。"""
     try:
@@ -310,30 +1699,26 @@ def _patch_whisper_load_audio():
 _patch_whisper_load_audio()
 
 
-def process_audio(
-    audio_path,
-    model_name="base",
-    language_choice="自动检测",
-    verbose=True,
-    initial_prompt: str | None = None,
-):
-    """处理音频文件的核心函数"""
-    if audio_path is None:
-        return "请上传音频文件", "", None
-
-    model = _load_model_cached(model_name)
+_LANGUAGE_CHOICE_MAP = {
+    "自动检测": None,
+    "英语": "en",
+    "西班牙语": "es",
+}
 
-    device = _get_device()
 
-    language_map = {
-        "自动检测": None,
-        "英语": "en",
-        "西班牙语": "es",
-    }
-    selected_language = language_map.get(language_choice)
+def build_transcribe_options(
+    language_choice: str = "自动检测",
+    initial_prompt: str | None = None,
+    model_name: str | None = None,
+) -> tuple[str | None, dict]:
+    """根据界面语言选项与提示词生成 (语言代码, model.transcribe 参数)。
 
+    返回的参数只包含影响转录结果的选项，也用于构造结果缓存的键。
+    model_name 决定运行设备（量化变体固定在 CPU，不能开 fp16）。
+    """
+    selected_language = _LANGUAGE_CHOICE_MAP.get(language_choice)
+    device = _model_device(model_name) if model_name else _get_device()
     transcribe_kwargs = {
-        "verbose": verbose,
         "fp16": device == "cuda",
         "initial_prompt": resolve_transcribe_initial_prompt(
             selected_language, initial_prompt
@@ -341,28 +1726,183 @@ def process_audio(
     }
     if selected_language:
         transcribe_kwargs["language"] = selected_language
+    return selected_language, transcribe_kwargs
 
-    # 解码与推理一起串行化：保证同进程同一时刻只有一段音频驻留内存，
-    # 避免并发任务同时解码大音频导致内存峰值叠加 -> MemoryError。
-    with _inference_lock:
-        audio = _load_audio_with_timeout(audio_path)
-        try:
-            result = model.transcribe(
-                audio,
-                **transcribe_kwargs,
+
+@contextmanager
+def _decoded_audio(audio_path, pcm_path: str | None = None):
+    """解码阶段：在 DECODE_WORKERS 限流下解码（及 VAD 裁剪），产出 (PCM, 原始时长, 时间轴映射)。
+
+    解码完成后占用预取预算直到推理阶段用完，退出时归还预算并关闭 PCM。
+    PCM 以 memmap 留在临时文件中，推理阶段才按需转换为 float32。
+    """
+    pcm = None
+    reserved = 0
+    try:
+        with _decode_slot():
+            if pcm_path is not None and os.path.exists(pcm_path):
+                pcm = _PcmAudio(pcm_path, delete=False)
+            else:
+                pcm = _decode_audio_to_pcm(audio_path)
+            audio_duration = pcm.duration
+            timeline = None
+            if VAD_ENABLED:
+                pcm, timeline = _apply_vad(pcm)
+        _check_cancelled()
+        reserved = len(pcm) * 2
+        _prefetch_budget.acquire(reserved)
+        yield pcm, audio_duration, timeline
+    finally:
+        if reserved:
+            _prefetch_budget.release(reserved)
+        if pcm is not None:
+            pcm.close()
+
+
+def process_audio(
+    audio_path,
+    model_name="base",
+    language_choice="自动检测",
+    verbose=True,
+    initial_prompt: str | None = None,
+    segment_callback=None,
+    pcm_path: str | None = None,
+    start_sample: int = 0,
+    progress_callback=None,
+    cancel_token: CancelToken | None = None,
+    sort_key: float | None = None,
+    timing_callback=None,
+):
+    """处理音频文件的核心函数
+
+    segment_callback: 可选，每产出一个分段就以 {"start", "end", "text"} 调用一次
+    （在推理线程中调用，按时间顺序；每解码完一个 30 秒窗口即推送其分段，长音频并行转录时
+    后面的段先缓存，前面的段完成后补发）。
+    pcm_path: 可选，已解码好的 16kHz s16le PCM（如上传时由 StreamingDecoder 边收边解码），
+    提供时跳过 ffmpeg；该文件由调用方负责删除。
+    start_sample / progress_callback: 断点续转。长音频每完成一段就以"此前音频已全部转录"的
+    样本位置调用 progress_callback；之后以该值作为 start_sample 重新调用即跳过已完成的部分
+    （只转录并返回剩余部分）。位置属于内部时间轴（开启 VAD 时为裁剪后的），调用方只需原样保存。
+    cancel_token: 可选，取消后在数秒内抛出 TranscriptionCancelled，并已归还槽位、关闭 PCM、
+    释放 float32 缓冲。
+    sort_key: 可选，等待推理槽位时的排队顺序（小的先得到槽位，单位同 Unix 时间戳，
+    可理解为"等效到达时刻"）；缺省按实际到达时刻排队。
+    timing_callback: 可选，完整转录结束后以 (推理耗时秒数, 音频时长秒数) 调用一次。耗时从拿到
+    第一个推理槽位开始计，不含解码、上传与排队等待；续转或整段无语音（未调用模型）时不调用。
+    """
+    if audio_path is None:
+        return "请上传音频文件", "", None
+    with _request_scope(cancel_token, sort_key):
+        return _process_audio(
+            audio_path,
+            model_name,
+            language_choice,
+            verbose,
+            initial_prompt,
+            segment_callback,
+            pcm_path,
+            start_sample,
+            progress_callback,
+            timing_callback,
+        )
+
+
+def _process_audio(
+    audio_path,
+    model_name,
+    language_choice,
+    verbose,
+    initial_prompt,
+    segment_callback,
+    pcm_path,
+    start_sample,
+    progress_callback,
+    timing_callback,
+):
+
+    device = _model_device(model_name)
+
+    selected_language, transcribe_kwargs = build_transcribe_options(
+        language_choice, initial_prompt, model_name
+    )
+    transcribe_kwargs["verbose"] = verbose
+
+    # 两级流水线：解码阶段（DECODE_WORKERS 个并发、预取总量受 PREFETCH_MAX_MB 限制）
+    # 与推理阶段（INFERENCE_WORKERS 个槽位）分开限流，当前任务推理时下一个任务已在解码。
+    # 整段 float32 只在拿到推理槽位后才生成，内存上限仍约为 INFERENCE_WORKERS 段音频
+    with _decoded_audio(audio_path, pcm_path) as (pcm, audio_duration, timeline):
+        if timeline is not None and segment_callback is not None:
+            segment_callback = _remapping_callback(segment_callback, timeline)
+        # 各次拿到推理槽位的时刻；为空表示没有调用模型
+        started = []
+        if timeline is not None and not timeline.spans:
+            # 整段没有语音：不调用模型，避免在静音/背景音上产生幻觉文本
+            chunks = []
+            result = {"text": "", "segments": [], "language": selected_language}
+        else:
+            chunks = _split_on_silence(pcm)
+            if start_sample:
+                # 续转：丢掉检查点之前已完成的分段
+                chunks = [
+                    (max(start, start_sample), end) for start, end in chunks if end > start_sample
+                ]
+
+        if len(chunks) == 1 and chunks[0][0] == 0:
+            with _inference_worker() as slot:
+                started.append(time.perf_counter())
+                audio = pcm.to_float32()
+                try:
+                    model = _load_model_cached(model_name, slot)
+                    # 分段由引擎边解码边推送
+                    result = _engine_transcribe(
+                        model_name,
+                        model,
+                        audio,
+                        transcribe_kwargs,
+                        _offset_callback(segment_callback, 0.0),
+                    )
+                finally:
+                    # 尽快释放解码后的大数组
+                    del audio
+        elif chunks:
+            # 长音频（或续转的剩余部分）：各分段在 worker 池中并行转录后按全局偏移拼接，
+            # 每段只在被转录时才转换为 float32
+            result = _transcribe_long_audio(
+                pcm,
+                chunks,
+                model_name,
+                transcribe_kwargs,
+                segment_callback=segment_callback,
+                progress_callback=progress_callback,
+                started=started,
             )
-        finally:
-            # 尽快释放解码后的大数组
-            del audio
+        elif start_sample:
+            # 检查点之后已没有剩余音频
+            result = {"text": "", "segments": [], "language": selected_language}
+
+    # 实时率 = 推理耗时 / 音频时长（从拿到第一个推理槽位算起，不含解码与排队），按模型统计；
+    # 续转只覆盖部分音频，不计入
+    if audio_duration > 0 and not start_sample:
+        if started:
+            inference_seconds = time.perf_counter() - min(started)
+            metrics.REALTIME_FACTOR.observe(
+                inference_seconds / audio_duration, model=model_name
+            )
+            if timing_callback is not None:
+                timing_callback(inference_seconds, audio_duration)
+        metrics.AUDIO_SECONDS.inc(audio_duration, model=model_name)
+
+    if timeline is not None:
+        for seg in result.get("segments", []):
+            timeline.remap_segment(seg)
 
     plain_text = result["text"].strip()
 
-    timestamped_text = ""
-    if "segments" in result:
-        for seg in result["segments"]:
-            start = format_timestamp(seg["start"])
-            end = format_timestamp(seg["end"])
-            timestamped_text += f"[{start} --> {end}] {seg['text'].strip()}\n"
+    timestamped_text = "\n".join(
+        f"[{format_timestamp(seg['start'])} --> {format_timestamp(seg['end'])}] "
+        f"{seg['text'].strip()}"
+        for seg in result.get("segments", [])
+    )
 
     detected_language = selected_language or result.get("language")
 
@@ -371,3 +1911,204 @@ def process_audio(
 
     return plain_text, timestamped_text.strip(), detected_language
 
+
+
+def _decode_clip(audio_path):
+    """批量转录用：解码为 PCM 后按长度分流。不超过 30 秒的返回 float32 数组；更长的返回 _PcmAudio，
+    交给 process_audio 复用（不重复解码，也不整段转成 float32 留在内存里）。
+    解码失败时返回异常对象而不是抛出，避免一个坏文件拖垮整批。
+    """
+    try:
+        with _decode_slot():
+            pcm = _decode_audio_to_pcm(audio_path)
+    except Exception as e:
+        return e
+    if len(pcm) > whisper.audio.N_SAMPLES:
+        return pcm
+    with pcm:
+        try:
+            return pcm.to_float32()
+        except Exception as e:
+            return e
+
+
+def _segments_from_tokens(tokenizer, tokens, duration: float) -> list[dict]:
+    """把带时间戳的解码结果切成分段（与 model.transcribe 相同：相邻的时间戳 token 之间为一段），
+    结尾缺少时间戳的文本以片段时长收尾，分段终点不超过片段时长。"""
+    timestamp_begin = tokenizer.timestamp_begin
+    segments = []
+    start = None
+    text_tokens = []
+
+    def _emit(end):
+        text = tokenizer.decode(text_tokens).strip()
+        if text:
+            begin = min(start or 0.0, duration)
+            segments.append({"start": begin, "end": max(begin, min(end, duration)), "text": text})
+
+    for token in tokens:
+        if token < timestamp_begin:
+            text_tokens.append(token)
+            continue
+        t = (token - timestamp_begin) * _TIMESTAMP_PRECISION
+        if start is None:
+            start = t
+        else:
+            _emit(t)
+            start = None
+            text_tokens = []
+    if text_tokens:
+        _emit(duration)
+    return segments
+
+
+def process_audio_batch(
+    audio_paths: list,
+    model_name="base",
+    language_choice="自动检测",
+    initial_prompt: str | None = None,
+) -> list:
+    """批量转录多个短音频，返回与 audio_paths 一一对应的结果列表。
+
+    每项为 (plain_text, timestamped_text, detected_language)，格式与 process_audio 相同，失败的文件为异常对象。
+    - 各文件并发解码；
+    - 不超过 30 秒的片段补齐为一个窗口，按 BATCH_SIZE 堆叠成 (N, n_mels, 3000)，
+      一次编码器前向 + 一次批量解码（温度 0、带时间戳，语言按条目各自检测），按时间戳 token 切分段；
+    - 温度 0 的结果触发 model.transcribe 的升温条件（压缩比过高或平均 logprob 过低，且不是静音）的片段，
+      改由 process_audio 单独转录，走完整的温度回退，输出与逐个提交一致；
+    - 超过 30 秒的文件（引擎不支持批量解码时为全部文件）退回 process_audio 单独处理，
+      复用已解码的 PCM（不支持批量解码时不预先解码，由 process_audio 自己解码）。
+    """
+    selected_language, transcribe_kwargs = build_transcribe_options(
+        language_choice, initial_prompt, model_name
+    )
+    results: list = [None] * len(audio_paths)
+
+    engine, _ = engines.split_model_name(model_name)
+    if engine.supports_batch_decode:
+        with ThreadPoolExecutor(
+            max_workers=min(BATCH_DECODE_WORKERS, max(1, len(audio_paths))),
+            thread_name_prefix="whisper-batch-decode",
+        ) as executor:
+            decoded = list(executor.map(_decode_clip, audio_paths))
+    else:
+        decoded = [None] * len(audio_paths)
+    short_indices = []
+    long_indices = []
+    for i, audio in enumerate(decoded):
+        if isinstance(audio, Exception):
+            results[i] = audio
+        elif isinstance(audio, np.ndarray):
+            short_indices.append(i)
+        else:
+            long_indices.append(i)
+
+    # 长文件（及不支持批量解码的引擎）逐个走常规流程（各自占用 worker 槽位，支持分段并行）；
+    # 它们的 PCM 只在磁盘上，process_audio 使用时才计入预取预算
+    try:
+        for i in long_indices:
+            pcm = decoded[i]
+            try:
+                results[i] = process_audio(
+                    audio_paths[i],
+                    model_name=model_name,
+                    language_choice=language_choice,
+                    verbose=None,
+                    initial_prompt=initial_prompt,
+                    pcm_path=pcm.path if pcm is not None else None,
+                )
+            except Exception as e:
+                results[i] = e
+            finally:
+                if pcm is not None:
+                    pcm.close()
+                decoded[i] = None
+    finally:
+        for i in long_indices:
+            if decoded[i] is not None:
+                decoded[i].close()
+
+    if not short_indices:
+        return results
+
+    options = whisper.DecodingOptions(
+        task="transcribe",
+        language=selected_language,
+        prompt=transcribe_kwargs["initial_prompt"],
+        fp16=transcribe_kwargs["fp16"],
+    )
+    # 需要升温重解码的片段，释放推理槽位后逐个交给 process_audio
+    fallback_indices = []
+    with _inference_worker() as slot:
+        model = _load_model_cached(model_name, slot)
+        tokenizer = whisper.tokenizer.get_tokenizer(
+            model.is_multilingual, num_languages=model.num_languages, task="transcribe"
+        )
+        transcribe_started = time.perf_counter()
+        for start in range(0, len(short_indices), BATCH_SIZE):
+            batch = short_indices[start : start + BATCH_SIZE]
+            mel = torch.stack(
+                [
+                    whisper.log_mel_spectrogram(
+                        whisper.pad_or_trim(decoded[i]), model.dims.n_mels
+                    )
+                    for i in batch
+                ]
+            ).to(model.device)
+            try:
+                decode_results = model.decode(mel, options)
+            except Exception as e:
+                for i in batch:
+                    results[i] = e
+                continue
+            finally:
+                del mel
+            for i, r in zip(batch, decode_results):
+                detected_language = selected_language or r.language
+                if (
+                    r.no_speech_prob > _NO_SPEECH_THRESHOLD
+                    and r.avg_logprob < _LOGPROB_THRESHOLD
+                ):
+                    results[i] = ("", "", detected_language)
+                    continue
+                if (
+                    r.compression_ratio > _COMPRESSION_RATIO_THRESHOLD
+                    or r.avg_logprob < _LOGPROB_THRESHOLD
+                ):
+                    fallback_indices.append(i)
+                    continue
+                segments = _segments_from_tokens(
+                    tokenizer, r.tokens, len(decoded[i]) / _WHISPER_SAMPLE_RATE
+                )
+                timestamped_text = "\n".join(
+                    f"[{format_timestamp(seg['start'])} --> {format_timestamp(seg['end'])}] "
+                    f"{seg['text']}"
+                    for seg in segments
+                )
+                results[i] = (r.text.strip(), timestamped_text, detected_language)
+
+    batch_indices = [i for i in short_indices if i not in fallback_indices]
+    batch_audio_seconds = sum(len(decoded[i]) for i in batch_indices) / _WHISPER_SAMPLE_RATE
+    if batch_audio_seconds > 0:
+        metrics.REALTIME_FACTOR.observe(
+            (time.perf_counter() - transcribe_started) / batch_audio_seconds,
+            model=model_name,
+        )
+        metrics.AUDIO_SECONDS.inc(batch_audio_seconds, model=model_name)
+
+    for i in fallback_indices:
+        decoded[i] = None
+        try:
+            results[i] = process_audio(
+                audio_paths[i],
+                model_name=model_name,
+                language_choice=language_choice,
+                verbose=None,
+                initial_prompt=initial_prompt,
+            )
+        except Exception as e:
+            results[i] = e
+
+    if _model_device(model_name) == "cuda":
+        _cleanup_cuda()
+    return results
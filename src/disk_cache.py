@@ -0,0 +1,114 @@
+"""
+磁盘 LRU 缓存模块
+按键寻址的文件缓存：每个条目一个文件（按键的前两位分目录），总大小超过上限时淘汰最久未使用的条目。
+转录结果缓存与编码器特征缓存共用，各自只负责键的生成与条目的序列化格式。
+"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class DiskLRU:
+    """磁盘 LRU 缓存；max_bytes 为 0 时关闭（读取总是未命中，写入直接忽略）。
+
+    索引在首次使用时从磁盘按 mtime 重建，命中时刷新文件 mtime，进程重启后仍保持大致的 LRU 顺序。
+    """
+
+    def __init__(self, directory, max_bytes: int, suffix: str):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        # key -> 文件大小，按最近使用排序
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._index_loaded = False
+        self._index_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{self.suffix}"
+
+    def _load_index(self):
+        """在持有 _lock 的前提下调用：扫描一次缓存目录，按 mtime 重建 LRU 索引。"""
+        if self._index_loaded:
+            return
+        self._index_loaded = True
+        if not self.directory.exists():
+            return
+        entries = []
+        for path in self.directory.glob(f"*/*{self.suffix}"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path.name.removesuffix(self.suffix), st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._index_bytes += size
+
+    def _evict_until_within_limit(self):
+        """在持有 _lock 的前提下调用：淘汰最久未使用的条目直到不超过上限。"""
+        while self._index and self._index_bytes > self.max_bytes:
+            key, size = self._index.popitem(last=False)
+            self._index_bytes -= size
+            try:
+                self._entry_path(key).unlink()
+            except OSError:
+                pass
+
+    def _discard(self, key: str):
+        """移出索引、扣除大小并删除文件（损坏或不可读的条目）。"""
+        with self._lock:
+            self._index_bytes -= self._index.pop(key, 0)
+        try:
+            self._entry_path(key).unlink()
+        except OSError:
+            pass
+
+    def read(self, key: str, load):
+        """命中时返回 load(path) 的结果，否则返回 None；load 抛出 OSError/ValueError 视为条目损坏。"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        path = self._entry_path(key)
+        try:
+            value = load(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._discard(key)
+            return None
+        return value
+
+    def write(self, key: str, dump):
+        """dump(f) 把条目写入二进制文件对象 f；先写临时文件再原子替换，避免并发读到半截内容。"""
+        if not self.enabled:
+            return
+        path = self._entry_path(key)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                dump(f)
+            size = tmp_path.stat().st_size
+            os.replace(tmp_path, path)
+        except OSError:
+            # 缓存是尽力而为，写失败不影响主流程
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._load_index()
+            self._index_bytes -= self._index.pop(key, 0)
+            self._index[key] = size
+            self._index_bytes += size
+            self._evict_until_within_limit()
@@ -0,0 +1,163 @@
+"""
+推理引擎模块
+转录后端的统一接口：模型名可以带引擎前缀（如 faster-whisper:small），不带前缀时使用
+WHISPER_ENGINE 指定的默认引擎。模型缓存、worker 槽位、长音频分段、结果缓存与 API 都只面向
+这里的接口，换引擎不改变接口契约。
+- whisper: openai-whisper（在 core 中注册，支持 mmap 权重、int8 动态量化与批量解码）；
+- faster-whisper: CTranslate2 后端，CPU 上 int8 内核更快、内存更小（需要安装 faster-whisper 包）。
+"""
+import os
+
+# 已注册的引擎：引擎名 -> 引擎实例
+ENGINES: dict = {}
+DEFAULT_ENGINE = os.environ.get("WHISPER_ENGINE", "whisper")
+# 模型名中引擎前缀的分隔符
+ENGINE_SEPARATOR = ":"
+# 量化变体的名称后缀，与 core.QUANTIZED_SUFFIX 一致
+_INT8_SUFFIX = "-int8"
+
+
+def register_engine(cls):
+    """注册一个推理引擎（类装饰器）。"""
+    ENGINES[cls.name] = cls()
+    return cls
+
+
+def split_model_name(model_name: str) -> tuple["InferenceEngine", str]:
+    """把 "引擎:模型" 拆成 (引擎实例, 模型名)；不带前缀时使用默认引擎。"""
+    engine_name, sep, base_name = model_name.partition(ENGINE_SEPARATOR)
+    if not sep:
+        engine_name, base_name = DEFAULT_ENGINE, model_name
+    engine = ENGINES.get(engine_name)
+    if engine is None:
+        raise ValueError(f"未知的推理引擎: {engine_name}，可选: {', '.join(ENGINES)}")
+    return engine, base_name
+
+
+class InferenceEngine:
+    """推理引擎接口。模型对象只在持有 worker 槽位的线程里使用，同一时刻只有一个线程调用。
+
+    transcribe 返回与 openai-whisper 的 model.transcribe 相同结构的字典：
+    {"text", "segments": [{"start", "end", "text", ...}], "language"}，时间相对传入的音频。
+    """
+
+    name = ""
+    # 是否支持 core.process_audio_batch 的堆叠批量解码；不支持时短片段逐个转录
+    supports_batch_decode = False
+
+    def device(self, model_name: str) -> str:
+        raise NotImplementedError
+
+    def load(self, model_name: str, cpu_threads: int):
+        """加载模型；cpu_threads 为每个 worker 槽位的 CPU 线程预算。"""
+        raise NotImplementedError
+
+    def transcribe(
+        self, model, audio, transcribe_kwargs: dict, check_cancelled, segment_callback=None
+    ) -> dict:
+        """转录一段 16kHz float32 音频；check_cancelled 在引擎的检查点调用，取消时抛出异常。
+
+        segment_callback 可选：引擎每解码出分段就立即以该分段（结构同返回值中的分段）调用，
+        按时间顺序、每段一次，供实时推送；返回值仍包含全部分段。
+        """
+        raise NotImplementedError
+
+    def model_nbytes(self, model) -> int:
+        """模型常驻内存的估计字节数，用于模型缓存预算；未知时返回 0。"""
+        return 0
+
+
+@register_engine
+class FasterWhisperEngine(InferenceEngine):
+    """CTranslate2 后端。模型名与 API 接受的 openai-whisper 名称相同（tiny…large、turbo 及 .en 变体，
+    见 api.VALID_MODELS），-int8 后缀使用 int8 计算，否则由 CTranslate2 按设备选择默认精度。
+    首次加载时从 Hugging Face 下载转换好的模型。
+    """
+
+    name = "faster-whisper"
+    # transcribe 参数中 faster-whisper 也支持的选项（logprob_threshold 名称不同，单独映射）
+    _PASSTHROUGH = (
+        "language",
+        "initial_prompt",
+        "temperature",
+        "beam_size",
+        "best_of",
+        "patience",
+        "compression_ratio_threshold",
+        "no_speech_threshold",
+        "condition_on_previous_text",
+        "word_timestamps",
+    )
+
+    @staticmethod
+    def _import():
+        try:
+            import faster_whisper
+        except ImportError as e:
+            raise RuntimeError(
+                "faster-whisper 引擎需要安装 faster-whisper 包：pip install faster-whisper"
+            ) from e
+        return faster_whisper
+
+    def device(self, model_name: str) -> str:
+        try:
+            import ctranslate2
+
+            return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+        except ImportError:
+            return "cpu"
+
+    def load(self, model_name: str, cpu_threads: int):
+        faster_whisper = self._import()
+        quantized = model_name.endswith(_INT8_SUFFIX)
+        size = model_name.removesuffix(_INT8_SUFFIX)
+        model_path = faster_whisper.download_model(size)
+        model = faster_whisper.WhisperModel(
+            model_path,
+            device=self.device(model_name),
+            compute_type="int8" if quantized else "default",
+            cpu_threads=cpu_threads,
+            num_workers=1,
+        )
+        model._whisper_model_path = model_path
+        model._whisper_int8 = quantized
+        return model
+
+    def transcribe(
+        self, model, audio, transcribe_kwargs: dict, check_cancelled, segment_callback=None
+    ) -> dict:
+        kwargs = {k: v for k, v in transcribe_kwargs.items() if k in self._PASSTHROUGH}
+        if "logprob_threshold" in transcribe_kwargs:
+            kwargs["log_prob_threshold"] = transcribe_kwargs["logprob_threshold"]
+        check_cancelled()
+        # segments 是惰性生成器：每取下一段才解码对应的 30 秒窗口。每段产出后立即推送，
+        # 并在解码下一个窗口之前检查取消
+        segments_iter, info = model.transcribe(audio, **kwargs)
+        segments = []
+        for seg in segments_iter:
+            segment = {
+                "id": seg.id,
+                "start": seg.start,
+                "end": seg.end,
+                "text": seg.text,
+                "avg_logprob": seg.avg_logprob,
+                "no_speech_prob": seg.no_speech_prob,
+                "compression_ratio": seg.compression_ratio,
+            }
+            segments.append(segment)
+            if segment_callback is not None:
+                segment_callback(segment)
+            check_cancelled()
+        return {
+            "text": "".join(seg["text"] for seg in segments),
+            "segments": segments,
+            "language": info.language,
+        }
+
+    def model_nbytes(self, model) -> int:
+        """按磁盘上的权重文件估算（float16 存储；int8 计算时约减半）。"""
+        try:
+            nbytes = os.path.getsize(os.path.join(model._whisper_model_path, "model.bin"))
+        except (AttributeError, OSError):
+            return 0
+        return nbytes // 2 if model._whisper_int8 else nbytes
@@ -0,0 +1,38 @@
+"""
+编码器特征缓存模块
+把 Whisper 每个 30 秒窗口的编码器输出按 (模型, 窗口 log-mel 内容) 存到磁盘：同一段录音换 initial_prompt
+或强制语言重新转录时，窗口输入不变，直接取回编码器输出只跑解码器。超出上限后按 LRU 淘汰。
+
+键取自窗口 log-mel 本身而不是"音频哈希 + 偏移"：whisper 下一个窗口从哪里开始取决于上一窗口解码出的时间戳，
+换提示词后后续窗口可能错位，按内容寻址保证只有输入完全相同的窗口才会命中。
+"""
+import hashlib
+
+import numpy as np
+
+from src.disk_cache import DiskLRU
+
+# 缓存格式版本，存储格式变化时递增，使旧条目自然失效
+_CACHE_VERSION = 1
+
+
+class FeatureCache(DiskLRU):
+    """磁盘上的编码器特征缓存（每个窗口一个 .npy 文件）；max_bytes 为 0 时关闭。"""
+
+    def __init__(self, directory, max_bytes: int):
+        super().__init__(directory, max_bytes, ".npy")
+
+    @staticmethod
+    def make_key(model_id: str, mel: np.ndarray) -> str:
+        """由模型标识与窗口 log-mel 的内容（含 dtype 与形状）生成缓存键。"""
+        h = hashlib.sha256(
+            f"{_CACHE_VERSION}|{model_id}|{mel.dtype}|{mel.shape}|".encode("utf-8")
+        )
+        h.update(np.ascontiguousarray(mel).data)
+        return h.hexdigest()
+
+    def get(self, key: str) -> np.ndarray | None:
+        return self.read(key, lambda path: np.load(path, allow_pickle=False))
+
+    def put(self, key: str, features: np.ndarray):
+        self.write(key, lambda f: np.save(f, features, allow_pickle=False))
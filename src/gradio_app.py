@@ -31,7 +31,7 @@ def create_gradio_app():
         with gr.Row():
             audio_input = gr.Audio(label="上传音频文件", type="filepath")
             model_dropdown = gr.Dropdown(
-                choices=["tiny", "base", "small", "medium", "large"],
+                choices=["tiny", "base", "small", "medium", "large", "base-int8", "small-int8"],
                 value="base",
                 label="选择模型"
             )
@@ -0,0 +1,406 @@
+"""
+运行指标模块
+进程内的 Counter / Gauge / Histogram，按 Prometheus 文本格式输出，供 /metrics 抓取。
+多进程部署时各进程的快照（snapshot）可以合并输出：多个 HTTP worker 经 WHISPER_METRICS_DIR 下的
+每进程文件互相汇总，推理服务进程的指标由 API 通过 IPC 取回。
+"""
+import atexit
+import bisect
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_REGISTRY: list = []
+_lock = threading.Lock()
+
+# 多进程（如多个 Gunicorn worker）共享的快照目录；为空时只输出本进程的指标
+METRICS_DIR = os.environ.get("WHISPER_METRICS_DIR", "")
+# 每进程快照文件的刷新间隔（秒）；超过 3 个间隔未更新的文件视为进程已退出，
+# 其 Gauge 不再计入，计数与直方图保留（否则总数会倒退）
+METRICS_FLUSH_SECONDS = 5
+_process_file: Optional[str] = None
+
+# 耗时类直方图的默认分桶（秒），覆盖从毫秒级缓存命中到小时级长音频
+DURATION_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: tuple, labelvalues: tuple, extra: str = "") -> str:
+    pairs = [
+        f'{name}="{_escape_label_value(value)}"'
+        for name, value in zip(labelnames, labelvalues)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict = {}
+        with _lock:
+            _REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def _copy_values(self) -> dict:
+        """在持有 _lock 的前提下调用：当前取值的副本（可 JSON 序列化的值）。"""
+        return dict(self._values)
+
+    def _merge(self, values: dict, key: tuple, value):
+        """把另一进程同一标签组合的取值并入 values。"""
+        values[key] = values.get(key, 0) + value
+
+    def _render_samples(self, values: dict) -> list[str]:
+        raise NotImplementedError
+
+    def render(self, values: dict | None = None) -> str:
+        if values is None:
+            with _lock:
+                values = self._copy_values()
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._render_samples(values))
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self, values: dict) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """multiprocess_mode 决定多进程汇总方式："sum" 各进程相加（进程各自持有的量），
+    "max" 取最大值（各进程看到的是同一个共享的量，如共享队列长度）。"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        multiprocess_mode: str = "sum",
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.multiprocess_mode = multiprocess_mode
+
+    def _merge(self, values: dict, key: tuple, value):
+        if self.multiprocess_mode == "max" and key in values:
+            values[key] = max(values[key], value)
+        else:
+            super()._merge(values, key, value)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    _render_samples = Counter._render_samples
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DURATION_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各桶计数..., +Inf 计数], 总和
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _copy_values(self) -> dict:
+        return {key: [list(counts), total] for key, (counts, total) in self._values.items()}
+
+    def _merge(self, values: dict, key: tuple, value):
+        counts, total = value
+        state = values.get(key)
+        if state is None:
+            values[key] = [list(counts), total]
+        elif len(state[0]) == len(counts):
+            state[0] = [a + b for a, b in zip(state[0], counts)]
+            state[1] += total
+
+    def _render_samples(self, values: dict) -> list[str]:
+        lines = []
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def snapshot() -> dict:
+    """本进程所有指标的当前取值：{指标名: [[标签值列表, 取值], ...]}，可 JSON 序列化、可跨进程传输。"""
+    with _lock:
+        return {
+            m.name: [[list(key), value] for key, value in m._copy_values().items()]
+            for m in _REGISTRY
+        }
+
+
+def render(snapshots=()) -> str:
+    """按 Prometheus 文本格式输出所有已注册指标。
+
+    snapshots 为其它进程的 snapshot()，同名指标与本进程合并：计数与直方图相加，
+    Gauge 按其 multiprocess_mode 相加或取最大值。
+    """
+    with _lock:
+        metrics = list(_REGISTRY)
+        merged = {m.name: m._copy_values() for m in metrics}
+    for snap in snapshots:
+        for m in metrics:
+            for key, value in snap.get(m.name, ()):
+                m._merge(merged[m.name], tuple(key), value)
+    return "\n".join(m.render(merged[m.name]) for m in metrics) + "\n"
+
+
+def write_process_file():
+    """把本进程的快照写入 METRICS_DIR 下本进程的文件（先写临时文件再原子替换）。"""
+    if _process_file is None:
+        return
+    tmp_path = f"{_process_file}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot(), f)
+        os.replace(tmp_path, _process_file)
+    except OSError:
+        pass
+
+
+def _export_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        write_process_file()
+
+
+def start_file_export():
+    """设置了 WHISPER_METRICS_DIR 时，周期性地把本进程的快照写到该目录，供同组其它进程汇总。
+
+    文件名带随机后缀，worker 重启后 PID 被复用也不会覆盖已退出进程的计数；
+    目录应在服务启动前清空（计数随之归零，Prometheus 按计数器重置处理）。
+    """
+    global _process_file
+    if not METRICS_DIR or _process_file is not None:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    _process_file = os.path.join(METRICS_DIR, f"{os.getpid()}-{secrets.token_hex(4)}.json")
+    write_process_file()
+    atexit.register(write_process_file)
+    threading.Thread(target=_export_loop, name="metrics-export", daemon=True).start()
+
+
+def collect_process_files() -> list[dict]:
+    """读取同组其它进程写出的快照（不含本进程）。长时间未更新的文件来自已退出的进程，
+    只保留其计数与直方图。"""
+    if not METRICS_DIR:
+        return []
+    with _lock:
+        gauges = {m.name for m in _REGISTRY if isinstance(m, Gauge)}
+    stale_before = time.time() - 3 * METRICS_FLUSH_SECONDS
+    snapshots = []
+    try:
+        names = os.listdir(METRICS_DIR)
+    except OSError:
+        return []
+    for name in names:
+        path = os.path.join(METRICS_DIR, name)
+        if not name.endswith(".json") or path == _process_file:
+            continue
+        try:
+            stale = os.path.getmtime(path) < stale_before
+            with open(path, encoding="utf-8") as f:
+                snap = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if stale:
+            snap = {k: v for k, v in snap.items() if k not in gauges}
+        snapshots.append(snap)
+    return snapshots
+
+
+def current_rss_bytes() -> Optional[int]:
+    """当前进程常驻内存（字节），取不到时返回 None。"""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm", "rb") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class _PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = _PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            ctypes.windll.psapi.GetProcessMemoryInfo(
+                ctypes.windll.kernel32.GetCurrentProcess(),
+                ctypes.byref(counters),
+                counters.cb,
+            )
+            return int(counters.WorkingSetSize)
+    except Exception:
+        pass
+    return None
+
+
+# ---- 指标定义：集中在这里，便于对照看板与告警规则 ----
+
+UPLOAD_BYTES = Histogram(
+    "whisper_upload_bytes",
+    "Size of uploaded audio files in bytes.",
+    buckets=tuple(2**i * 1024 * 1024 for i in range(0, 11)),
+)
+UPLOAD_SECONDS = Histogram(
+    "whisper_upload_seconds",
+    "Time spent streaming an upload to disk.",
+)
+FFMPEG_SECONDS = Histogram(
+    "whisper_ffmpeg_seconds",
+    "Wall time of ffmpeg invocations.",
+)
+MODEL_LOAD_SECONDS = Histogram(
+    "whisper_model_load_seconds",
+    "Time spent loading a model on cache miss.",
+    ("model",),
+)
+MODEL_CACHE_REQUESTS = Counter(
+    "whisper_model_cache_requests_total",
+    "Model cache lookups by result (hit/miss).",
+    ("model", "result"),
+)
+MODEL_CACHE_BYTES = Gauge(
+    "whisper_model_cache_bytes",
+    "Parameter and buffer bytes of all cached model replicas.",
+)
+MODEL_CACHE_EVICTIONS = Counter(
+    "whisper_model_cache_evictions_total",
+    "Models evicted from the cache to stay within the memory budget.",
+    ("model",),
+)
+FEATURE_CACHE_REQUESTS = Counter(
+    "whisper_feature_cache_requests_total",
+    "Encoder feature lookups per 30s window by result (memory/disk/miss).",
+    ("result",),
+)
+PREFETCH_BYTES = Gauge(
+    "whisper_prefetch_bytes",
+    "Decoded PCM bytes waiting for or undergoing inference.",
+)
+INFERENCE_WAIT_SECONDS = Histogram(
+    "whisper_inference_wait_seconds",
+    "Time spent waiting for a free inference worker slot.",
+)
+REALTIME_FACTOR = Histogram(
+    "whisper_realtime_factor",
+    "Inference time (from the first acquired worker slot) divided by audio duration.",
+    ("model",),
+    buckets=(0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5),
+)
+AUDIO_SECONDS = Counter(
+    "whisper_audio_seconds_total",
+    "Total seconds of audio transcribed.",
+    ("model",),
+)
+VAD_SKIPPED_SECONDS = Counter(
+    "whisper_vad_skipped_seconds_total",
+    "Seconds of non-speech audio removed by the VAD pre-pass.",
+)
+TASKS_RUNNING = Gauge("whisper_tasks_running", "Async tasks currently executing.")
+# 共享队列：各实例看到的是同一个队列，多进程汇总时取最大值
+TASKS_QUEUED = Gauge(
+    "whisper_tasks_queued",
+    "Async tasks waiting in the job queue.",
+    multiprocess_mode="max",
+)
+TASKS_TOTAL = Counter(
+    "whisper_tasks_total",
+    "Async task admissions and outcomes.",
+    ("outcome",),
+)
+PROCESS_RSS_BYTES = Gauge(
+    "whisper_process_rss_bytes",
+    "Resident set size measured right after the last memory trim.",
+)
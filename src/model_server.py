@@ -0,0 +1,328 @@
+"""
+推理服务模块
+独立的模型进程通过 Unix socket（Windows 为命名管道）为多个 HTTP worker 提供转录，
+模型内存只占一份；未配置服务地址时在本进程内直接推理
+"""
+import itertools
+import os
+import secrets
+import sys
+import threading
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+
+from src import metrics
+from src.core import (
+    CancelToken,
+    TranscriptionCancelled,
+    _CANCEL_POLL_SECONDS,
+    _env_int,
+    release_model,
+)
+from src.result_cache import cached_process_audio, cached_process_audio_batch
+
+# 推理服务地址，多个用逗号分隔（客户端轮询分发）。留空表示在本进程内推理。
+# POSIX 上为 Unix socket 路径，如 /run/whisper/model.sock；
+# Windows 上为命名管道，如 \\.\pipe\whisper-model-server
+MODEL_SERVER_ADDRESSES = [
+    a.strip() for a in os.environ.get("WHISPER_MODEL_SERVER", "").split(",") if a.strip()
+]
+# 连接密钥（multiprocessing 的 HMAC 握手）。通道上传输的是 pickle，能连上就能在推理服务里执行任意代码，
+# 因此没有默认值：直接设置 WHISPER_MODEL_SERVER_AUTHKEY，或用 WHISPER_MODEL_SERVER_AUTHKEY_FILE
+# 指向只有服务用户可读的密钥文件（文件不存在时推理服务启动时生成随机密钥）。都未配置时服务拒绝启动
+_AUTHKEY_FILE = os.environ.get("WHISPER_MODEL_SERVER_AUTHKEY_FILE", "")
+# 推理服务空闲多少秒后卸载模型，与 API 进程内模式的 WHISPER_MODEL_IDLE_TIMEOUT 含义一致
+_IDLE_TIMEOUT = _env_int("WHISPER_MODEL_IDLE_TIMEOUT", 60, minimum=0)
+
+_next_address = itertools.count()
+
+
+def _authkey() -> bytes:
+    """当前的连接密钥。密钥文件每次连接时重新读取，推理服务重启换了密钥，客户端无需重启。"""
+    key = os.environ.get("WHISPER_MODEL_SERVER_AUTHKEY", "")
+    if not key and _AUTHKEY_FILE:
+        try:
+            key = Path(_AUTHKEY_FILE).read_text(encoding="utf-8").strip()
+        except OSError as e:
+            raise RuntimeError(f"无法读取推理服务密钥文件 {_AUTHKEY_FILE}: {e}") from e
+    if not key:
+        raise RuntimeError(
+            "未配置推理服务密钥：请设置 WHISPER_MODEL_SERVER_AUTHKEY 或 WHISPER_MODEL_SERVER_AUTHKEY_FILE"
+        )
+    return key.encode()
+
+
+def _ensure_authkey_file(path: str):
+    """密钥文件不存在时生成随机密钥，以 0600 权限写入（先写临时文件再原子替换）。"""
+    if os.path.exists(path):
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(secrets.token_hex(32))
+    os.replace(tmp_path, path)
+
+
+def _connection_family(address: str) -> str:
+    return "AF_PIPE" if address.startswith("\\\\.\\pipe\\") else "AF_UNIX"
+
+
+def is_remote() -> bool:
+    return bool(MODEL_SERVER_ADDRESSES)
+
+
+def _request(
+    request: dict,
+    segment_callback=None,
+    progress_callback=None,
+    cancel_token: CancelToken | None = None,
+    timing_callback=None,
+    address: str | None = None,
+):
+    """向推理服务发送一个请求，转交分段、进度与耗时回调，返回最终结果。
+
+    取消时直接断开连接，推理服务检测到断开后取消对应的转录。未指定 address 时轮询各服务。
+    """
+    if address is None:
+        address = MODEL_SERVER_ADDRESSES[next(_next_address) % len(MODEL_SERVER_ADDRESSES)]
+    authkey = _authkey()
+    try:
+        conn = Client(address, family=_connection_family(address), authkey=authkey)
+    except OSError as e:
+        raise RuntimeError(f"无法连接推理服务 {address}: {e}") from e
+    try:
+        conn.send(request)
+        while True:
+            if cancel_token is not None:
+                while not conn.poll(_CANCEL_POLL_SECONDS):
+                    cancel_token.raise_if_cancelled()
+            kind, payload = conn.recv()
+            if kind == "segment":
+                if segment_callback is not None:
+                    segment_callback(payload)
+            elif kind == "progress":
+                if progress_callback is not None:
+                    progress_callback(payload)
+            elif kind == "timing":
+                if timing_callback is not None:
+                    timing_callback(*payload)
+            elif kind == "result":
+                return payload
+            elif kind == "cancelled":
+                raise TranscriptionCancelled(payload)
+            else:
+                raise RuntimeError(payload)
+    except EOFError as e:
+        raise RuntimeError(f"推理服务 {address} 连接中断") from e
+    finally:
+        conn.close()
+
+
+def transcribe(
+    audio_digest: str,
+    audio_path: str,
+    segment_callback=None,
+    progress_callback=None,
+    cancel_token: CancelToken | None = None,
+    timing_callback=None,
+    **kwargs,
+):
+    """转录入口：配置了推理服务则走 IPC，否则在本进程内执行 cached_process_audio。
+
+    参数与返回值同 result_cache.cached_process_audio。
+    """
+    if not MODEL_SERVER_ADDRESSES:
+        return cached_process_audio(
+            audio_digest,
+            audio_path,
+            segment_callback=segment_callback,
+            progress_callback=progress_callback,
+            cancel_token=cancel_token,
+            timing_callback=timing_callback,
+            **kwargs,
+        )
+    if kwargs.get("pcm_path"):
+        kwargs["pcm_path"] = os.path.abspath(kwargs["pcm_path"])
+    return tuple(
+        _request(
+            {
+                "op": "transcribe",
+                "audio_digest": audio_digest,
+                # 服务进程与 API 进程共享文件系统，直接传绝对路径
+                "audio_path": os.path.abspath(audio_path),
+                "kwargs": kwargs,
+            },
+            segment_callback,
+            progress_callback,
+            cancel_token,
+            timing_callback,
+        )
+    )
+
+
+def transcribe_batch(audio_digests: list, audio_paths: list, **kwargs) -> list:
+    """批量转录入口，参数与返回值同 result_cache.cached_process_audio_batch。"""
+    if not MODEL_SERVER_ADDRESSES:
+        return cached_process_audio_batch(audio_digests, audio_paths, **kwargs)
+    return _request(
+        {
+            "op": "transcribe_batch",
+            "audio_digests": audio_digests,
+            "audio_paths": [os.path.abspath(p) for p in audio_paths],
+            "kwargs": kwargs,
+        }
+    )
+
+
+def metrics_snapshots() -> list:
+    """逐个取回各推理服务进程的指标快照（模型加载与缓存、推理排队、实时率、内存等只在推理服务里产生），
+    供 API 的 /metrics 合并输出；连不上的服务跳过。"""
+    snapshots = []
+    for address in MODEL_SERVER_ADDRESSES:
+        try:
+            snapshots.append(_request({"op": "metrics"}, address=address))
+        except RuntimeError:
+            continue
+    return snapshots
+
+
+class _IdleReleaser:
+    """推理服务内没有进行中的请求时，延迟卸载模型（防抖）。"""
+
+    def __init__(self, timeout: int):
+        self.timeout = timeout
+        self._active = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self._active += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def exit(self):
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                self._timer = threading.Timer(self.timeout, self._release)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _release(self):
+        with self._lock:
+            if self._active:
+                return
+            self._timer = None
+        release_model()
+
+
+def _watch_disconnect(conn, cancel_token: CancelToken, done: threading.Event):
+    """客户端在请求完成前断开（任务被取消、worker 退出）时取消对应的转录。"""
+    while not done.is_set():
+        try:
+            if conn.poll(_CANCEL_POLL_SECONDS):
+                # 客户端不会再发送数据，可读只可能是连接已关闭
+                conn.recv()
+        except (EOFError, OSError):
+            if not done.is_set():
+                cancel_token.cancel()
+            return
+
+
+def _handle_connection(conn, idle: _IdleReleaser):
+    send_lock = threading.Lock()
+    cancel_token = CancelToken()
+    done = threading.Event()
+
+    def _send(message):
+        with send_lock:
+            conn.send(message)
+
+    try:
+        request = conn.recv()
+    except (EOFError, OSError):
+        conn.close()
+        return
+    if request.get("op") == "metrics":
+        # 指标抓取不算推理请求，不重置空闲卸载的计时
+        try:
+            _send(("result", metrics.snapshot()))
+        except OSError:
+            pass
+        conn.close()
+        return
+
+    idle.enter()
+    try:
+        threading.Thread(
+            target=_watch_disconnect, args=(conn, cancel_token, done), daemon=True
+        ).start()
+        if request.get("op") == "transcribe_batch":
+            results = cached_process_audio_batch(
+                request["audio_digests"],
+                request["audio_paths"],
+                **request.get("kwargs", {}),
+            )
+            # 异常对象不一定能跨进程反序列化，统一转成 RuntimeError
+            result = [
+                RuntimeError(str(r)) if isinstance(r, Exception) else r for r in results
+            ]
+        else:
+            result = cached_process_audio(
+                request["audio_digest"],
+                request["audio_path"],
+                segment_callback=lambda seg: _send(("segment", seg)),
+                progress_callback=lambda sample: _send(("progress", sample)),
+                timing_callback=lambda *timing: _send(("timing", timing)),
+                cancel_token=cancel_token,
+                **request.get("kwargs", {}),
+            )
+        _send(("result", result))
+    except (EOFError, OSError):
+        # 客户端已断开
+        pass
+    except TranscriptionCancelled as e:
+        try:
+            _send(("cancelled", str(e)))
+        except OSError:
+            pass
+    except Exception as e:
+        try:
+            _send(("error", str(e)))
+        except OSError:
+            pass
+    finally:
+        done.set()
+        idle.exit()
+        conn.close()
+
+
+def serve(address: str):
+    """启动推理服务，阻塞运行；每个连接一个线程，实际并发由推理 worker 槽位限制。
+
+    未配置连接密钥时抛出 RuntimeError，不以任何默认密钥监听。
+    """
+    if not os.environ.get("WHISPER_MODEL_SERVER_AUTHKEY") and _AUTHKEY_FILE:
+        _ensure_authkey_file(_AUTHKEY_FILE)
+    authkey = _authkey()
+    family = _connection_family(address)
+    if family == "AF_UNIX" and os.path.exists(address):
+        # 上次异常退出遗留的 socket 文件
+        os.unlink(address)
+    idle = _IdleReleaser(_IDLE_TIMEOUT)
+    with Listener(address, family=family, authkey=authkey) as listener:
+        if family == "AF_UNIX":
+            # 允许同组的 HTTP worker 连接
+            os.chmod(address, 0o660)
+        print(f"推理服务已启动: {address}", file=sys.stderr)
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception:
+                # 认证失败等单个连接错误不影响服务
+                continue
+            threading.Thread(
+                target=_handle_connection, args=(conn, idle), daemon=True
+            ).start()
@@ -0,0 +1,160 @@
+"""
+转录结果输出模块
+按分段增量追加写入多种格式（纯文本、带时间戳文本、SRT、WebVTT、JSON Lines），
+长任务不必在内存里拼接整段文本，下载接口直接读取这些文件
+"""
+import json
+import threading
+from pathlib import Path
+
+from src.core import format_timestamp
+
+# 已注册的输出格式：file_type -> 写入器类
+WRITERS: dict = {}
+
+
+def register_writer(cls):
+    """注册一种输出格式（类装饰器），之后创建的任务都会同时写出该格式。"""
+    WRITERS[cls.file_type] = cls
+    return cls
+
+
+def _clock(seconds: float, decimal_marker: str) -> str:
+    """格式化为 HH:MM:SS<marker>mmm（SRT 用逗号，WebVTT 用点）。"""
+    milliseconds = max(0, round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{decimal_marker}{milliseconds:03d}"
+
+
+class SegmentWriter:
+    """逐段追加写入一个结果文件；每段写完即 flush，任务进行中也能下载已完成的部分。"""
+
+    file_type = ""
+    filename = ""
+    description = ""
+    media_type = "text/plain; charset=utf-8"
+
+    def __init__(self, directory: Path):
+        self.path = Path(directory) / self.filename
+        self._f = open(self.path, "w", encoding="utf-8")
+        self._index = 0
+        header = self.header()
+        if header:
+            self._f.write(header)
+            self._f.flush()
+
+    def header(self) -> str:
+        return ""
+
+    def format(self, segment: dict, index: int) -> str:
+        raise NotImplementedError
+
+    def write(self, segment: dict):
+        self._index += 1
+        self._f.write(self.format(segment, self._index))
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+@register_writer
+class TextWriter(SegmentWriter):
+    file_type = "result"
+    filename = "result.txt"
+    description = "转录结果（纯文本）"
+
+    def format(self, segment: dict, index: int) -> str:
+        return f"{segment['text']}\n"
+
+
+@register_writer
+class TimestampedTextWriter(SegmentWriter):
+    file_type = "result_with_timestamps"
+    filename = "result_with_timestamps.txt"
+    description = "转录结果（带时间戳）"
+
+    def format(self, segment: dict, index: int) -> str:
+        start = format_timestamp(segment["start"])
+        end = format_timestamp(segment["end"])
+        return f"[{start} --> {end}] {segment['text']}\n"
+
+
+@register_writer
+class SrtWriter(SegmentWriter):
+    file_type = "srt"
+    filename = "result.srt"
+    description = "字幕（SRT）"
+    media_type = "application/x-subrip; charset=utf-8"
+
+    def format(self, segment: dict, index: int) -> str:
+        start = _clock(segment["start"], ",")
+        end = _clock(segment["end"], ",")
+        return f"{index}\n{start} --> {end}\n{segment['text']}\n\n"
+
+
+@register_writer
+class VttWriter(SegmentWriter):
+    file_type = "vtt"
+    filename = "result.vtt"
+    description = "字幕（WebVTT）"
+    media_type = "text/vtt; charset=utf-8"
+
+    def header(self) -> str:
+        return "WEBVTT\n\n"
+
+    def format(self, segment: dict, index: int) -> str:
+        start = _clock(segment["start"], ".")
+        end = _clock(segment["end"], ".")
+        return f"{start} --> {end}\n{segment['text']}\n\n"
+
+
+@register_writer
+class JsonLinesWriter(SegmentWriter):
+    """每行一个分段，同时作为 /task/{id}/stream 断线回放的数据源。"""
+
+    file_type = "jsonl"
+    filename = "segments.jsonl"
+    description = "分段（JSON Lines）"
+    media_type = "application/x-ndjson; charset=utf-8"
+
+    def format(self, segment: dict, index: int) -> str:
+        return json.dumps(segment, ensure_ascii=False) + "\n"
+
+
+class TaskOutputs:
+    """一个任务的全部输出文件；write() 可在推理线程中调用，count 为已写入的分段数。"""
+
+    def __init__(self, directory: Path):
+        self._lock = threading.Lock()
+        self._writers = []
+        self.count = 0
+        try:
+            for cls in WRITERS.values():
+                self._writers.append(cls(directory))
+        except BaseException:
+            self.close()
+            raise
+
+    def write(self, segment: dict):
+        with self._lock:
+            for writer in self._writers:
+                writer.write(segment)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            for writer in self._writers:
+                writer.close()
+            self._writers = []
+
+
+def output_files(directory: Path) -> list:
+    """任务目录中已存在的输出文件描述，供状态接口列出。"""
+    return [
+        {"name": cls.filename, "type": cls.file_type, "description": cls.description}
+        for cls in WRITERS.values()
+        if (Path(directory) / cls.filename).exists()
+    ]
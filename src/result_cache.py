@@ -0,0 +1,277 @@
+"""
+转录结果缓存模块
+按上传内容哈希 + 转录参数做内容寻址的磁盘缓存，并合并并发的相同请求
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from pathlib import Path
+
+from src.core import (
+    LONG_AUDIO_CHUNK_SECONDS,
+    LONG_AUDIO_THRESHOLD,
+    VAD_ENABLED,
+    VAD_MIN_SILENCE_MS,
+    VAD_PADDING_MS,
+    VAD_THRESHOLD_DB,
+    CancelToken,
+    TranscriptionCancelled,
+    _CANCEL_POLL_SECONDS,
+    _env_int,
+    build_transcribe_options,
+    process_audio,
+    process_audio_batch,
+)
+from src.disk_cache import DiskLRU
+from src.engines import split_model_name
+
+# 缓存格式版本，结果结构变化时递增，使旧缓存自然失效
+_CACHE_VERSION = 2
+
+RESULT_CACHE_DIR = Path(
+    os.environ.get("WHISPER_RESULT_CACHE_DIR", "./storage/cache/results")
+)
+# 结果缓存磁盘上限（MB），超出后按 LRU 淘汰；0 表示不落盘缓存（仍合并并发请求）
+RESULT_CACHE_MAX_BYTES = (
+    _env_int("WHISPER_RESULT_CACHE_MAX_MB", 256, minimum=0) * 1024 * 1024
+)
+
+_store = DiskLRU(RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES, ".json")
+# 正在计算中的请求：相同 key 的并发请求共享同一个 Future
+_inflight: dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def new_digest():
+    """上传内容的哈希对象，调用方在流式写盘时逐块 update。"""
+    return hashlib.sha256()
+
+
+def make_cache_key(
+    audio_digest: str,
+    model_name: str,
+    language_choice: str,
+    initial_prompt: str | None,
+    mode: str = "transcribe",
+) -> str:
+    """由音频内容哈希与所有影响结果的转录参数生成缓存键。
+
+    mode 区分不同的转录路径（如批量解码不做温度回退），结果不能互相复用。
+    """
+    _, transcribe_kwargs = build_transcribe_options(
+        language_choice, initial_prompt, model_name
+    )
+    payload = {
+        "version": _CACHE_VERSION,
+        "mode": mode,
+        "audio": audio_digest,
+        "model_name": model_name,
+        # 不带引擎前缀的模型名随 WHISPER_ENGINE 换引擎，结果不能互相复用
+        "engine": split_model_name(model_name)[0].name,
+        "options": transcribe_kwargs,
+        "long_audio": [LONG_AUDIO_THRESHOLD, LONG_AUDIO_CHUNK_SECONDS],
+        "vad": (
+            [VAD_THRESHOLD_DB, VAD_MIN_SILENCE_MS, VAD_PADDING_MS] if VAD_ENABLED else None
+        ),
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get(key: str):
+    """命中返回 ((plain_text, timestamped_text, detected_language), segments)，否则返回 None。"""
+    data = _store.read(key, lambda path: json.loads(path.read_text(encoding="utf-8")))
+    if data is None:
+        return None
+    value = (data["plain_text"], data["timestamped_text"], data["language"])
+    return value, data["segments"]
+
+
+def put(key: str, value: tuple, segments: list[dict]):
+    if not _store.enabled:
+        return
+    plain_text, timestamped_text, detected_language = value
+    raw = json.dumps(
+        {
+            "plain_text": plain_text,
+            "timestamped_text": timestamped_text,
+            "language": detected_language,
+            "segments": segments,
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+    _store.write(key, lambda f: f.write(raw))
+
+
+def _replay_segments(segments: list[dict], segment_callback):
+    if segment_callback is not None:
+        for seg in segments:
+            segment_callback(seg)
+
+
+def _wait_inflight(future: Future, cancel_token: CancelToken | None):
+    """等待他人进行中的计算；本请求被取消时不再等待。"""
+    if cancel_token is None:
+        return future.result()
+    while True:
+        cancel_token.raise_if_cancelled()
+        try:
+            return future.result(timeout=_CANCEL_POLL_SECONDS)
+        except FutureTimeoutError:
+            continue
+
+
+def cached_process_audio(
+    audio_digest: str,
+    audio_path,
+    model_name="base",
+    language_choice="自动检测",
+    verbose=True,
+    initial_prompt: str | None = None,
+    segment_callback=None,
+    pcm_path: str | None = None,
+    start_sample: int = 0,
+    progress_callback=None,
+    cancel_token: CancelToken | None = None,
+    sort_key: float | None = None,
+    timing_callback=None,
+):
+    """带结果缓存与请求合并的 process_audio。
+
+    - 命中磁盘缓存：直接返回，不加载模型；
+    - 相同 key 已在计算：等待那次计算的结果，不再各自占用推理 worker；
+    - 否则由本线程计算并写入缓存。失败不缓存，等待者收到相同异常。
+    命中缓存或合并到他人计算时，分段在结果就绪后一次性回放给 segment_callback。
+    没有内容摘要时退化为直接调用 process_audio。pcm_path、progress_callback 原样传给 process_audio；
+    从检查点续转（start_sample 非 0）时结果只是剩余部分，不读写缓存。
+    cancel_token 只取消本请求：合并到的那次计算被它的发起者取消时，本请求改为自己计算。
+    sort_key 为等待推理槽位时的排队顺序，见 process_audio。
+    timing_callback 只在本请求实际执行了推理时调用（见 process_audio），命中缓存或合并到他人计算时不调用。
+    """
+    if not audio_digest or start_sample:
+        return process_audio(
+            audio_path,
+            model_name=model_name,
+            language_choice=language_choice,
+            verbose=verbose,
+            initial_prompt=initial_prompt,
+            segment_callback=segment_callback,
+            pcm_path=pcm_path,
+            start_sample=start_sample,
+            progress_callback=progress_callback,
+            cancel_token=cancel_token,
+            sort_key=sort_key,
+            timing_callback=timing_callback,
+        )
+
+    key = make_cache_key(audio_digest, model_name, language_choice, initial_prompt)
+    cached = get(key)
+    if cached is not None:
+        _replay_segments(cached[1], segment_callback)
+        return cached[0]
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+
+    if not leader:
+        try:
+            result, segments = _wait_inflight(future, cancel_token)
+        except TranscriptionCancelled:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise
+            return cached_process_audio(
+                audio_digest,
+                audio_path,
+                model_name=model_name,
+                language_choice=language_choice,
+                verbose=verbose,
+                initial_prompt=initial_prompt,
+                segment_callback=segment_callback,
+                pcm_path=pcm_path,
+                progress_callback=progress_callback,
+                cancel_token=cancel_token,
+                sort_key=sort_key,
+                timing_callback=timing_callback,
+            )
+        _replay_segments(segments, segment_callback)
+        return result
+
+    try:
+        # 上一个计算者可能刚好在两次检查之间写完缓存
+        cached = get(key)
+        if cached is not None:
+            future.set_result(cached)
+            _replay_segments(cached[1], segment_callback)
+            return cached[0]
+
+        segments = []
+
+        def _collect(seg):
+            segments.append(seg)
+            if segment_callback is not None:
+                segment_callback(seg)
+
+        result = process_audio(
+            audio_path,
+            model_name=model_name,
+            language_choice=language_choice,
+            verbose=verbose,
+            initial_prompt=initial_prompt,
+            segment_callback=_collect,
+            pcm_path=pcm_path,
+            progress_callback=progress_callback,
+            cancel_token=cancel_token,
+            sort_key=sort_key,
+            timing_callback=timing_callback,
+        )
+        put(key, result, segments)
+        future.set_result((result, segments))
+        return result
+    except BaseException as e:
+        if not future.done():
+            future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def cached_process_audio_batch(
+    audio_digests: list,
+    audio_paths: list,
+    model_name="base",
+    language_choice="自动检测",
+    initial_prompt: str | None = None,
+) -> list:
+    """带结果缓存的 process_audio_batch：命中的文件直接返回，只把未命中的组成一批推理。"""
+    keys = [
+        make_cache_key(d, model_name, language_choice, initial_prompt, mode="batch")
+        for d in audio_digests
+    ]
+    results: list = [None] * len(audio_paths)
+    misses = []
+    for i, key in enumerate(keys):
+        cached = get(key)
+        if cached is not None:
+            results[i] = cached[0]
+        else:
+            misses.append(i)
+
+    if misses:
+        computed = process_audio_batch(
+            [audio_paths[i] for i in misses],
+            model_name=model_name,
+            language_choice=language_choice,
+            initial_prompt=initial_prompt,
+        )
+        for i, result in zip(misses, computed):
+            results[i] = result
+            if not isinstance(result, Exception):
+                put(keys[i], result, [])
+    return results
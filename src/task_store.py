@@ -0,0 +1,720 @@
+"""
+任务状态存储模块
+保存异步任务元数据与排队中的任务，供同一部署里的所有实例共享：
+- TaskStore: SQLite（WAL 模式），同一台机器上的多个实例/worker 进程共用一个库文件；
+- RedisTaskStore: Redis，多台机器共享（需要安装 redis 包）。
+任一实例都可以入队、领取执行、查询与取消任意任务。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_step_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    heartbeat_at REAL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_created ON tasks (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks (created_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_expires ON tasks (expires_at);
+CREATE TABLE IF NOT EXISTS jobs (
+    task_step_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    sort_key REAL NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0
+);
+"""
+
+# 旧库缺少的列：(表, 列名) -> 补列语句
+_MIGRATIONS = {
+    ("tasks", "heartbeat_at"): "ALTER TABLE tasks ADD COLUMN heartbeat_at REAL",
+    ("tasks", "cancel_requested"): (
+        "ALTER TABLE tasks ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0"
+    ),
+    # 升级前已在排队的任务按入队顺序排在前面
+    ("jobs", "sort_key"): (
+        "ALTER TABLE jobs ADD COLUMN sort_key REAL NOT NULL DEFAULT 0;"
+        "UPDATE jobs SET sort_key = enqueued_at;"
+    ),
+    ("jobs", "cost"): "ALTER TABLE jobs ADD COLUMN cost REAL NOT NULL DEFAULT 0",
+}
+
+# 已结束的任务不会再被恢复
+_TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class _TaskStoreBase:
+    def import_legacy_status_files(self, task_dir: Path) -> int:
+        """把旧版本写在任务目录里的 status.json 导入任务库（一次性迁移，导入后删除文件）。"""
+        if not task_dir.exists():
+            return 0
+        imported = 0
+        for status_file in task_dir.glob("*/status.json"):
+            task_step_id = status_file.parent.name
+            try:
+                data = json.loads(status_file.read_text(encoding="utf-8"))
+                if self.get(task_step_id) is None:
+                    self.upsert(task_step_id, data, now=status_file.stat().st_mtime)
+                    imported += 1
+                os.unlink(status_file)
+            except (OSError, ValueError):
+                continue
+        return imported
+
+
+class TaskStore(_TaskStoreBase):
+    """任务元数据表：按 task_step_id 主键读写，过期清理走 expires_at 索引范围删除。
+    排队中的任务在 jobs 表里，按 (sort_key, 入队时间) 领取，删除行并刷新心跳在同一个事务内完成。
+
+    每个线程使用自己的连接；WAL 模式下读不阻塞写、写不阻塞读。
+    """
+
+    def __init__(self, db_path: Path, retention_seconds: int):
+        self.db_path = Path(db_path)
+        self.retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        with self._init_lock:
+            if not self._initialized:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                init_conn = sqlite3.connect(str(self.db_path), timeout=30)
+                init_conn.execute("PRAGMA journal_mode=WAL")
+                init_conn.executescript(_SCHEMA)
+                # 旧库缺少的列补上
+                columns = {
+                    (table, row[1])
+                    for table in ("tasks", "jobs")
+                    for row in init_conn.execute(f"PRAGMA table_info({table})")
+                }
+                for column, ddl in _MIGRATIONS.items():
+                    if column not in columns:
+                        init_conn.executescript(ddl)
+                init_conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_jobs_sort ON jobs (sort_key, enqueued_at)"
+                )
+                init_conn.commit()
+                init_conn.close()
+                self._initialized = True
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        return conn
+
+    def upsert(self, task_step_id: str, data: dict, now: Optional[float] = None):
+        """写入任务的完整状态；created_at 只在首次插入时设置，每次写入同时刷新心跳。"""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO tasks (
+                    task_step_id, status, data, created_at, updated_at, expires_at, heartbeat_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (task_step_id) DO UPDATE SET
+                    status = excluded.status,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at,
+                    expires_at = excluded.expires_at,
+                    heartbeat_at = excluded.heartbeat_at
+                """,
+                (
+                    task_step_id,
+                    data.get("status") or "unknown",
+                    json.dumps(data, ensure_ascii=False),
+                    now,
+                    now,
+                    now + self.retention_seconds,
+                    now,
+                ),
+            )
+
+    def heartbeat(self, task_step_ids, now: Optional[float] = None):
+        """标记这些任务仍由当前进程持有（排队或执行中），其它进程不会把它们当作中断任务接管。
+
+        同时把过期时间顺延到"现在 + 保留期"，执行时间超过保留期的长任务不会被过期清理删掉。
+        """
+        task_step_ids = list(task_step_ids)
+        if not task_step_ids:
+            return
+        now = time.time() if now is None else now
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                """
+                UPDATE tasks SET heartbeat_at = ?, expires_at = MAX(expires_at, ?)
+                WHERE task_step_id = ?
+                """,
+                [(now, now + self.retention_seconds, task_step_id) for task_step_id in task_step_ids],
+            )
+
+    def claim_stale(
+        self, task_step_id: str, stale_before: float, now: Optional[float] = None
+    ) -> bool:
+        """心跳早于 stale_before 的未结束任务视为持有者已退出，原子地改由当前进程接管。
+
+        多个 worker 进程同时扫描时只有一个能接管成功（返回 True）。
+        """
+        now = time.time() if now is None else now
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                f"""
+                UPDATE tasks SET heartbeat_at = ?
+                WHERE task_step_id = ?
+                    AND status NOT IN ({", ".join("?" * len(_TERMINAL_STATUSES))})
+                    AND COALESCE(heartbeat_at, updated_at) < ?
+                """,
+                (now, task_step_id, *_TERMINAL_STATUSES, stale_before),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, task_step_id: str) -> Optional[dict]:
+        row = (
+            self._conn()
+            .execute("SELECT data FROM tasks WHERE task_step_id = ?", (task_step_id,))
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def list_tasks(
+        self, status: Optional[str] = None, limit: int = 50, offset: int = 0
+    ) -> tuple[list[dict], int]:
+        """按创建时间倒序分页列出任务，返回 (本页任务, 总数)。"""
+        where = "WHERE status = ?" if status else ""
+        params = (status,) if status else ()
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM tasks {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"""
+            SELECT task_step_id, data, created_at, updated_at FROM tasks {where}
+            ORDER BY created_at DESC LIMIT ? OFFSET ?
+            """,
+            (*params, limit, offset),
+        ).fetchall()
+        items = [
+            {
+                "task_step_id": task_step_id,
+                **json.loads(data),
+                "created_at": created_at,
+                "updated_at": updated_at,
+            }
+            for task_step_id, data, created_at, updated_at in rows
+        ]
+        return items, total
+
+    def delete_expired(self, now: Optional[float] = None) -> list[str]:
+        """删除已过期的任务记录，返回被删除的 task_step_id 列表。"""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        with conn:
+            expired = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT task_step_id FROM tasks WHERE expires_at < ?", (now,)
+                )
+            ]
+            conn.execute("DELETE FROM tasks WHERE expires_at < ?", (now,))
+        return expired
+
+    def request_cancel(self, task_step_id: str):
+        """请求取消在其它实例上执行的任务；持有该任务的实例轮询到后自行取消。"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE tasks SET cancel_requested = 1 WHERE task_step_id = ?", (task_step_id,)
+            )
+
+    def cancel_requested(self, task_step_ids) -> list[str]:
+        """返回这些任务中已被请求取消的 task_step_id。"""
+        task_step_ids = list(task_step_ids)
+        if not task_step_ids:
+            return []
+        rows = self._conn().execute(
+            f"""
+            SELECT task_step_id FROM tasks
+            WHERE cancel_requested = 1 AND task_step_id IN ({", ".join("?" * len(task_step_ids))})
+            """,
+            task_step_ids,
+        )
+        return [row[0] for row in rows]
+
+    def push_job(
+        self,
+        task_step_id: str,
+        job: dict,
+        sort_key: Optional[float] = None,
+        cost: float = 0.0,
+        now: Optional[float] = None,
+        max_jobs: Optional[int] = None,
+    ) -> bool:
+        """任务入队，sort_key 小的先被领取（缺省为入队时刻，即先进先出），
+        cost 为预计处理秒数，用于估算排在后面的任务的等待时间。
+
+        同一 task_step_id 重复入队时覆盖参数与排序，之前的取消请求作废。
+        给出 max_jobs 时，队列中（不含本任务）已有 max_jobs 个任务则不入队并返回 False；
+        检查与插入是同一条语句，多个进程同时入队也不会超出上限。
+        """
+        now = time.time() if now is None else now
+        sort_key = now if sort_key is None else sort_key
+        conn = self._conn()
+        with conn:
+            inserted = conn.execute(
+                """
+                INSERT OR REPLACE INTO jobs (task_step_id, data, enqueued_at, sort_key, cost)
+                SELECT ?, ?, ?, ?, ?
+                WHERE ? IS NULL
+                    OR (SELECT COUNT(*) FROM jobs WHERE task_step_id != ?) < ?
+                """,
+                (
+                    task_step_id,
+                    json.dumps(job, ensure_ascii=False),
+                    now,
+                    sort_key,
+                    cost,
+                    max_jobs,
+                    task_step_id,
+                    max_jobs,
+                ),
+            ).rowcount
+            if not inserted:
+                return False
+            conn.execute(
+                "UPDATE tasks SET cancel_requested = 0 WHERE task_step_id = ?", (task_step_id,)
+            )
+        return True
+
+    def claim_job(self, now: Optional[float] = None) -> Optional[tuple[str, dict]]:
+        """领取队首任务并刷新其心跳，返回 (task_step_id, 任务参数)；队列为空时返回 None。
+
+        多个进程同时领取时，只有删除成功的一方得到该任务，其余的继续尝试下一个。
+        """
+        now = time.time() if now is None else now
+        conn = self._conn()
+        while True:
+            row = conn.execute(
+                "SELECT task_step_id, data FROM jobs ORDER BY sort_key, enqueued_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            task_step_id, data = row
+            with conn:
+                claimed = (
+                    conn.execute("DELETE FROM jobs WHERE task_step_id = ?", (task_step_id,)).rowcount
+                    == 1
+                )
+                if claimed:
+                    conn.execute(
+                        "UPDATE tasks SET heartbeat_at = ? WHERE task_step_id = ?",
+                        (now, task_step_id),
+                    )
+            if claimed:
+                return task_step_id, json.loads(data)
+
+    def remove_job(self, task_step_id: str) -> Optional[dict]:
+        """把仍在排队的任务移出队列（取消），返回其参数；已被领取或不存在时返回 None。"""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT data FROM jobs WHERE task_step_id = ?", (task_step_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            removed = (
+                conn.execute("DELETE FROM jobs WHERE task_step_id = ?", (task_step_id,)).rowcount
+                == 1
+            )
+        return json.loads(row[0]) if removed else None
+
+    def queued_jobs(self) -> list[tuple[str, float]]:
+        """按领取顺序返回所有排队任务的 (task_step_id, 预计处理秒数)，走 idx_jobs_sort 一次顺序扫描。"""
+        return [
+            (row[0], row[1] or 0.0)
+            for row in self._conn().execute(
+                "SELECT task_step_id, cost FROM jobs ORDER BY sort_key, enqueued_at"
+            )
+        ]
+
+    def job_count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def pending_job_ids(self) -> list[str]:
+        return [
+            row[0]
+            for row in self._conn().execute(
+                "SELECT task_step_id FROM jobs ORDER BY sort_key, enqueued_at"
+            )
+        ]
+
+
+# 所有脚本只访问 KEYS 中声明的键（Redis Cluster 据此路由，且要求同一 slot，见 RedisTaskStore）。
+# upsert：维护按状态/创建时间/过期时间排序的索引集合，created_at 只在首次写入时设置。
+# KEYS[4]/KEYS[5] 为旧/新状态的索引；调用方先读出旧状态，脚本内状态已变（并发写入）时返回 0 由调用方重试
+_REDIS_UPSERT = """
+local old = redis.call('HGET', KEYS[1], 'status') or ''
+if old ~= ARGV[6] then
+    return 0
+end
+if old ~= '' and old ~= ARGV[2] then
+    redis.call('ZREM', KEYS[4], ARGV[1])
+end
+local created = redis.call('HGET', KEYS[1], 'created_at')
+if not created then
+    created = ARGV[4]
+    redis.call('HSET', KEYS[1], 'created_at', created)
+    redis.call('ZADD', KEYS[2], created, ARGV[1])
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[2], 'data', ARGV[3], 'updated_at', ARGV[4],
+    'expires_at', ARGV[5], 'heartbeat_at', ARGV[4])
+redis.call('ZADD', KEYS[5], created, ARGV[1])
+redis.call('ZADD', KEYS[3], ARGV[5], ARGV[1])
+return 1
+"""
+
+# heartbeat：KEYS[1] 为过期时间索引，其后是各任务的 hash，ARGV[2 + i] 为 KEYS[1 + i] 的 task_step_id
+_REDIS_HEARTBEAT = """
+for i = 2, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('HSET', KEYS[i], 'heartbeat_at', ARGV[1])
+        local expires = tonumber(redis.call('HGET', KEYS[i], 'expires_at') or '0')
+        if expires < tonumber(ARGV[2]) then
+            redis.call('HSET', KEYS[i], 'expires_at', ARGV[2])
+            redis.call('ZADD', KEYS[1], ARGV[2], ARGV[i + 1])
+        end
+    end
+end
+"""
+
+_REDIS_CLAIM_STALE = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if not status or status == 'completed' or status == 'failed' or status == 'cancelled' then
+    return 0
+end
+local beat = redis.call('HGET', KEYS[1], 'heartbeat_at') or redis.call('HGET', KEYS[1], 'updated_at')
+if beat and tonumber(beat) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'heartbeat_at', ARGV[2])
+return 1
+"""
+
+# claim_job：调用方先读出队首 ARGV[1]，KEYS 为 队列、预计耗时、该任务的参数与 hash；
+# 已被其它实例领走时返回 false 由调用方重读队首
+_REDIS_CLAIM_JOB = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return false
+end
+local data = redis.call('GET', KEYS[3]) or ''
+redis.call('DEL', KEYS[3])
+redis.call('HDEL', KEYS[2], ARGV[1])
+if redis.call('EXISTS', KEYS[4]) == 1 then
+    redis.call('HSET', KEYS[4], 'heartbeat_at', ARGV[2])
+end
+return data
+"""
+
+# push_job：KEYS 为 队列、该任务的参数、预计耗时、该任务的 hash；ARGV[5] 为队列上限（空串表示不限），
+# 队列中（不含本任务）已满时不入队并返回 0
+_REDIS_PUSH_JOB = """
+if ARGV[5] ~= '' and not redis.call('ZSCORE', KEYS[1], ARGV[1])
+        and redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[5]) then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2])
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[4])
+redis.call('HDEL', KEYS[4], 'cancel_requested')
+return 1
+"""
+
+_REDIS_REMOVE_JOB = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return false
+end
+local data = redis.call('GET', KEYS[2])
+redis.call('DEL', KEYS[2])
+redis.call('HDEL', KEYS[3], ARGV[1])
+return data
+"""
+
+
+class RedisTaskStore(_TaskStoreBase):
+    """与 TaskStore 接口相同、数据放在 Redis 里的实现，供多台机器上的实例共享。
+
+    每个任务一个 hash；按创建时间、按状态、按过期时间各维护一个有序集合用于分页与清理；
+    队列是以 sort_key 为分值的有序集合，预计处理秒数另存一个 hash。需要原子性的操作（领取、接管、出队）用 Lua 脚本完成。
+    各实例的任务目录（音频与结果文件）需要放在共享存储上。
+
+    支持单机 Redis 与 Redis Cluster：脚本与事务涉及的键都经 KEYS 传入；cluster=True 时用 RedisCluster 客户端，
+    前缀默认为带 hash tag 的 "{whisper}:"，所有键落在同一个 slot（任务库整体在一个分片上，换取多键原子操作）。
+    单机默认前缀仍为 "whisper:"，与已有数据兼容。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        retention_seconds: int,
+        prefix: Optional[str] = None,
+        cluster: bool = False,
+    ):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "WHISPER_TASK_BACKEND=redis 需要安装 redis 包：pip install redis"
+            ) from e
+        self.retention_seconds = retention_seconds
+        if cluster:
+            from redis.cluster import RedisCluster
+
+            self._redis = RedisCluster.from_url(url, decode_responses=True)
+        else:
+            self._redis = redis.Redis.from_url(url, decode_responses=True)
+        if prefix is None:
+            prefix = "{whisper}:" if cluster else "whisper:"
+        self._prefix = prefix
+        self._upsert = self._redis.register_script(_REDIS_UPSERT)
+        self._heartbeat = self._redis.register_script(_REDIS_HEARTBEAT)
+        self._claim_stale = self._redis.register_script(_REDIS_CLAIM_STALE)
+        self._push_job = self._redis.register_script(_REDIS_PUSH_JOB)
+        self._claim_job = self._redis.register_script(_REDIS_CLAIM_JOB)
+        self._remove_job = self._redis.register_script(_REDIS_REMOVE_JOB)
+
+    def _task_key(self, task_step_id: str) -> str:
+        return f"{self._prefix}task:{task_step_id}"
+
+    def _job_key(self, task_step_id: str) -> str:
+        return f"{self._prefix}job:{task_step_id}"
+
+    @property
+    def _created_key(self) -> str:
+        return f"{self._prefix}tasks:created"
+
+    @property
+    def _expires_key(self) -> str:
+        return f"{self._prefix}tasks:expires"
+
+    @property
+    def _status_prefix(self) -> str:
+        return f"{self._prefix}tasks:status:"
+
+    @property
+    def _jobs_key(self) -> str:
+        return f"{self._prefix}jobs"
+
+    @property
+    def _job_costs_key(self) -> str:
+        return f"{self._prefix}jobs:cost"
+
+    def upsert(self, task_step_id: str, data: dict, now: Optional[float] = None):
+        """写入任务的完整状态；created_at 只在首次写入时设置，每次写入同时刷新心跳。"""
+        now = time.time() if now is None else now
+        key = self._task_key(task_step_id)
+        status = data.get("status") or "unknown"
+        payload = json.dumps(data, ensure_ascii=False)
+        while True:
+            # 旧状态索引的键须在脚本外确定；读到脚本执行之间状态被改写时重试
+            old = self._redis.hget(key, "status") or ""
+            if self._upsert(
+                keys=[
+                    key,
+                    self._created_key,
+                    self._expires_key,
+                    self._status_prefix + (old or status),
+                    self._status_prefix + status,
+                ],
+                args=[task_step_id, status, payload, now, now + self.retention_seconds, old],
+            ):
+                return
+
+    def get(self, task_step_id: str) -> Optional[dict]:
+        data = self._redis.hget(self._task_key(task_step_id), "data")
+        return json.loads(data) if data else None
+
+    def list_tasks(
+        self, status: Optional[str] = None, limit: int = 50, offset: int = 0
+    ) -> tuple[list[dict], int]:
+        """按创建时间倒序分页列出任务，返回 (本页任务, 总数)。"""
+        index_key = self._status_prefix + status if status else self._created_key
+        total = self._redis.zcard(index_key)
+        task_step_ids = self._redis.zrevrange(index_key, offset, offset + limit - 1)
+        pipe = self._redis.pipeline(transaction=False)
+        for task_step_id in task_step_ids:
+            pipe.hmget(self._task_key(task_step_id), "data", "created_at", "updated_at")
+        items = [
+            {
+                "task_step_id": task_step_id,
+                **json.loads(data),
+                "created_at": float(created_at),
+                "updated_at": float(updated_at),
+            }
+            for task_step_id, (data, created_at, updated_at) in zip(
+                task_step_ids, pipe.execute()
+            )
+            if data
+        ]
+        return items, total
+
+    def delete_expired(self, now: Optional[float] = None) -> list[str]:
+        """删除已过期的任务记录，返回被删除的 task_step_id 列表。"""
+        now = time.time() if now is None else now
+        expired = self._redis.zrangebyscore(self._expires_key, "-inf", f"({now}")
+        if not expired:
+            return []
+        pipe = self._redis.pipeline(transaction=False)
+        for task_step_id in expired:
+            pipe.hget(self._task_key(task_step_id), "status")
+        statuses = pipe.execute()
+        pipe = self._redis.pipeline()
+        for task_step_id, status in zip(expired, statuses):
+            pipe.delete(self._task_key(task_step_id))
+            pipe.zrem(self._created_key, task_step_id)
+            pipe.zrem(self._expires_key, task_step_id)
+            if status:
+                pipe.zrem(self._status_prefix + status, task_step_id)
+        pipe.execute()
+        return expired
+
+    def heartbeat(self, task_step_ids, now: Optional[float] = None):
+        """标记这些任务仍由当前进程持有（排队或执行中），其它进程不会把它们当作中断任务接管；
+        过期时间同时顺延到"现在 + 保留期"。"""
+        task_step_ids = list(task_step_ids)
+        if not task_step_ids:
+            return
+        now = time.time() if now is None else now
+        self._heartbeat(
+            keys=[self._expires_key, *(self._task_key(t) for t in task_step_ids)],
+            args=[now, now + self.retention_seconds, *task_step_ids],
+        )
+
+    def claim_stale(
+        self, task_step_id: str, stale_before: float, now: Optional[float] = None
+    ) -> bool:
+        """心跳早于 stale_before 的未结束任务视为持有者已退出，原子地改由当前进程接管。"""
+        now = time.time() if now is None else now
+        return bool(
+            self._claim_stale(keys=[self._task_key(task_step_id)], args=[stale_before, now])
+        )
+
+    def request_cancel(self, task_step_id: str):
+        """请求取消在其它实例上执行的任务；持有该任务的实例轮询到后自行取消。"""
+        key = self._task_key(task_step_id)
+        if self._redis.exists(key):
+            self._redis.hset(key, "cancel_requested", 1)
+
+    def cancel_requested(self, task_step_ids) -> list[str]:
+        """返回这些任务中已被请求取消的 task_step_id。"""
+        task_step_ids = list(task_step_ids)
+        pipe = self._redis.pipeline(transaction=False)
+        for task_step_id in task_step_ids:
+            pipe.hget(self._task_key(task_step_id), "cancel_requested")
+        return [
+            task_step_id
+            for task_step_id, flag in zip(task_step_ids, pipe.execute())
+            if flag == "1"
+        ]
+
+    def push_job(
+        self,
+        task_step_id: str,
+        job: dict,
+        sort_key: Optional[float] = None,
+        cost: float = 0.0,
+        now: Optional[float] = None,
+        max_jobs: Optional[int] = None,
+    ) -> bool:
+        """任务入队，参数与返回值同 TaskStore.push_job；队列上限的检查与入队在同一个脚本内完成。"""
+        now = time.time() if now is None else now
+        sort_key = now if sort_key is None else sort_key
+        return bool(
+            self._push_job(
+                keys=[
+                    self._jobs_key,
+                    self._job_key(task_step_id),
+                    self._job_costs_key,
+                    self._task_key(task_step_id),
+                ],
+                args=[
+                    task_step_id,
+                    json.dumps(job, ensure_ascii=False),
+                    sort_key,
+                    cost,
+                    "" if max_jobs is None else max_jobs,
+                ],
+            )
+        )
+
+    def claim_job(self, now: Optional[float] = None) -> Optional[tuple[str, dict]]:
+        """领取队首任务并刷新其心跳，返回 (task_step_id, 任务参数)；队列为空时返回 None。"""
+        now = time.time() if now is None else now
+        while True:
+            head = self._redis.zrange(self._jobs_key, 0, 0)
+            if not head:
+                return None
+            task_step_id = head[0]
+            data = self._claim_job(
+                keys=[
+                    self._jobs_key,
+                    self._job_costs_key,
+                    self._job_key(task_step_id),
+                    self._task_key(task_step_id),
+                ],
+                args=[task_step_id, now],
+            )
+            if data is not None:
+                return task_step_id, json.loads(data) if data else {}
+            # 被其它实例抢先领取，重读队首
+
+    def remove_job(self, task_step_id: str) -> Optional[dict]:
+        """把仍在排队的任务移出队列（取消），返回其参数；已被领取或不存在时返回 None。"""
+        data = self._remove_job(
+            keys=[self._jobs_key, self._job_key(task_step_id), self._job_costs_key],
+            args=[task_step_id],
+        )
+        return json.loads(data) if data else None
+
+    def queued_jobs(self) -> list[tuple[str, float]]:
+        """按领取顺序返回所有排队任务的 (task_step_id, 预计处理秒数)。"""
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.zrange(self._jobs_key, 0, -1)
+        pipe.hgetall(self._job_costs_key)
+        ids, costs = pipe.execute()
+        return [(task_step_id, float(costs.get(task_step_id) or 0)) for task_step_id in ids]
+
+    def job_count(self) -> int:
+        return self._redis.zcard(self._jobs_key)
+
+    def pending_job_ids(self) -> list[str]:
+        return self._redis.zrange(self._jobs_key, 0, -1)
+
+
+def open_task_store(
+    backend: str,
+    db_path: Path,
+    redis_url: str,
+    retention_seconds: int,
+    redis_cluster: bool = False,
+) -> _TaskStoreBase:
+    """按配置创建任务库：sqlite（默认）或 redis（redis_cluster 为 True 时连接 Redis Cluster）。"""
+    if backend == "redis":
+        return RedisTaskStore(redis_url, retention_seconds, cluster=redis_cluster)
+    if backend != "sqlite":
+        raise ValueError(f"未知的任务后端: {backend}，可选: sqlite, redis")
+    return TaskStore(db_path, retention_seconds)
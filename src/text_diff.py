@@ -0,0 +1,21 @@
+"""
+文本差异模块
+转录文本之间按词/字的编辑距离，供量化模型对比与推理引擎一致性检查共用
+"""
+
+
+def split_tokens(text: str) -> list:
+    """按空格切词；没有空格的文本（中文等）按字切分。"""
+    words = text.lower().split()
+    return words if len(words) > 1 else list(text.replace(" ", ""))
+
+
+def edit_distance(ref: list, hyp: list) -> int:
+    """两个词/字序列之间的 Levenshtein 距离（替换、插入、删除各计 1）。"""
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1]
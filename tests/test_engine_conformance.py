@@ -0,0 +1,98 @@
+"""
+推理引擎接口契约测试
+不依赖模型的检查（注册、模型名解析、接口实现）总是运行；各引擎在合成音频上走完整转录流程
+（tiny 模型），检查输出契约并与参考引擎（whisper）对比文本与时间戳。faster-whisper 的用例
+在未安装该包时单独跳过，不影响 whisper 的用例。
+"""
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+# 与 benchmarks/engine_conformance.py 一致：调低长音频阈值，让合成音频也走到分段路径（须在导入 src.core 之前）
+os.environ.setdefault('WHISPER_LONG_AUDIO_THRESHOLD', '60')
+os.environ.setdefault('WHISPER_LONG_AUDIO_CHUNK_SECONDS', '45')
+
+import engine_conformance  # noqa: E402
+from src import core  # noqa: E402,F401  注册 whisper 引擎
+from src.engines import DEFAULT_ENGINE, ENGINES, InferenceEngine, split_model_name  # noqa: E402
+
+CONTRACT_ENGINES = ('whisper', 'faster-whisper')
+
+
+def test_split_model_name():
+    engine, base_name = split_model_name('faster-whisper:base-int8')
+    assert (engine.name, base_name) == ('faster-whisper', 'base-int8')
+    engine, base_name = split_model_name('small')
+    assert (engine.name, base_name) == (DEFAULT_ENGINE, 'small')
+    with pytest.raises(ValueError):
+        split_model_name('no-such-engine:base')
+
+
+@pytest.mark.parametrize('name', CONTRACT_ENGINES)
+def test_engine_implements_interface(name):
+    engine = ENGINES[name]
+    assert isinstance(engine, InferenceEngine)
+    assert engine.name == name
+    for method in ('device', 'load', 'transcribe'):
+        assert getattr(type(engine), method) is not getattr(InferenceEngine, method)
+    assert engine.device('base') in ('cpu', 'cuda')
+
+
+def _require_engine(name):
+    """引擎的可选依赖未安装时只跳过该引擎的用例。"""
+    if name == 'faster-whisper':
+        pytest.importorskip('faster_whisper')
+
+
+@pytest.fixture(scope='module')
+def fixture_audio(tmp_path_factory):
+    if shutil.which('ffmpeg') is None:
+        pytest.skip('转录流程需要 ffmpeg')
+    cache_dir = str(tmp_path_factory.mktemp('audio'))
+    return [
+        (engine_conformance.ensure_audio(cache_dir, signal, seconds), seconds)
+        for signal, seconds in engine_conformance.DEFAULT_CASES
+    ]
+
+
+@pytest.fixture(scope='module')
+def engine_results(fixture_audio):
+    """按引擎缓存转录结果，契约与一致性用例共用，每个引擎只转录一遍。"""
+    cache = {}
+
+    def _results(name):
+        _require_engine(name)
+        if name not in cache:
+            cache[name] = [
+                engine_conformance._transcribe(f'{name}:tiny', path, '自动检测')
+                for path, _ in fixture_audio
+            ]
+        return cache[name]
+
+    return _results
+
+
+@pytest.mark.parametrize('name', CONTRACT_ENGINES)
+def test_engine_output_contract(name, fixture_audio, engine_results):
+    for (path, seconds), result in zip(fixture_audio, engine_results(name)):
+        assert engine_conformance._contract_errors(result, seconds) == [], os.path.basename(path)
+        assert isinstance(result['language'], str) and result['language']
+
+
+@pytest.mark.parametrize('name', CONTRACT_ENGINES[1:])
+def test_engine_agrees_with_reference(name, fixture_audio, engine_results):
+    _require_engine(name)
+    reference = engine_results(CONTRACT_ENGINES[0])
+    for (path, _), ref, result in zip(fixture_audio, reference, engine_results(name)):
+        comparison = engine_conformance._compare(ref, result)
+        label = os.path.basename(path)
+        assert comparison['diff_rate'] <= engine_conformance.DEFAULT_MAX_DIFF_RATE, label
+        assert (
+            comparison['boundary_seconds'] <= engine_conformance.DEFAULT_MAX_BOUNDARY_SECONDS
+        ), label